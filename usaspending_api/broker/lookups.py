@@ -13,6 +13,8 @@ EXTERNAL_DATA_TYPE = [
     LookupType(3, "exec_comp", "Executive Compensation from Broker"),
     LookupType(10, "source_procurement_transaction", "source FPDS transaction records"),
     LookupType(11, "source_assistance_transaction", "source FABS transaction records"),
+    LookupType(20, "submissions", "Agency submissions (Files A, B and C) from Broker"),
+    LookupType(30, "reference_data", "Reference data such as agencies, TAS and CFDA programs"),
     # "opposite" side of the broker data load, data from USAspending DB -> Elasticsearch
     LookupType(100, "es_transactions", "Load elasticsearch with transactions from USAspending"),
     LookupType(101, "es_awards", "Load elasticsearch with awards from USAspending"),
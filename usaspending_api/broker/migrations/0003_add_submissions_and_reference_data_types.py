@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+# The external data types recording the loads of submissions and reference data, which version the API cache keys
+# (see usaspending_api/common/cache.py). They're added here, rather than only by load_broker_static_data, because
+# update_last_load_date() fails on a foreign key violation until they exist.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('broker', '0002_auto_20190402_1457'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                """
+                insert into external_data_type (external_data_type_id, name, description, create_date, update_date)
+                values
+                    (20, 'submissions', 'Agency submissions (Files A, B and C) from Broker', now(), now()),
+                    (30, 'reference_data', 'Reference data such as agencies, TAS and CFDA programs', now(), now())
+                on conflict (external_data_type_id) do nothing
+                """
+            ],
+            reverse_sql=[
+                "delete from external_data_load_date where external_data_type_id in (20, 30)",
+                "delete from external_data_type where external_data_type_id in (20, 30)",
+            ],
+        ),
+    ]
@@ -1,11 +1,66 @@
 import hashlib
 import json
+import logging
+import threading
+import time
 
+from django.conf import settings
 from rest_framework_extensions.key_constructor import bits
 from rest_framework_extensions.key_constructor.constructors import DefaultKeyConstructor
 
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE, EXTERNAL_DATA_TYPE_DICT_ID
+from usaspending_api.broker.models import ExternalDataLoadDate
 from usaspending_api.common.helpers.dict_helpers import order_nested_object
 
+logger = logging.getLogger("console")
+
+_data_versions = {"versions": None, "expires_at": 0.0}
+_data_versions_lock = threading.Lock()
+
+
+def get_data_versions(data_sources=None) -> dict:
+    """
+    Return the last load date of each data source, named as in EXTERNAL_DATA_TYPE, as {name: isoformat or None}.
+    Defaults to all data sources. The load dates are read from external_data_load_date at most once every
+    API_CACHE_DATA_VERSION_SECONDS per process.
+    """
+    with _data_versions_lock:
+        if _data_versions["versions"] is None or time.monotonic() >= _data_versions["expires_at"]:
+            try:
+                load_dates = ExternalDataLoadDate.objects.values_list("external_data_type_id", "last_load_date")
+                _data_versions["versions"] = {
+                    EXTERNAL_DATA_TYPE_DICT_ID.get(external_data_type_id): last_load_date.isoformat()
+                    for external_data_type_id, last_load_date in load_dates
+                }
+                _data_versions["expires_at"] = time.monotonic() + settings.API_CACHE_DATA_VERSION_SECONDS
+            except Exception:
+                logger.exception("Problem while retrieving the data versions of the cache keys")
+                return {}
+        versions = _data_versions["versions"]
+
+    return {name: versions.get(name) for name in sorted(data_sources or [edt.name for edt in EXTERNAL_DATA_TYPE])}
+
+
+def clear_data_versions() -> None:
+    """Read the load dates again on the next call of get_data_versions()"""
+    with _data_versions_lock:
+        _data_versions["versions"] = None
+
+
+def get_canonical_params(request) -> str:
+    """
+    Return the GET parameters and directives of the request as compact JSON, ordered so the same parameters always
+    give the same string. It's computed once and kept on the request.
+    """
+    canonical_params = getattr(request, "_canonical_params", None)
+    if canonical_params is None:
+        params = dict(request.query_params)
+        params.update(dict(request.data))
+        params.pop("auditTrail", None)
+        canonical_params = json.dumps(order_nested_object(params), separators=(",", ":"))
+        request._canonical_params = canonical_params
+    return canonical_params
+
 
 class PathKeyBit(bits.QueryParamsKeyBit):
     """
@@ -23,11 +78,18 @@ class GetPostQueryParamsKeyBit(bits.QueryParamsKeyBit):
     """
 
     def get_source_dict(self, params, view_instance, view_method, request, args, kwargs):
-        params = dict(request.query_params)
-        params.update(dict(request.data))
-        if "auditTrail" in params:
-            del params["auditTrail"]
-        return {"request": json.dumps(order_nested_object(params))}
+        return {"request": get_canonical_params(request)}
+
+
+class DataVersionKeyBit(bits.KeyBitBase):
+    """
+    Adds the load dates of the data the view depends on as a key bit, so its cached responses are replaced once
+    new data is loaded rather than when the whole cache is cleared. Views list their data sources, named as in
+    EXTERNAL_DATA_TYPE, in a ``cache_data_sources`` attribute. Views without one depend on all of them.
+    """
+
+    def get_data(self, params, view_instance, view_method, request, args, kwargs):
+        return get_data_versions(getattr(view_instance, "cache_data_sources", None))
 
 
 class USAspendingKeyConstructor(DefaultKeyConstructor):
@@ -38,12 +100,13 @@ class USAspendingKeyConstructor(DefaultKeyConstructor):
 
     path_bit = PathKeyBit()
     request_params = GetPostQueryParamsKeyBit()
+    data_versions = DataVersionKeyBit()
 
     def prepare_key(self, key_dict):
-        # Order the key_dict using the order_nested_object function to make sure cache keys are always exactly the same
-        ordered_key_dict = json.dumps(order_nested_object(key_dict))
-        key_hex = hashlib.md5(ordered_key_dict.encode("utf-8")).hexdigest()
-        return key_hex
+        # The request parameters are already ordered by GetPostQueryParamsKeyBit and the other key bits only hold
+        # strings, so sorting the dict keys is enough to make sure cache keys are always exactly the same
+        key_json = json.dumps(key_dict, sort_keys=True, separators=(",", ":"))
+        return hashlib.md5(key_json.encode("utf-8")).hexdigest()
 
 
 usaspending_key_func = USAspendingKeyConstructor()
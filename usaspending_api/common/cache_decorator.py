@@ -1,15 +1,39 @@
 # -*- coding: utf-8 -*-
 import logging
+import threading
+import time
+import uuid
+import zlib
 
+from collections import OrderedDict, defaultdict
 from collections.abc import Iterable
+from ddtrace import tracer
 from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
 from django.db.models import QuerySet
+from django.http import HttpResponse
 from rest_framework_extensions.cache.decorators import CacheResponse
-from typing import Any
+from rest_framework_extensions.settings import extensions_api_settings
+from typing import Any, List, NamedTuple, Optional, Tuple
+from usaspending_api.common.cache import get_canonical_params
 from usaspending_api.common.experimental_api_flags import is_experimental_elasticsearch_api
 
 logger = logging.getLogger("console")
 
+# How often a request waiting for another to compute the same response checks whether it's done
+LOCK_POLL_SECONDS = 0.1
+
+# Cached response content bigger than this, in bytes, is compressed with zlib at this level
+MIN_COMPRESSED_SIZE = 1024
+COMPRESSION_LEVEL = 6
+
+# Requests with parameters bigger than this, in characters of JSON, aren't tracked as popular requests
+MAX_POPULAR_REQUEST_SIZE = 10000
+
+# Key of the shared cache's generation, replaced whenever it's cleared (see clear_usaspending_cache), so the local
+# tier of every worker stops serving the responses it copied from the shared cache before
+CACHE_GENERATION_KEY = "cache-generation"
+
 
 def contains_queryset(data: Any) -> bool:
     """Traverse a complex object and return True if a Queryset exists anywhere"""
@@ -26,7 +50,208 @@ def contains_queryset(data: Any) -> bool:
         return False
 
 
+class CachedResponse(NamedTuple):
+    """
+    A rendered response as stored in the cache: its status, headers and content, compressed if it's big, with the time
+    after which it's stale and should be recomputed. Storing the rendered bytes rather than the pickled Response keeps
+    the cache smaller and is cheaper to load.
+    """
+
+    status_code: int
+    headers: Tuple[Tuple[str, str], ...]
+    content: bytes
+    compressed: bool
+    fresh_until: Optional[float]  # None if it never goes stale
+
+    @classmethod
+    def from_response(cls, response, fresh_until: Optional[float]) -> "CachedResponse":
+        """Store a rendered response"""
+        content = response.content
+        compressed = len(content) > MIN_COMPRESSED_SIZE
+        if compressed:
+            content = zlib.compress(content, COMPRESSION_LEVEL)
+        return cls(response.status_code, tuple(response.items()), content, compressed, fresh_until)
+
+    def to_response(self) -> HttpResponse:
+        """A new response with the stored status, headers and content, so each request can add its own headers"""
+        response = HttpResponse(
+            zlib.decompress(self.content) if self.compressed else self.content, status=self.status_code
+        )
+        for header, value in self.headers:
+            response[header] = value
+        return response
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.fresh_until is None or time.time() < self.fresh_until
+
+
+class LocalLRUCache:
+    """
+    Bounded, thread-safe, in-memory LRU cache of CachedResponses. Each entry is kept with the generation of the shared
+    cache it was copied from, and is only returned while that's still the current generation.
+    """
+
+    def __init__(self, max_entries: int, timeout: int):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, generation: Any = None) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            cached_response, expires_at, entry_generation = entry
+            if time.monotonic() >= expires_at or entry_generation != generation:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return cached_response
+
+    def set(self, key: str, cached_response: CachedResponse, generation: Any = None) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (cached_response, time.monotonic() + self.timeout, generation)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheStats:
+    """Counts and total latency of the responses of each endpoint, by how the cache served them (their Cache-Trace)"""
+
+    def __init__(self):
+        self._stats = defaultdict(lambda: defaultdict(lambda: {"count": 0, "total_seconds": 0.0}))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, cache_trace: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stats[endpoint][cache_trace]
+            stats["count"] += 1
+            stats["total_seconds"] += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                endpoint: {cache_trace: dict(stats) for cache_trace, stats in traces.items()}
+                for endpoint, traces in self._stats.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+
+class PopularRequests:
+    """
+    Counts of the requests made to cached endpoints, with what's needed to replay them. Each worker adds its counts
+    to the ones kept in the shared cache every API_CACHE_POPULAR_REQUESTS_FLUSH_SECONDS, where the most popular
+    requests are read by warm_usaspending_cache.
+    """
+
+    CACHE_KEY = "popular-requests"
+
+    def __init__(self, max_requests: int, flush_seconds: int):
+        self.max_requests = max_requests
+        self.flush_seconds = flush_seconds
+        self._requests = {}
+        self._next_flush = time.monotonic() + flush_seconds
+        self._lock = threading.Lock()
+
+    def record(self, key: str, request, cache) -> None:
+        if self.max_requests <= 0:
+            return
+        with self._lock:
+            if key in self._requests:
+                self._requests[key]["count"] += 1
+            else:
+                replay = _replayable_request(request)
+                if replay is None:
+                    return
+                self._requests[key] = {**replay, "count": 1}
+                if len(self._requests) > 2 * self.max_requests:
+                    self._requests = _most_popular(self._requests, self.max_requests)
+            if time.monotonic() < self._next_flush:
+                return
+            requests, self._requests = self._requests, {}
+            self._next_flush = time.monotonic() + self.flush_seconds
+        self.flush(requests, cache)
+
+    def flush(self, requests: dict, cache) -> None:
+        """Add the counts of the requests to the ones in the cache"""
+        lock_key = f"{self.CACHE_KEY}:lock"
+        try:
+            # Workers adding their counts at the same time would overwrite each other's, so one waits for the next time
+            if not cache.add(lock_key, True, 60):
+                return
+            try:
+                stored = cache.get(self.CACHE_KEY) or {}
+                for key, request in requests.items():
+                    count = stored[key]["count"] + request["count"] if key in stored else request["count"]
+                    stored[key] = {**request, "count": count}
+                cache.set(self.CACHE_KEY, _most_popular(stored, self.max_requests), None)
+            finally:
+                cache.delete(lock_key)
+        except Exception:
+            logger.exception("Problem while storing the counts of popular requests")
+
+
+def _replayable_request(request) -> Optional[dict]:
+    """The method, path and parameters of the request, or None if it's too big to keep"""
+    data = request.data.dict() if hasattr(request.data, "dict") else request.data
+    replay = {
+        "method": request.method,
+        "path": request.path,
+        "query_params": request.query_params.dict(),
+        "data": data,
+    }
+    if len(get_canonical_params(request)) > MAX_POPULAR_REQUEST_SIZE:
+        return None
+    return replay
+
+
+def _most_popular(requests: dict, limit: int) -> dict:
+    return dict(sorted(requests.items(), key=lambda item: item[1]["count"], reverse=True)[:limit])
+
+
+def get_popular_requests(cache, limit: int) -> List[dict]:
+    """The most popular requests, as counted in the cache, most popular first"""
+    return list(_most_popular(cache.get(PopularRequests.CACHE_KEY) or {}, limit).values())
+
+
+# Per worker process, shared by all cached endpoints
+local_response_cache = LocalLRUCache(settings.API_CACHE_LOCAL_MAX_ENTRIES, settings.API_CACHE_LOCAL_TIMEOUT_SECONDS)
+cache_stats = CacheStats()
+popular_requests = PopularRequests(
+    settings.API_CACHE_POPULAR_REQUESTS, settings.API_CACHE_POPULAR_REQUESTS_FLUSH_SECONDS
+)
+
+
 class CustomCacheResponse(CacheResponse):
+    """
+    Caches API responses in two tiers: a per-worker in-memory LRU cache (local_response_cache) in front of the shared
+    usaspending-cache. Only one request at a time computes a missing response, using a lock in the shared cache;
+    the others wait for its result. Expired responses are kept for API_CACHE_STALE_SECONDS more, and served to the
+    other requests while one recomputes them.
+
+    A hit in the local tier still reads the (small) generation of the shared cache, so responses are no longer
+    served by any worker once the shared cache is cleared.
+    """
+
+    def __init__(self, *args, cache=None, **kwargs):
+        super().__init__(*args, cache=cache, **kwargs)
+        self.cache_alias = cache or extensions_api_settings.DEFAULT_USE_CACHE
+        # The local tier would cache responses, and popular requests would be tracked for nothing, when caching is
+        # disabled
+        self.cache_enabled = not isinstance(self.cache, DummyCache)
+
     def process_cache_response(self, view_instance, view_method, request, args, kwargs):
         if is_experimental_elasticsearch_api(request):
             # bypass cache altogether
@@ -34,53 +259,162 @@ class CustomCacheResponse(CacheResponse):
             response = view_instance.finalize_response(request, response, *args, **kwargs)
             response["Cache-Trace"] = "no-cache"
             return response
+        start = time.perf_counter()
         key = self.calculate_key(
             view_instance=view_instance, view_method=view_method, request=request, args=args, kwargs=kwargs
         )
-        response = None
+        if self.cache_enabled:
+            popular_requests.record(key, request, self.cache)
+
+        response, cache_trace = self.get_cached_response(key, request)
+        if response is None:
+            response, cache_trace = self.compute_response_once(key, view_instance, view_method, request, args, kwargs)
+
+        if not hasattr(response, "_closable_objects"):
+            response._closable_objects = []
+
+        response["Cache-Trace"] = cache_trace
+        response["key"] = key
+        self.record_stats(request, cache_trace, time.perf_counter() - start)
+        return response
+
+    def get_cached_response(self, key, request) -> Tuple[Optional[Any], Optional[str]]:
+        """Return the fresh cached response with the key and how it was found, or (None, None)"""
+        local_key = f"{self.cache_alias}:{key}"
+        generation = None
+        if self.cache_enabled:
+            # Read before the response, so a response copied from an older generation is never kept as current
+            generation = self.get_cache_generation()
+            cached = local_response_cache.get(local_key, generation)
+            if cached and cached.is_fresh:
+                return cached.to_response(), "hit-local-cache"
+
+        cached = self.get_from_cache(key, request)
+        if cached and cached.is_fresh:
+            if self.cache_enabled:
+                local_response_cache.set(local_key, cached, generation)
+            return cached.to_response(), "hit-cache"
+        return None, None
+
+    def get_cache_generation(self) -> Any:
+        """The generation of the shared cache, or a value matching no local entry if it can't be read"""
+        try:
+            return self.cache.get(CACHE_GENERATION_KEY)
+        except Exception:
+            logger.exception("Problem while retrieving the cache generation")
+            return object()
+
+    def compute_response_once(self, key, view_instance, view_method, request, args, kwargs):
+        """
+        Compute the response if no other request is computing it. Otherwise serve the stale response, if there is
+        one, or wait for the other request's response
+        """
+        lock_key = f"{key}:lock"
+        lock_token = str(uuid.uuid4())
+        if self.acquire_lock(lock_key, lock_token):
+            try:
+                return self.compute_response(key, view_instance, view_method, request, args, kwargs)
+            finally:
+                self.release_lock(lock_key, lock_token)
+
+        cached = self.get_from_cache(key, request)
+        if cached:
+            return cached.to_response(), "hit-cache" if cached.is_fresh else "stale-cache"
+
+        wait_until = time.perf_counter() + settings.API_CACHE_LOCK_WAIT_SECONDS
+        while time.perf_counter() < wait_until:
+            time.sleep(LOCK_POLL_SECONDS)
+            cached = self.get_from_cache(key, request)
+            if cached:
+                return cached.to_response(), "hit-cache"
+            if not self.lock_exists(lock_key):
+                break  # The other request finished without caching its response, e.g. it was an error
+
+        return self.compute_response(key, view_instance, view_method, request, args, kwargs)
+
+    def compute_response(self, key, view_instance, view_method, request, args, kwargs):
+        response = view_method(view_instance, request, *args, **kwargs)
+        response = view_instance.finalize_response(request, response, *args, **kwargs)
+
+        # While returning a Queryset is functional most of the time, it isn't
+        # fully supported by Django Rest Framework. This check was inserted
+        # in local mode to catch if a Queryset is being returned by the view
+        # which could cause an exception when setting the cache
+        if settings.IS_LOCAL and response and not response.is_rendered:
+            if contains_queryset(response.data):
+                raise RuntimeError(
+                    "Your view is returning a QuerySet. QuerySets are not"
+                    " really designed to be pickled and can cause caching"
+                    " issues. Please materialize the QuerySet using a List"
+                    " or some other more primitive data structure."
+                )
+
+        cache_trace = "no-cache"
+        response.render()  # should be rendered, before its content is stored in the cache
+
+        if not response.status_code >= 400 or self.cache_errors:
+            if self.cache_errors:
+                logger.error(self.cache_errors)
+            try:
+                self.set_in_cache(key, response)
+                cache_trace = "set-cache"
+            except Exception:
+                msg = "Problem while writing to cache: path:'{p}' data:'{d}'"
+                logger.exception(msg.format(p=str(request.path), d=str(request.data)))
+
+        return response, cache_trace
+
+    def get_from_cache(self, key, request) -> Optional[CachedResponse]:
         try:
-            response = self.cache.get(key)
+            cached = self.cache.get(key)
         except Exception:
             msg = "Problem while retrieving key [{k}] from cache for path:'{p}'"
             logger.exception(msg.format(k=key, p=str(request.path)))
+            return None
+        if cached is not None and not isinstance(cached, CachedResponse):
+            return None  # Stored by an older version of the cache, and about to be replaced
+        return cached
 
-        if not response:
-            response = view_method(view_instance, request, *args, **kwargs)
-            response = view_instance.finalize_response(request, response, *args, **kwargs)
+    def set_in_cache(self, key, response) -> None:
+        if self.timeout is None:
+            cached, timeout = CachedResponse.from_response(response, None), None
+        else:
+            cached = CachedResponse.from_response(response, time.time() + self.timeout)
+            timeout = self.timeout + settings.API_CACHE_STALE_SECONDS
+        self.cache.set(key, cached, timeout)
+        if self.cache_enabled:
+            local_response_cache.set(f"{self.cache_alias}:{key}", cached, self.get_cache_generation())
 
-            # While returning a Queryset is functional most of the time, it isn't
-            # fully supported by Django Rest Framework. This check was inserted
-            # in local mode to catch if a Queryset is being returned by the view
-            # which could cause an exception when setting the cache
-            if settings.IS_LOCAL and response and not response.is_rendered:
-                if contains_queryset(response.data):
-                    raise RuntimeError(
-                        "Your view is returning a QuerySet. QuerySets are not"
-                        " really designed to be pickled and can cause caching"
-                        " issues. Please materialize the QuerySet using a List"
-                        " or some other more primitive data structure."
-                    )
+    def acquire_lock(self, lock_key, lock_token) -> bool:
+        try:
+            return self.cache.add(lock_key, lock_token, settings.API_CACHE_LOCK_TIMEOUT_SECONDS)
+        except Exception:
+            logger.exception(f"Problem while acquiring cache lock [{lock_key}]")
+            return True  # Compute the response rather than fail the request
 
-            response["Cache-Trace"] = "no-cache"
-            response.render()  # should be rendered, before pickling while storing to cache
-
-            if not response.status_code >= 400 or self.cache_errors:
-                if self.cache_errors:
-                    logger.error(self.cache_errors)
-                try:
-                    self.cache.set(key, response, self.timeout)
-                    response["Cache-Trace"] = "set-cache"
-                except Exception:
-                    msg = "Problem while writing to cache: path:'{p}' data:'{d}'"
-                    logger.exception(msg.format(p=str(request.path), d=str(request.data)))
-        else:
-            response["Cache-Trace"] = "hit-cache"
+    def lock_exists(self, lock_key) -> bool:
+        try:
+            return self.cache.get(lock_key) is not None
+        except Exception:
+            return False
 
-        if not hasattr(response, "_closable_objects"):
-            response._closable_objects = []
+    def release_lock(self, lock_key, lock_token) -> None:
+        try:
+            # Don't release a lock which expired and was taken by another request
+            if self.cache.get(lock_key) == lock_token:
+                self.cache.delete(lock_key)
+        except Exception:
+            logger.exception(f"Problem while releasing cache lock [{lock_key}]")
 
-        response["key"] = key
-        return response
+    @staticmethod
+    def record_stats(request, cache_trace, seconds) -> None:
+        # The URL pattern, so endpoints with ids in their path are counted together
+        endpoint = getattr(request.resolver_match, "route", None) or request.path
+        cache_stats.record(endpoint, cache_trace, seconds)
+        span = tracer.current_root_span()
+        if span:
+            span.set_tag("cache.trace", cache_trace)
+            span.set_tag("cache.seconds", seconds)
 
 
 cache_response = CustomCacheResponse
@@ -1,7 +1,10 @@
-from typing import Union, Optional
+from collections import Counter
+from threading import Lock
+from typing import Dict, Union, Optional
 
 import certifi
 import logging
+import os
 
 from django.conf import settings
 from elasticsearch import Elasticsearch
@@ -14,6 +17,12 @@ logger = logging.getLogger("console")
 CLIENT = None
 ElasticsearchResponse = Optional[Union[dict, Response]]
 
+# Clients shared by all API searches of a process, by alias. See get_search_client(...)
+_search_clients = {}
+_search_client_uses = Counter()
+_search_clients_lock = Lock()
+_search_clients_pid = None
+
 
 def instantiate_elasticsearch_client() -> Elasticsearch:
     es_kwargs = {"timeout": 300}
@@ -24,25 +33,111 @@ def instantiate_elasticsearch_client() -> Elasticsearch:
     return Elasticsearch(settings.ES_HOSTNAME, **es_kwargs)
 
 
-def create_es_client() -> Elasticsearch:
+def _search_client_config() -> dict:
     if settings.ES_HOSTNAME is None or settings.ES_HOSTNAME == "":
         logger.error("env var 'ES_HOSTNAME' needs to be set for Elasticsearch connection")
-    global CLIENT
     es_config = {"hosts": [settings.ES_HOSTNAME], "timeout": settings.ES_TIMEOUT}
+    # If the connection string is using SSL with localhost, disable verifying
+    # the certificates to allow testing in a development environment
+    # Also allow host.docker.internal, when SSH-tunneling on localhost to a remote nonprod instance over HTTPS
+    if settings.ES_HOSTNAME.startswith(("https://localhost", "https://host.docker.internal")):
+        logger.warning("SSL cert verification is disabled. Safe only for local development")
+        import urllib3
+
+        urllib3.disable_warnings()
+        ssl_context = create_ssl_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = CERT_NONE
+        es_config["ssl_context"] = ssl_context
+    return es_config
+
+
+def create_es_client() -> Elasticsearch:
+    global CLIENT
     try:
-        # If the connection string is using SSL with localhost, disable verifying
-        # the certificates to allow testing in a development environment
-        # Also allow host.docker.internal, when SSH-tunneling on localhost to a remote nonprod instance over HTTPS
-        if settings.ES_HOSTNAME.startswith(("https://localhost", "https://host.docker.internal")):
-            logger.warning("SSL cert verification is disabled. Safe only for local development")
-            import urllib3
-
-            urllib3.disable_warnings()
-            ssl_context = create_ssl_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = CERT_NONE
-            es_config["ssl_context"] = ssl_context
-
-        CLIENT = Elasticsearch(**es_config)
+        CLIENT = Elasticsearch(**_search_client_config())
     except Exception as e:
         logger.error("Error creating the elasticsearch client: {}".format(e))
+
+
+def get_search_client(alias: str = "default") -> Elasticsearch:
+    """
+        Return the client shared by every search made with ``alias`` in this process, creating it on first use.
+
+        Each client keeps a pool of up to ES_MAX_CONNECTIONS keep-alive connections per node, so searches
+        reuse open (TLS) connections instead of building a new client and pool each time. Clients are dropped
+        when the process forks, since connections can't be shared with a child process.
+    """
+    global _search_clients_lock, _search_clients_pid
+
+    if _search_clients_pid != os.getpid():
+        _search_clients.clear()
+        _search_client_uses.clear()
+        _search_clients_lock = Lock()  # may have been held by another thread of the parent when it forked
+        _search_clients_pid = os.getpid()
+
+    with _search_clients_lock:
+        client = _search_clients.get(alias)
+        if client is not None:
+            _search_client_uses[alias] += 1
+            return client
+
+    # Created without the lock, since sniffing a slow node would hold up the searches of every other thread
+    new_client = _create_search_client(alias)
+    if new_client is None:
+        return None
+    with _search_clients_lock:
+        client = _search_clients.setdefault(alias, new_client)  # unless another thread stored one first
+        _search_client_uses[alias] += 1
+    if client is not new_client:
+        new_client.transport.close()
+    return client
+
+
+def _create_search_client(alias: str) -> Optional[Elasticsearch]:
+    try:
+        es_config = _search_client_config()
+        es_config.update(
+            {
+                "maxsize": settings.ES_MAX_CONNECTIONS,
+                "sniff_on_start": settings.ES_SNIFF_ON_START,
+                "sniff_on_connection_fail": settings.ES_SNIFF_ON_CONNECTION_FAIL,
+                "sniffer_timeout": settings.ES_SNIFFER_TIMEOUT,
+            }
+        )
+        client = Elasticsearch(**es_config)
+    except Exception as e:
+        logger.error("Error creating the elasticsearch client: {}".format(e))
+        return None
+
+    logger.info(f"Created shared Elasticsearch client '{alias}' in process {os.getpid()}")
+    return client
+
+
+def get_search_client_stats() -> Dict[str, dict]:
+    """
+        Usage of the shared search clients of this process. ``uses`` counts the searches (and their copies)
+        handed a client. ``new_connections`` counts the connections (and TLS handshakes) opened to each node,
+        which should stay near ``pool_maxsize`` while ``requests`` keeps growing.
+    """
+    with _search_clients_lock:
+        clients = list(_search_clients.items())
+        uses = dict(_search_client_uses)
+
+    stats = {}
+    for alias, client in clients:
+        nodes = []
+        for connection in client.transport.connection_pool.connections:
+            pool = getattr(connection, "pool", None)  # only urllib3 based connections have a pool to inspect
+            if pool is None:
+                continue
+            nodes.append(
+                {
+                    "new_connections": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle_connections": pool.pool.qsize() if pool.pool else 0,
+                    "pool_maxsize": pool.pool.maxsize if pool.pool else 0,
+                }
+            )
+        stats[alias] = {"uses": uses.get(alias, 0), "nodes": nodes}
+    return stats
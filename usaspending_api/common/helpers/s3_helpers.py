@@ -3,13 +3,21 @@ import io
 import logging
 import math
 
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from django.conf import settings
 from pathlib import Path
-from typing import List
+from threading import BoundedSemaphore
+from typing import List, NamedTuple
 
 
 logger = logging.getLogger("script")
 
+# Smallest size S3 allows for every part of a multipart upload but the last
+S3_MIN_PART_SIZE = 5 * 1024 * 1024
+# Part size of streamed uploads. S3 allows at most 10,000 parts, so this supports objects of up to ~160GB
+S3_STREAMING_PART_SIZE = 16 * 1024 * 1024
+
 
 def retrieve_s3_bucket_object_list(bucket_name: str) -> List["boto3.resources.factory.s3.ObjectSummary"]:
     try:
@@ -41,6 +49,52 @@ def access_s3_object(bucket_name: str, obj: "boto3.resources.factory.s3.ObjectSu
     return data
 
 
+class FakeS3ObjectSummary(NamedTuple):
+    key: str
+    last_modified: datetime
+    size: int
+
+
+class _FakeFileBackedS3ObjectCollection:
+    def __init__(self, root: Path):
+        self._root = root
+
+    def all(self) -> List[FakeS3ObjectSummary]:
+        return self.filter()
+
+    def filter(self, Prefix: str = "") -> List[FakeS3ObjectSummary]:  # noqa
+        objects = []
+        for path in sorted(self._root.rglob("*")):
+            key = path.relative_to(self._root).as_posix()
+            if path.is_file() and key.startswith(Prefix):
+                stat = path.stat()
+                objects.append(
+                    FakeS3ObjectSummary(key, datetime.fromtimestamp(stat.st_mtime, timezone.utc), stat.st_size)
+                )
+        return objects
+
+
+class FakeFileBackedS3Bucket:
+    """
+    Fakes the portions of a boto3 S3 resource ``Bucket`` object used to read files, with the files of a local
+    directory as the objects of the bucket. Keys are the paths of the files relative to the directory, and the last
+    modified date of an object is the modification time of its file.
+    """
+
+    def __init__(self, path: str):
+        self.name = str(path)
+        self._root = Path(path)
+        self.objects = _FakeFileBackedS3ObjectCollection(self._root)
+
+    def download_fileobj(self, Key: str, Fileobj) -> None:  # noqa
+        with open(self._root / Key, "rb") as source:
+            Fileobj.write(source.read())
+
+    def download_file(self, Key: str, Filename: str) -> None:  # noqa
+        with open(Filename, "wb") as destination:
+            self.download_fileobj(Key, destination)
+
+
 def upload_download_file_to_s3(file_path):
     bucket = settings.BULK_DOWNLOAD_S3_BUCKET_NAME
     region = settings.USASPENDING_AWS_REGION
@@ -55,3 +109,107 @@ def multipart_upload(bucketname, regionname, source_path, keyname):
     config = boto3.s3.transfer.TransferConfig(multipart_chunksize=bytes_per_chunk)
     transfer = boto3.s3.transfer.S3Transfer(s3client, config)
     transfer.upload_file(source_path, bucketname, Path(keyname).name, extra_args={"ACL": "bucket-owner-full-control"})
+
+
+class MultipartUploadFile(io.RawIOBase):
+    """
+    Write-only, unseekable file which streams its contents to an S3 object with a multipart upload, so the object
+    can be uploaded while it's still being generated and never has to exist on local disk.
+
+    Data is uploaded in parts of ``part_size`` bytes by a pool of ``threads``. Writes block while ``max_buffered_parts``
+    parts are waiting to be uploaded, which bounds the memory used to about part_size * (max_buffered_parts + 1).
+    Closing the file completes the upload, unless abort() was called first (as done when leaving a ``with`` block
+    because of an exception), in which case no object is created.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        region_name: str,
+        key_name: str,
+        part_size: int = S3_STREAMING_PART_SIZE,
+        threads: int = 4,
+        max_buffered_parts: int = 8,
+    ):
+        super().__init__()
+        if part_size < S3_MIN_PART_SIZE:
+            raise ValueError(f"S3 multipart upload parts must be at least {S3_MIN_PART_SIZE:,} bytes")
+        self.bucket_name = bucket_name
+        self.key_name = key_name
+        self.part_size = part_size
+        self._s3_client = boto3.client("s3", region_name=region_name)
+        self._executor = ThreadPoolExecutor(max_workers=threads)
+        self._part_slots = BoundedSemaphore(max_buffered_parts)
+        self._buffer = bytearray()
+        self._parts = []
+        self._size = 0
+        self._aborted = False
+        self._upload_id = self._s3_client.create_multipart_upload(
+            Bucket=bucket_name, Key=key_name, ACL="bucket-owner-full-control"
+        )["UploadId"]
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            self.abort()
+        self.close()
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._size
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        self._size += len(data)
+        while len(self._buffer) >= self.part_size:
+            self._upload_part(bytes(self._buffer[: self.part_size]))
+            del self._buffer[: self.part_size]
+        return len(data)
+
+    def _upload_part(self, data: bytes) -> None:
+        self._part_slots.acquire()
+        part_number = len(self._parts) + 1
+        future = self._executor.submit(self._send_part, part_number, data)
+        self._parts.append(future)
+
+    def _send_part(self, part_number: int, data: bytes) -> dict:
+        try:
+            response = self._s3_client.upload_part(
+                Bucket=self.bucket_name, Key=self.key_name, UploadId=self._upload_id, PartNumber=part_number, Body=data
+            )
+            return {"ETag": response["ETag"], "PartNumber": part_number}
+        finally:
+            self._part_slots.release()
+
+    def abort(self) -> None:
+        if self._aborted or self.closed:
+            return
+        self._aborted = True
+        self._executor.shutdown()
+        self._s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=self.key_name, UploadId=self._upload_id)
+        logger.warning(f"Aborted multipart upload of s3://{self.bucket_name}/{self.key_name}")
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if not self._aborted:
+                # The last part is the only one allowed to be smaller than the minimum part size
+                if self._buffer or not self._parts:
+                    self._upload_part(bytes(self._buffer))
+                    self._buffer.clear()
+                try:
+                    parts = [future.result() for future in self._parts]
+                except Exception:
+                    self.abort()
+                    raise
+                self._executor.shutdown()
+                self._s3_client.complete_multipart_upload(
+                    Bucket=self.bucket_name,
+                    Key=self.key_name,
+                    UploadId=self._upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+        finally:
+            super().close()
@@ -1,12 +1,18 @@
 import logging
+import uuid
+
 from django.core.management.base import BaseCommand
 from django.core.cache import caches
 
+from usaspending_api.common.cache_decorator import CACHE_GENERATION_KEY
+
 
 class Command(BaseCommand):
     """
     This command will clear the usaspending-cache (useful after a load or a deletion
-    to ensure end users don't see stale data)
+    to ensure end users don't see stale data). Cached responses are replaced anyway once
+    the data they depend on is loaded, for loads recorded in external_data_load_date. A new cache
+    generation is stored, so the API workers also drop the responses held in their local cache
     """
 
     help = "Clears the usaspending-cache"
@@ -16,4 +22,5 @@ class Command(BaseCommand):
         self.logger.info("Clearing usaspending-cache...")
         cache = caches["usaspending-cache"]
         cache.clear()
+        cache.set(CACHE_GENERATION_KEY, uuid.uuid4().hex, None)
         self.logger.info("Done.")
@@ -0,0 +1,63 @@
+import json
+import logging
+
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils.http import urlencode
+from time import perf_counter
+
+from usaspending_api.common.cache_decorator import get_popular_requests
+
+
+class Command(BaseCommand):
+    """
+    This command replays the most popular requests of the cached API endpoints, as counted by the API workers, so
+    their responses are in the usaspending-cache again for the newly loaded data (useful after a load)
+    """
+
+    help = "Warms the usaspending-cache by replaying the most popular API requests"
+    logger = logging.getLogger("console")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100, help="Number of the most popular requests to replay")
+
+    def handle(self, *args, **options):
+        cache = caches["usaspending-cache"]
+        if isinstance(cache, DummyCache):
+            self.logger.warning("The usaspending-cache is disabled, so there is nothing to warm")
+            return
+
+        popular_requests = get_popular_requests(cache, options["count"])
+        self.logger.info(f"Replaying the {len(popular_requests):,} most popular requests...")
+
+        client = Client()
+        failures = 0
+        for popular_request in popular_requests:
+            description = f"{popular_request['method']} {popular_request['path']}"
+            start = perf_counter()
+            try:
+                response = replay_request(client, popular_request)
+            except Exception:
+                self.logger.exception(f"{description} failed")
+                failures += 1
+                continue
+            if response.status_code >= 400:
+                failures += 1
+            self.logger.info(
+                f"{description}: {response.status_code} {response.get('Cache-Trace', '')} in {perf_counter() - start:.2f}s"
+            )
+
+        self.logger.info(f"Done. {len(popular_requests) - failures:,} responses cached, {failures:,} failed.")
+
+
+def replay_request(client, popular_request):
+    path = popular_request["path"]
+    if popular_request["method"] == "GET":
+        return client.get(path, popular_request["query_params"])
+    if popular_request["query_params"]:
+        path = f"{path}?{urlencode(popular_request['query_params'])}"
+    return client.generic(
+        popular_request["method"], path, json.dumps(popular_request["data"]), content_type="application/json"
+    )
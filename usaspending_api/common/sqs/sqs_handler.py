@@ -38,6 +38,9 @@ class _FakeFileBackedSQSQueue:
 
     _instance_state_memento = None
 
+    # Fake queues by URL, so their messages can find the queue to be deleted from
+    _queues_by_url = {}
+
     def __new__(cls, *args, **kwargs):
         """Implementation of the Singleton pattern from:
         https://www.python.org/download/releases/2.2.3/descrintro/#__new__
@@ -60,6 +63,7 @@ class _FakeFileBackedSQSQueue:
             queue_url = self._FAKE_QUEUE_URL
         self.max_receive_count = max_receive_count
         self.queue_url = queue_url
+        _FakeFileBackedSQSQueue._queues_by_url[self.url] = self
         FAKE_QUEUE_DATA_PATH.mkdir(parents=True, exist_ok=True)
         # The local queue can live on with data. Don't recreate unless it doesn't exist
         if not pathlib.Path(self._QUEUE_DATA_FILE).exists():
@@ -72,6 +76,27 @@ class _FakeFileBackedSQSQueue:
     def instance(cls, *args, **kwargs):
         return cls.__new__(cls, args, kwargs)
 
+    @classmethod
+    def lane_instance(cls, lane: str):
+        """Singleton instance of a separate queue for the given lane, named and backed by a file after this queue.
+        Used to fake the queue of each lane of work when a consumer polls more than one queue.
+        """
+        lanes = cls.__dict__.get("__lanes__")
+        if lanes is None:
+            cls.__lanes__ = lanes = {}
+        it = lanes.get(lane)
+        if it is None:
+            lanes[lane] = it = object.__new__(cls)
+            it._FAKE_QUEUE_URL = f"{cls._FAKE_QUEUE_URL}-{lane}"
+            it._QUEUE_DATA_FILE = cls._QUEUE_DATA_FILE.replace(".pickle", f"-{lane}.pickle")
+            it._init()
+        return it
+
+    @classmethod
+    def lane_instances(cls) -> list:
+        """All lane instances of this queue created so far"""
+        return list(cls.__dict__.get("__lanes__", {}).values())
+
     def reset_instance_state(self):
         """Because multiple tests in a single test session may be using the same FAKE_QUEUE instance, this method can
            and should be used to reset any changed state/config on the queue back to its original state when it was
@@ -83,41 +108,36 @@ class _FakeFileBackedSQSQueue:
             raise ValueError("Prior instance state to restore was not saved. Saved instance state is None")
         self.__dict__.update(self._instance_state_memento)
 
-    @classmethod
-    def _enqueue(cls, msg: FakeSQSMessage):
-        with FileLock(cls._QUEUE_DATA_FILE + ".lock"):
-            with open(cls._QUEUE_DATA_FILE, "r+b") as queue_data_file:
+    def _enqueue(self, msg: FakeSQSMessage):
+        with FileLock(self._QUEUE_DATA_FILE + ".lock"):
+            with open(self._QUEUE_DATA_FILE, "r+b") as queue_data_file:
                 messages = pickle.load(queue_data_file)
             messages.appendleft(msg)
-            with open(cls._QUEUE_DATA_FILE, "w+b") as queue_data_file:
+            with open(self._QUEUE_DATA_FILE, "w+b") as queue_data_file:
                 pickle.dump(messages, queue_data_file, protocol=pickle.HIGHEST_PROTOCOL)
 
-    @classmethod
-    def _remove(cls, msg: FakeSQSMessage):
-        with FileLock(cls._QUEUE_DATA_FILE + ".lock"):
-            with open(cls._QUEUE_DATA_FILE, "r+b") as queue_data_file:
+    def _remove(self, msg: FakeSQSMessage):
+        with FileLock(self._QUEUE_DATA_FILE + ".lock"):
+            with open(self._QUEUE_DATA_FILE, "r+b") as queue_data_file:
                 messages = pickle.load(queue_data_file)
             messages.remove(msg)
-            with open(cls._QUEUE_DATA_FILE, "w+b") as queue_data_file:
+            with open(self._QUEUE_DATA_FILE, "w+b") as queue_data_file:
                 pickle.dump(messages, queue_data_file, protocol=pickle.HIGHEST_PROTOCOL)
 
-    @classmethod
-    def _messages(cls) -> deque:
-        with open(cls._QUEUE_DATA_FILE, "rb") as queue_data_file:
+    def _messages(self) -> deque:
+        with open(self._QUEUE_DATA_FILE, "rb") as queue_data_file:
             messages = pickle.load(queue_data_file)
             return messages
 
-    @classmethod
-    def send_message(cls, MessageBody: str, MessageAttributes: dict = None):  # noqa
-        msg = FakeSQSMessage(cls._FAKE_QUEUE_URL)
+    def send_message(self, MessageBody: str, MessageAttributes: dict = None):  # noqa
+        msg = FakeSQSMessage(self.url)
         msg.body = MessageBody
         msg.message_attributes = MessageAttributes
-        cls._enqueue(msg)
+        self._enqueue(msg)
         return {"ResponseMetadata": {"HTTPStatusCode": 200}}
 
-    @classmethod
     def receive_messages(
-        cls,
+        self,
         WaitTimeSeconds,  # noqa
         AttributeNames=None,  # noqa
         MessageAttributeNames=None,  # noqa
@@ -125,14 +145,13 @@ class _FakeFileBackedSQSQueue:
         MaxNumberOfMessages=1,  # noqa
     ) -> List[FakeSQSMessage]:
         # Limit returned messages by MaxNumberOfMessages: start=0, stop=MaxNumberOfMessages
-        with open(cls._QUEUE_DATA_FILE, "rb") as queue_data_file:
+        with open(self._QUEUE_DATA_FILE, "rb") as queue_data_file:
             messages_to_recv = pickle.load(queue_data_file)
         messages_to_recv.reverse()
         return list(islice(messages_to_recv, 0, MaxNumberOfMessages))
 
-    @classmethod
-    def purge(cls):
-        with open(cls._QUEUE_DATA_FILE, "w+b") as queue_data_file:
+    def purge(self):
+        with open(self._QUEUE_DATA_FILE, "w+b") as queue_data_file:
             pickle.dump(deque([]), queue_data_file, protocol=pickle.HIGHEST_PROTOCOL)
 
     @property
@@ -217,10 +236,8 @@ class FakeSQSMessage:
     def delete(self):
         if self.queue_url == _FakeStatelessLoggingSQSDeadLetterQueue.url:
             pass  # not a persistent queue
-        elif self.queue_url == _FakeFileBackedSQSQueue.instance().url:
-            _FakeFileBackedSQSQueue.instance()._remove(self)
-        elif self.queue_url == _FakeUnitTestFileBackedSQSQueue.instance().url:
-            _FakeUnitTestFileBackedSQSQueue.instance()._remove(self)
+        elif self.queue_url in _FakeFileBackedSQSQueue._queues_by_url:
+            _FakeFileBackedSQSQueue._queues_by_url[self.queue_url]._remove(self)
         else:
             raise ValueError(
                 f"Cannot locate queue instance with url = {self.queue_url}, from which to delete the message"
@@ -242,6 +259,8 @@ def get_sqs_queue(region_name=settings.USASPENDING_AWS_REGION, queue_name=settin
         # different processes or threads, are accessing the same queue data
         if queue_name == UNITTEST_FAKE_DEAD_LETTER_QUEUE_NAME:
             return _FakeStatelessLoggingSQSDeadLetterQueue()
+        if queue_name and queue_name == settings.BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME:
+            return _FakeFileBackedSQSQueue.lane_instance(queue_name)
         return _FakeFileBackedSQSQueue.instance()
     else:
         # stuff that's in get_queue
@@ -8,6 +8,8 @@ import signal
 import time
 import multiprocessing as mp
 
+from typing import Any, List, NamedTuple
+
 from botocore.exceptions import ClientError, EndpointConnectionError, NoCredentialsError, NoRegionError
 
 from usaspending_api.common.sqs.queue_exceptions import (
@@ -36,6 +38,41 @@ BSD_SIGNALS = {
 }
 
 
+class QueueLane(NamedTuple):
+    """A lane of work for a SQSWorkDispatcher, with its own SQS queue, polled first in proportion to its weight"""
+
+    name: str
+    queue: Any  # SQS.Queue
+    weight: int = 1
+
+
+class QueueLanes:
+    """ The lanes of work a SQSWorkDispatcher receives messages from, e.g. one lane of small jobs and one of large
+        jobs, so that small jobs don't wait behind large ones.
+
+        Lanes take turns being polled first in proportion to their weights, using the smooth weighted round-robin of
+        nginx: a lane of weight 3 goes first three times for each time a lane of weight 1 does, with the turns spread
+        out rather than bunched together. Keep using the same instance across dispatchers so the turns carry over from
+        one message to the next.
+    """
+
+    def __init__(self, lanes: List[QueueLane]):
+        if not lanes:
+            raise ValueError("At least one lane is needed to receive messages from")
+        if any(lane.weight < 1 for lane in lanes):
+            raise ValueError("The weight of each lane must be at least 1")
+        self.lanes = list(lanes)
+        self._current_weights = [0] * len(self.lanes)
+
+    def next_poll_order(self) -> List[QueueLane]:
+        """The lanes in the order they should be polled for the next message"""
+        for i, lane in enumerate(self.lanes):
+            self._current_weights[i] += lane.weight
+        order = sorted(range(len(self.lanes)), key=lambda i: self._current_weights[i], reverse=True)
+        self._current_weights[order[0]] -= sum(lane.weight for lane in self.lanes)
+        return [self.lanes[i] for i in order]
+
+
 class SQSWorkDispatcher:
     """ SQSWorkDispatcher object that is used to pull work from an SQS queue, and then dispatch it to be
         executed on a child worker process.
@@ -71,7 +108,9 @@ class SQSWorkDispatcher:
     ):
         """
             Args:
-                sqs_queue_instance (SQS.Queue): the SQS queue to get work from
+                sqs_queue_instance (SQS.Queue or QueueLanes): the SQS queue to get work from, or the lanes of work
+                    whose queues are polled in turn. While a message is being worked on, ``sqs_queue_instance`` is the
+                    queue of the lane the message came from
                 worker_process_name (str): the name to give to the worker process. It will use the name of the callable
                     job to be executed if not provided
                 default_visibility_timeout (int): how long until the message is made visible in the queue again,
@@ -92,7 +131,12 @@ class SQSWorkDispatcher:
                     allowing the creation of grandchild processes from the dispatcher's child worker process.
         """
         self._logger = logging.getLogger(__name__ + "." + self.__class__.__name__)
-        self.sqs_queue_instance = sqs_queue_instance
+        if isinstance(sqs_queue_instance, QueueLanes):
+            self._queue_lanes = sqs_queue_instance
+        else:
+            self._queue_lanes = QueueLanes([QueueLane("default", sqs_queue_instance)])
+        self.sqs_queue_instance = self._queue_lanes.lanes[0].queue
+        self.current_lane = None
         self.worker_process_name = worker_process_name
         self._default_visibility_timeout = default_visibility_timeout
         self._monitor_sleep_time = monitor_sleep_time
@@ -419,11 +463,17 @@ class SQSWorkDispatcher:
         """ Attempt to get a single message from the queue.
 
             It will set this message in the `self._current_sqs_message` field if received, otherwise it leaves that None
+            When there are several lanes, the message comes from the first lane in polling order that has one
 
             Args:
                 wait_time: If no message is readily available, wait for this many seconds for one to arrive before
                     returning
         """
+        lanes = self._queue_lanes.next_poll_order()
+        if len(lanes) > 1:
+            # Waiting on one lane would hold up messages arriving on the others, so each is short-polled instead
+            wait_time = 0
+
         try:
             # NOTE: Forcing MaxNumberOfMessages=1
             # This will pull at most 1 message off the queue, or no messages. This dispatcher is built to dispatch
@@ -433,13 +483,18 @@ class SQSWorkDispatcher:
             # This may not be an ideal configuration for jobs that may expect to complete with sub-second performance,
             # and handle a massive amount of message-throughput (e.g. 10+ messages/second, or 1M+ messages/day),
             # where the added latency of connecting to the queue to fetch each message could add up.
-            received_messages = self.sqs_queue_instance.receive_messages(
-                WaitTimeSeconds=wait_time,
-                AttributeNames=["All"],
-                MessageAttributeNames=["All"],
-                VisibilityTimeout=self._default_visibility_timeout,
-                MaxNumberOfMessages=1,
-            )
+            for lane in lanes:
+                received_messages = lane.queue.receive_messages(
+                    WaitTimeSeconds=wait_time,
+                    AttributeNames=["All"],
+                    MessageAttributeNames=["All"],
+                    VisibilityTimeout=self._default_visibility_timeout,
+                    MaxNumberOfMessages=1,
+                )
+                if received_messages:
+                    self.sqs_queue_instance = lane.queue
+                    self.current_lane = lane.name
+                    break
         except (EndpointConnectionError, ClientError, NoCredentialsError, NoRegionError) as conn_exc:
             log_dispatcher_message(
                 self, message="SQS connection issue. See Traceback and investigate settings", is_exception=True,
@@ -455,7 +510,11 @@ class SQSWorkDispatcher:
 
         if received_messages:
             self._current_sqs_message = received_messages[0]
-            log_dispatcher_message(self, message="Message received: {}".format(self._current_sqs_message.body))
+            if len(lanes) > 1:
+                message = "Message received in the {} lane: {}".format(self.current_lane, self._current_sqs_message.body)
+            else:
+                message = "Message received: {}".format(self._current_sqs_message.body)
+            log_dispatcher_message(self, message=message)
 
     def delete_message_from_queue(self):
         """ Deletes the message from SQS. This is usually treated as a *successful* culmination of message handling,
@@ -0,0 +1,83 @@
+import pytest
+
+from datetime import datetime, timezone
+from django.core.cache import caches
+from django.core.management import call_command
+from rest_framework.test import APIRequestFactory
+
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE
+from usaspending_api.broker.models import ExternalDataType
+from usaspending_api.common.cache import clear_data_versions, get_data_versions, usaspending_key_func
+from usaspending_api.common.cache_decorator import PopularRequests
+from usaspending_api.common.management.commands import warm_usaspending_cache
+from usaspending_api.references.v2.views.glossary import GlossaryViewSet
+from usaspending_api.search.v2.views.spending_by_award import SpendingByAwardVisualizationViewSet
+
+LOAD_DATE = datetime(2020, 10, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def data_versions(db, settings):
+    settings.API_CACHE_DATA_VERSION_SECONDS = 0
+    for edt in EXTERNAL_DATA_TYPE:
+        # Some types are already added by migration
+        ExternalDataType.objects.get_or_create(
+            external_data_type_id=edt.id, defaults={"name": edt.name, "description": edt.desc}
+        )
+        update_last_load_date(edt.name, LOAD_DATE)
+    clear_data_versions()
+    yield
+    clear_data_versions()
+
+
+def _cache_key(view_class):
+    request = APIRequestFactory().post("/api/v2/test/", {"filters": {}}, format="json")
+    view_instance = view_class()
+    request = view_instance.initialize_request(request)
+    return usaspending_key_func(
+        view_instance=view_instance, view_method=view_instance.post, request=request, args=(), kwargs={}
+    )
+
+
+def test_get_data_versions(data_versions):
+    assert get_data_versions(["fpds", "reference_data"]) == {
+        "fpds": LOAD_DATE.isoformat(),
+        "reference_data": LOAD_DATE.isoformat(),
+    }
+    assert set(get_data_versions()) == {edt.name for edt in EXTERNAL_DATA_TYPE}
+
+
+def test_cache_keys_change_with_the_data_the_view_depends_on(data_versions):
+    glossary_key = _cache_key(GlossaryViewSet)
+    spending_by_award_key = _cache_key(SpendingByAwardVisualizationViewSet)
+
+    update_last_load_date("fpds", datetime(2020, 10, 2, tzinfo=timezone.utc))
+    assert _cache_key(GlossaryViewSet) == glossary_key
+    assert _cache_key(SpendingByAwardVisualizationViewSet) != spending_by_award_key
+
+    update_last_load_date("reference_data", datetime(2020, 10, 2, tzinfo=timezone.utc))
+    assert _cache_key(GlossaryViewSet) != glossary_key
+
+
+def test_warm_usaspending_cache(data_versions, monkeypatch):
+    cache = caches["default"]
+    cache.clear()
+    monkeypatch.setattr(warm_usaspending_cache, "caches", {"usaspending-cache": cache})
+    replayed = []
+    monkeypatch.setattr(
+        warm_usaspending_cache, "replay_request", lambda client, request: replayed.append(request) or client.get("/")
+    )
+    popular_requests = PopularRequests(max_requests=10, flush_seconds=0)
+    popular_requests.flush(
+        {
+            "a": {"method": "GET", "path": "/api/v2/a/", "query_params": {}, "data": {}, "count": 1},
+            "b": {"method": "POST", "path": "/api/v2/b/", "query_params": {}, "data": {"x": 1}, "count": 5},
+        },
+        cache,
+    )
+
+    call_command("warm_usaspending_cache", count=1)
+
+    assert [request["path"] for request in replayed] == ["/api/v2/b/"]
+    cache.clear()
@@ -0,0 +1,221 @@
+import json
+import pytest
+import threading
+import time
+
+from django.core.cache import caches
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from usaspending_api.views import StatusView
+
+from usaspending_api.common.cache import get_canonical_params
+from usaspending_api.common.cache_decorator import (
+    CACHE_GENERATION_KEY,
+    CachedResponse,
+    CustomCacheResponse,
+    LocalLRUCache,
+    PopularRequests,
+    cache_stats,
+    get_popular_requests,
+    local_response_cache,
+)
+
+
+class _CountingView(APIView):
+    calls = 0
+
+    @CustomCacheResponse(timeout=60, cache="default")
+    def get(self, request):
+        _CountingView.calls += 1
+        return Response({"calls": _CountingView.calls})
+
+
+@pytest.fixture
+def counting_view():
+    caches["default"].clear()
+    local_response_cache.clear()
+    cache_stats.reset()
+    _CountingView.calls = 0
+    yield _CountingView.as_view()
+    caches["default"].clear()
+    local_response_cache.clear()
+
+
+def _get(view):
+    response = view(APIRequestFactory().get("/api/v2/cached/"))
+    return json.loads(response.content), response["Cache-Trace"]
+
+
+def _key():
+    response = _CountingView.as_view()(APIRequestFactory().get("/api/v2/cached/"))
+    return response["key"]
+
+
+def _set_cached_response(key, data, fresh_until):
+    caches["default"].set(key, CachedResponse(200, (), json.dumps(data).encode(), False, fresh_until))
+    local_response_cache.clear()
+
+
+def _cached(content):
+    return CachedResponse(200, (), content, False, None)
+
+
+def test_local_lru_cache_evicts_least_recently_used():
+    cache = LocalLRUCache(max_entries=2, timeout=60)
+    cache.set("a", _cached(b"A"))
+    cache.set("b", _cached(b"B"))
+    cache.get("a")
+    cache.set("c", _cached(b"C"))
+
+    assert cache.get("a").content == b"A"
+    assert cache.get("b") is None
+    assert cache.get("c").content == b"C"
+
+
+def test_local_lru_cache_expires_entries():
+    cache = LocalLRUCache(max_entries=2, timeout=0)
+    cache.set("a", _cached(b"A"))
+    assert cache.get("a") is None
+
+
+def test_local_lru_cache_checks_generation():
+    cache = LocalLRUCache(max_entries=2, timeout=60)
+    cache.set("a", _cached(b"A"), "1")
+    assert cache.get("a", "1").content == b"A"
+    assert cache.get("a", "2") is None
+    assert cache.get("a", "1") is None
+
+
+def test_cached_response_round_trip():
+    data = {"results": [{"id": i, "name": f"Result {i}"} for i in range(1000)]}
+    response = Response(data, status=201, headers={"X-Test": "test"})
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = "application/json"
+    response.renderer_context = {}
+    response.render()
+
+    cached = CachedResponse.from_response(response, None)
+    assert cached.compressed
+    assert len(cached.content) < len(response.content)
+
+    restored = cached.to_response()
+    assert restored.status_code == 201
+    assert restored["Content-Type"] == "application/json"
+    assert restored["X-Test"] == "test"
+    assert json.loads(restored.content) == data
+
+
+def test_canonical_params_ignore_parameter_order():
+    def canonical_params(data):
+        request = APIView().initialize_request(APIRequestFactory().post("/api/v2/test/", data, format="json"))
+        return get_canonical_params(request)
+
+    assert canonical_params({"filters": {"a": [2, 1], "b": 1}, "page": 1}) == canonical_params(
+        {"page": 1, "filters": {"b": 1, "a": [1, 2]}}
+    )
+    assert canonical_params({"filters": {"a": [1]}}) != canonical_params({"filters": {"a": [2]}})
+
+
+def test_two_tier_cache(counting_view):
+    assert _get(counting_view) == ({"calls": 1}, "set-cache")
+    assert _get(counting_view) == ({"calls": 1}, "hit-local-cache")
+
+    local_response_cache.clear()
+    assert _get(counting_view) == ({"calls": 1}, "hit-cache")
+
+    stats = cache_stats.snapshot()["/api/v2/cached/"]
+    assert {cache_trace: trace_stats["count"] for cache_trace, trace_stats in stats.items()} == {
+        "set-cache": 1,
+        "hit-local-cache": 1,
+        "hit-cache": 1,
+    }
+
+
+def test_local_cache_not_used_after_shared_cache_cleared(counting_view):
+    assert _get(counting_view) == ({"calls": 1}, "set-cache")
+    assert _get(counting_view) == ({"calls": 1}, "hit-local-cache")
+
+    # As clear_usaspending_cache, run in another process, does
+    caches["default"].clear()
+    caches["default"].set(CACHE_GENERATION_KEY, "new", None)
+    assert _get(counting_view) == ({"calls": 2}, "set-cache")
+    assert _get(counting_view) == ({"calls": 2}, "hit-local-cache")
+
+
+def test_cache_stats_in_status_view(counting_view, settings):
+    _get(counting_view)
+    response = StatusView.as_view()(APIRequestFactory().get("/api/v2/status/", {"cache_stats": ""}))
+    assert "cache_stats" not in json.loads(response.content)
+
+    settings.STATUS_PROCESS_STATS = True
+    response = StatusView.as_view()(APIRequestFactory().get("/api/v2/status/", {"cache_stats": ""}))
+    stats = json.loads(response.content)["cache_stats"]
+    assert stats["per_process"] is True
+    assert stats["endpoints"]["/api/v2/cached/"]["set-cache"]["count"] == 1
+
+
+def test_stale_response_served_while_recomputed(counting_view):
+    key = _key()
+    _set_cached_response(key, {"calls": 1}, time.time() - 1)
+
+    # Another request holds the lock, so the stale response is served
+    caches["default"].add(f"{key}:lock", "other request")
+    assert _get(counting_view) == ({"calls": 1}, "stale-cache")
+
+    # Without the lock, the stale response is recomputed
+    caches["default"].delete(f"{key}:lock")
+    assert _get(counting_view) == ({"calls": 2}, "set-cache")
+
+
+def test_waits_for_response_computed_by_another_request(counting_view, settings):
+    settings.API_CACHE_LOCK_WAIT_SECONDS = 5
+    key = _key()
+    caches["default"].clear()
+    local_response_cache.clear()
+    caches["default"].add(f"{key}:lock", "other request")
+
+    other_request = threading.Timer(0.3, _set_cached_response, args=(key, {"calls": 1}, time.time() + 60))
+    other_request.start()
+    result = _get(counting_view)
+    other_request.join()
+
+    assert result == ({"calls": 1}, "hit-cache")
+    assert _CountingView.calls == 1
+
+
+def test_computes_response_when_wait_times_out(counting_view, settings):
+    settings.API_CACHE_LOCK_WAIT_SECONDS = 0
+    key = _key()
+    caches["default"].clear()
+    local_response_cache.clear()
+    caches["default"].add(f"{key}:lock", "other request")
+
+    assert _get(counting_view) == ({"calls": 2}, "set-cache")
+
+
+def test_popular_requests(counting_view):
+    popular_requests = PopularRequests(max_requests=2, flush_seconds=0)
+    factory = APIRequestFactory()
+    requests = [
+        (factory.get("/api/v2/a/", {"page": "1"}), 3),
+        (factory.post("/api/v2/b/", {"filters": {"keywords": ["test"]}}, format="json"), 2),
+        (factory.get("/api/v2/c/"), 1),
+    ]
+    for request, count in requests:
+        request = APIView().initialize_request(request)
+        for _ in range(count):
+            popular_requests.record(request.path, request, caches["default"])
+
+    assert get_popular_requests(caches["default"], 5) == [
+        {"method": "GET", "path": "/api/v2/a/", "query_params": {"page": "1"}, "data": {}, "count": 3},
+        {
+            "method": "POST",
+            "path": "/api/v2/b/",
+            "query_params": {},
+            "data": {"filters": {"keywords": ["test"]}},
+            "count": 2,
+        },
+    ]
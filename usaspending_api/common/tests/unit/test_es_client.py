@@ -0,0 +1,83 @@
+import json
+import pytest
+
+from collections import Counter
+from django.test import RequestFactory
+
+from usaspending_api.common.elasticsearch import client
+from usaspending_api.common.elasticsearch.client import get_search_client, get_search_client_stats
+from usaspending_api.common.elasticsearch.search_wrappers import AwardSearch, TransactionSearch
+from usaspending_api.views import StatusView
+
+
+@pytest.fixture
+def search_clients(settings, monkeypatch):
+    settings.ES_HOSTNAME = "http://localhost:9200"
+    settings.ES_MAX_CONNECTIONS = 3
+    monkeypatch.setattr(client, "_search_clients", {})
+    monkeypatch.setattr(client, "_search_client_uses", Counter())
+    monkeypatch.setattr(client, "_search_clients_pid", None)
+    yield
+
+
+def test_search_client_is_shared_per_alias(search_clients):
+    awards_client = get_search_client("awards")
+
+    assert get_search_client("awards") is awards_client
+    assert get_search_client("transactions") is not awards_client
+    assert AwardSearch()._using is awards_client
+    assert TransactionSearch()._using is get_search_client("transactions")
+
+
+def test_search_client_is_recreated_after_fork(search_clients, monkeypatch):
+    parent_client = get_search_client()
+
+    monkeypatch.setattr(client.os, "getpid", lambda: -1)
+
+    assert get_search_client() is not parent_client
+    assert get_search_client() is get_search_client()
+
+
+def test_search_client_created_without_lock(search_clients, monkeypatch):
+    create_search_client = client._create_search_client
+    other_thread_client = create_search_client("awards")
+
+    def _create_search_client(alias):
+        assert not client._search_clients_lock.locked()
+        client._search_clients[alias] = other_thread_client  # stored by another thread in the meantime
+        return create_search_client(alias)
+
+    monkeypatch.setattr(client, "_create_search_client", _create_search_client)
+
+    assert get_search_client("awards") is other_thread_client
+    assert get_search_client_stats()["awards"]["uses"] == 1
+
+
+def test_search_client_stats(search_clients):
+    get_search_client("awards")
+    get_search_client("awards")
+
+    stats = get_search_client_stats()
+
+    assert list(stats) == ["awards"]
+    assert stats["awards"]["uses"] == 2
+    assert [node["pool_maxsize"] for node in stats["awards"]["nodes"]] == [3]
+    assert [node["new_connections"] for node in stats["awards"]["nodes"]] == [0]
+    assert "host" not in stats["awards"]["nodes"][0]
+
+
+def test_search_client_stats_in_status_view(search_clients, settings):
+    get_search_client("awards")
+
+    response = StatusView().get(RequestFactory().get("/status/", {"search_client_stats": ""}))
+    assert "search_client_stats" not in json.loads(response.content)
+
+    settings.STATUS_PROCESS_STATS = True
+
+    response = StatusView().get(RequestFactory().get("/status/", {"search_client_stats": ""}))
+    search_client_stats = json.loads(response.content)["search_client_stats"]
+    assert search_client_stats["per_process"] is True
+    assert search_client_stats["aliases"]["awards"]["uses"] == 1
+
+    response = StatusView().get(RequestFactory().get("/status/"))
+    assert "search_client_stats" not in json.loads(response.content)
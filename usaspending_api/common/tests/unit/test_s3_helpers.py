@@ -0,0 +1,58 @@
+import boto3
+import io
+import pytest
+import zipfile
+
+from usaspending_api.common.helpers.s3_helpers import MultipartUploadFile, S3_MIN_PART_SIZE
+from usaspending_api.download.filestreaming.zip_file import ParallelZipWriter
+
+moto = pytest.importorskip("moto")
+mock_s3 = getattr(moto, "mock_s3", None) or moto.mock_aws
+
+BUCKET_NAME = "test-bucket"
+REGION_NAME = "us-east-1"
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name=REGION_NAME)
+        s3_client.create_bucket(Bucket=BUCKET_NAME)
+        yield s3_client
+
+
+def test_multipart_upload_file(s3_bucket):
+    data = bytes(range(256)) * (S3_MIN_PART_SIZE // 256) * 2 + b"last part"
+
+    with MultipartUploadFile(BUCKET_NAME, REGION_NAME, "test.bin", part_size=S3_MIN_PART_SIZE) as upload_file:
+        for i in range(0, len(data), 1000000):
+            upload_file.write(data[i : i + 1000000])
+        assert upload_file.tell() == len(data)
+
+    assert s3_bucket.get_object(Bucket=BUCKET_NAME, Key="test.bin")["Body"].read() == data
+
+
+def test_multipart_upload_file_is_aborted_on_error(s3_bucket):
+    with pytest.raises(RuntimeError):
+        with MultipartUploadFile(BUCKET_NAME, REGION_NAME, "test.bin", part_size=S3_MIN_PART_SIZE) as upload_file:
+            upload_file.write(b"x" * S3_MIN_PART_SIZE)
+            raise RuntimeError("Download failed")
+
+    assert "Contents" not in s3_bucket.list_objects_v2(Bucket=BUCKET_NAME)
+    assert "Uploads" not in s3_bucket.list_multipart_uploads(Bucket=BUCKET_NAME)
+
+
+def test_stream_zip_file_to_s3(s3_bucket):
+    data = b"id,name\n" + b"".join(f"{i},name {i}\n".encode() for i in range(500000))
+
+    with MultipartUploadFile(BUCKET_NAME, REGION_NAME, "test.zip", part_size=S3_MIN_PART_SIZE) as upload_file:
+        with ParallelZipWriter(upload_file, compression_level=1, threads=2) as zip_file:
+            with zip_file.open("data.csv") as archive_file:
+                archive_file.write(data)
+
+    s3_object = s3_bucket.get_object(Bucket=BUCKET_NAME, Key="test.zip")
+    assert s3_object["ContentLength"] == upload_file.tell()
+    with zipfile.ZipFile(io.BytesIO(s3_object["Body"].read()), "r") as zf:
+        assert zf.read("data.csv") == data
@@ -6,6 +6,7 @@ from usaspending_api.common.sqs.sqs_handler import (
     UNITTEST_FAKE_QUEUE_NAME,
     FakeSQSMessage,
     _FakeStatelessLoggingSQSDeadLetterQueue,
+    _FakeUnitTestFileBackedSQSQueue,
 )
 from usaspending_api.conftest_helpers import get_unittest_fake_sqs_queue
 
@@ -118,3 +119,20 @@ def test_delete_fake_received_message():
     assert len(get_sqs_queue()._messages()) == 3
     bodies = [m.body for m in get_sqs_queue()._messages()]
     assert "1235" not in bodies
+
+
+def test_fake_lane_queue_is_separate():
+    q = get_sqs_queue()
+    lane_q = _FakeUnitTestFileBackedSQSQueue.lane_instance("small")
+    assert lane_q is _FakeUnitTestFileBackedSQSQueue.lane_instance("small")
+    assert lane_q.url == f"{q.url}-small"
+
+    q.send_message("1235")
+    lane_q.send_message("2222")
+    assert [m.body for m in q._messages()] == ["1235"]
+    assert [m.body for m in lane_q._messages()] == ["2222"]
+
+    msg = lane_q.receive_messages(10)[0]
+    msg.delete()
+    assert len(lane_q._messages()) == 0
+    assert len(q._messages()) == 1
@@ -16,8 +16,11 @@ from usaspending_api.common.sqs.sqs_handler import (
     get_sqs_queue,
     FakeSQSMessage,
     UNITTEST_FAKE_QUEUE_NAME,
+    _FakeUnitTestFileBackedSQSQueue,
 )
 from usaspending_api.common.sqs.sqs_work_dispatcher import (
+    QueueLane,
+    QueueLanes,
     SQSWorkDispatcher,
     QueueWorkerProcessError,
     QueueWorkDispatcherError,
@@ -1547,3 +1550,38 @@ class SQSWorkDispatcherTests(TestCase):
             fail_with_runaway_proc = True
         if fail_with_runaway_proc:
             self.fail("Worker or its Terminator or the Dispatcher did not complete in timeout as expected. Test fails.")
+
+
+def test_queue_lanes_take_turns_by_weight():
+    small_lane = QueueLane("small", None, 3)
+    large_lane = QueueLane("large", None, 1)
+    queue_lanes = QueueLanes([small_lane, large_lane])
+
+    first_lanes = [queue_lanes.next_poll_order()[0].name for _ in range(8)]
+    assert first_lanes.count("small") == 6
+    assert first_lanes.count("large") == 2
+    # Turns of the large lane are spread out, rather than after every turn of the small lane
+    assert first_lanes[:4].count("large") == 1
+
+
+@pytest.mark.usefixtures("_patch_get_sqs_queue")
+def test_dispatcher_receives_from_lanes_in_turn():
+    large_queue = get_sqs_queue()
+    small_queue = _FakeUnitTestFileBackedSQSQueue.lane_instance("small")
+    large_queue.send_message(MessageBody=1)
+    small_queue.send_message(MessageBody=2)
+    small_queue.send_message(MessageBody=3)
+    queue_lanes = QueueLanes([QueueLane("small", small_queue, 3), QueueLane("large", large_queue, 1)])
+
+    received = []
+    for _ in range(3):
+        dispatcher = SQSWorkDispatcher(queue_lanes, long_poll_seconds=1, monitor_sleep_time=1)
+        dispatcher._dequeue_message(dispatcher._long_poll_seconds)
+        received.append((dispatcher.current_lane, dispatcher._current_sqs_message.body))
+        assert dispatcher.sqs_queue_instance is (small_queue if dispatcher.current_lane == "small" else large_queue)
+        dispatcher._current_sqs_message.delete()
+
+    # The small lane is polled first until its turns run out, then the large lane gets its turn
+    assert received == [("small", 2), ("small", 3), ("large", 1)]
+    assert len(small_queue._messages()) == 0
+    assert len(large_queue._messages()) == 0
@@ -328,8 +328,10 @@ def fake_sqs_queue(local_queue_dir, unittest_fake_sqs_queue_instance):
 
     # Check that it's the unit test queue before purging
     assert q.url.split("/")[-1] == UNITTEST_FAKE_QUEUE_NAME
-    q.purge()
-    q.reset_instance_state()
+    for queue in [q] + q.lane_instances():
+        queue.purge()
+        queue.reset_instance_state()
     yield
-    q.purge()
-    q.reset_instance_state()
+    for queue in [q] + q.lane_instances():
+        queue.purge()
+        queue.reset_instance_state()
@@ -190,6 +190,8 @@ def get_unittest_fake_sqs_queue(*args, **kwargs):
     """Mocks sqs_handler.get_sqs_queue to instead return a fake queue used for unit testing"""
     if "queue_name" in kwargs and kwargs["queue_name"] == UNITTEST_FAKE_DEAD_LETTER_QUEUE_NAME:
         return _FakeStatelessLoggingSQSDeadLetterQueue()
+    elif kwargs.get("queue_name") and kwargs["queue_name"] == settings.BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME:
+        return _FakeUnitTestFileBackedSQSQueue.lane_instance(kwargs["queue_name"])
     else:
         return _FakeUnitTestFileBackedSQSQueue.instance()
 
@@ -202,10 +204,11 @@ def remove_unittest_queue_data_files(queue_to_tear_down):
 
     # Check that it's the unit test queue before removings
     assert q.url.split("/")[-1] == UNITTEST_FAKE_QUEUE_NAME
-    queue_data_file = q._QUEUE_DATA_FILE
-    lock_file_path = Path(queue_data_file + ".lock")
-    if lock_file_path.exists():
-        lock_file_path.unlink()
-    queue_data_file_path = Path(queue_data_file)
-    if queue_data_file_path.exists():
-        queue_data_file_path.unlink()
+    for queue in [q] + q.lane_instances():
+        queue_data_file = queue._QUEUE_DATA_FILE
+        lock_file_path = Path(queue_data_file + ".lock")
+        if lock_file_path.exists():
+            lock_file_path.unlink()
+        queue_data_file_path = Path(queue_data_file)
+        if queue_data_file_path.exists():
+            queue_data_file_path.unlink()
@@ -1,6 +1,7 @@
 import json
 import logging
 import multiprocessing
+import os
 import re
 import time
 
@@ -10,17 +11,18 @@ from django.core.management.base import BaseCommand
 from django.utils.functional import cached_property
 from pathlib import Path
 
-from usaspending_api.common.csv_helpers import count_rows_in_delimited_file
 from usaspending_api.common.helpers.s3_helpers import upload_download_file_to_s3
 from usaspending_api.download.filestreaming.download_generation import (
-    split_and_zip_data_files,
-    wait_for_process,
+    SourceExport,
     add_data_dictionary_to_zip,
-    execute_psql,
     generate_export_query_temp_file,
+    get_export_zip_threads,
+    ordered_zip_merger,
+    run_source_exports,
+    stream_psql_to_zip_file,
 )
 from usaspending_api.download.filestreaming.file_description import build_file_description, save_file_description
-from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file
+from usaspending_api.download.filestreaming.zip_file import ParallelZipWriter, append_files_to_zip_file
 from usaspending_api.download.models import DownloadJob
 from usaspending_api.download.lookups import FILE_FORMATS, JOB_STATUS_DICT
 from usaspending_api.references.models import DisasterEmergencyFundCode
@@ -47,12 +49,19 @@ class Command(BaseCommand):
             action="store_true",
             help="Don't store the list of IDs for downline ETL. Automatically skipped if --dry-run is provided",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.DOWNLOAD_MAX_CONCURRENT_SOURCES,
+            help="Number of files exported at the same time, each by its own process and DB connection",
+        )
 
     def handle(self, *args, **options):
         """
             Generates a download data package specific to COVID-19 spending
         """
         self.upload = not options["skip_upload"]
+        self.workers = max(options["workers"], 1)
         self.zip_file_path = (
             self.working_dir_path / f"{settings.COVID19_DOWNLOAD_FILENAME_PREFIX}_{self.full_timestamp}.zip"
         )
@@ -71,13 +80,38 @@ class Command(BaseCommand):
         logger.info(f"Creating new COVID-19 download zip file: {self.zip_file_path}")
         self.filepaths_to_delete.append(self.zip_file_path)
 
-        for sql_file, final_name in self.download_file_list:
-            intermediate_data_file_path = final_name.parent / (final_name.name + "_temp")
-            data_file, count = self.download_to_csv(sql_file, final_name, str(intermediate_data_file_path))
-            if count <= 0:
-                logger.warning(f"Empty data file generated: {final_name}!")
+        download_file_list = self.download_file_list
+        zip_threads = get_export_zip_threads(len(download_file_list), self.workers)
+        exports = []
+        try:
+            for sql_file, final_name in download_file_list:
+                export_zip_file_path = final_name.parent / (final_name.name + ".zip")
+                export = self.prepare_data_export(sql_file, final_name, export_zip_file_path, zip_threads)
+                exports.append((export, str(export_zip_file_path)))
 
-            self.filepaths_to_delete.extend(self.working_dir_path.glob(f"{final_name.stem}*"))
+            # The files are exported concurrently, each to its own zip file. They're merged into the download zip file
+            # in order as soon as they and every file before them are finished
+            start_time = time.perf_counter()
+            with ParallelZipWriter(str(self.zip_file_path)) as zip_writer:
+                add_finished_export = ordered_zip_merger([path for _, path in exports], zip_writer)
+                run_source_exports(exports, self.workers, on_export_complete=add_finished_export)
+            logger.info(
+                f"Exporting {len(exports)} files with {self.workers} workers took {time.perf_counter() - start_time:.2f}s"
+            )
+
+            for (export, _), (_, final_name) in zip(exports, download_file_list):
+                count = export.row_count.value
+                logger.info(f"{final_name} contains {count:,} rows of data")
+                self.total_download_count += count
+                if count <= 0:
+                    logger.warning(f"Empty data file generated: {final_name}!")
+        finally:
+            for export, export_zip_file_path in exports:
+                os.close(export.temp_file)
+                Path(export.temp_file_path).unlink()
+                if Path(export_zip_file_path).exists():
+                    # Left behind when an export failed
+                    Path(export_zip_file_path).unlink()
 
     def complete_zip_and_upload(self):
         self.finalize_zip_contents()
@@ -156,51 +190,28 @@ class Command(BaseCommand):
         if not self.zip_file_path.parent.exists():
             self.zip_file_path.parent.mkdir()
 
-    def download_to_csv(self, sql_filepath, destination_path, intermediate_data_filename):
-        start_time = time.perf_counter()
-        logger.info(f"Downloading data to {destination_path}")
+    def prepare_data_export(self, sql_filepath, destination_path, zip_file_path, zip_threads=None) -> SourceExport:
+        """Create the (unstarted) process which streams the results of the SQL file into the zip file"""
+        logger.info(f"Preparing to download data to {destination_path}")
         options = FILE_FORMATS[self.file_format]["options"]
         export_query = r"\COPY ({}) TO STDOUT {}".format(read_sql_file(sql_filepath), options)
-        try:
-            temp_file, temp_file_path = generate_export_query_temp_file(export_query, None, self.working_dir_path)
-            # Create a separate process to run the PSQL command; wait
-            psql_process = multiprocessing.Process(
-                target=execute_psql, args=(temp_file_path, intermediate_data_filename, None)
-            )
-            psql_process.start()
-            wait_for_process(psql_process, start_time, None)
-
-            delim = FILE_FORMATS[self.file_format]["delimiter"]
-
-            # Log how many rows we have
-            logger.info(f"Counting rows in delimited text file {intermediate_data_filename}")
-            try:
-                count = count_rows_in_delimited_file(
-                    filename=intermediate_data_filename, has_header=True, delimiter=delim
-                )
-                logger.info(f"{destination_path} contains {count:,} rows of data")
-                self.total_download_count += count
-            except Exception:
-                logger.exception("Unable to obtain delimited text file line count")
-
-            start_time = time.perf_counter()
-            zip_process = multiprocessing.Process(
-                target=split_and_zip_data_files,
-                args=(
-                    str(self.zip_file_path),
-                    intermediate_data_filename,
-                    str(destination_path),
-                    self.file_format,
-                    None,
-                ),
-            )
-            zip_process.start()
-            wait_for_process(zip_process, start_time, None)
-        except Exception as e:
-            raise e
-        finally:
-            Path(temp_file_path).unlink()
-        return destination_path, count
+        temp_file, temp_file_path = generate_export_query_temp_file(export_query, None, self.working_dir_path)
+
+        # A separate process runs PSQL, with its own DB connection, and splits and zips its output as it goes
+        row_count = multiprocessing.Value("q", 0)
+        process = multiprocessing.Process(
+            target=stream_psql_to_zip_file,
+            args=(
+                temp_file_path,
+                str(zip_file_path),
+                destination_path.name,
+                self.file_format,
+                None,
+                row_count,
+                zip_threads,
+            ),
+        )
+        return SourceExport(process, row_count, temp_file, temp_file_path)
 
     def store_record_in_database(self):
         download_record = DownloadJob.objects.create(
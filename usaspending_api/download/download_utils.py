@@ -1,11 +1,44 @@
+import hashlib
+import logging
+
 from datetime import datetime, timezone
+from django.conf import settings
+from django.db import DatabaseError, connection
+from elasticsearch import ElasticsearchException
+from typing import Optional
 
+from usaspending_api.broker.helpers.last_load_date import get_last_load_date
 from usaspending_api.common.helpers.text_helpers import slugify_text_for_file_names
 from usaspending_api.common.logging import get_remote_addr
 from usaspending_api.download.helpers import write_to_download_log
+from usaspending_api.download.helpers.elasticsearch_download_functions import (
+    AwardsElasticsearchDownload,
+    TransactionsElasticsearchDownload,
+)
 from usaspending_api.download.lookups import VALUE_MAPPINGS
 from usaspending_api.references.models import ToptierAgency
 
+logger = logging.getLogger(__name__)
+
+# Loads which bring new data to prime award and transaction downloads, including their File C columns from
+# submissions. Other downloads, such as account data and sub-awards, are loaded without a recorded load date
+PRIME_AWARD_DATA_LOAD_TYPES = ("fpds", "fabs", "es_transactions", "es_awards", "submissions")
+PRIME_AWARD_DOWNLOAD_TYPES = {
+    download_type
+    for download_type, mapping in VALUE_MAPPINGS.items()
+    if mapping["source_type"] == "award" and mapping["table_name"] != "subaward"
+}
+
+# Download types whose IDs are retrieved from Elasticsearch, which can count them without querying Postgres
+ELASTICSEARCH_DOWNLOADS = {
+    "elasticsearch_awards": AwardsElasticsearchDownload,
+    "elasticsearch_transactions": TransactionsElasticsearchDownload,
+}
+
+# Download workers poll a queue per lane, so small downloads don't wait behind large ones
+DOWNLOAD_LANE_SMALL = "small"
+DOWNLOAD_LANE_LARGE = "large"
+
 
 def create_unique_filename(json_request, origination=None):
     timestamp = datetime.strftime(datetime.now(timezone.utc), "%Y-%m-%d_H%HM%MS%S%f")
@@ -91,3 +124,89 @@ def construct_data_date_range(provided_filters: dict) -> str:
         if provided_filters.get("quarter") != 1:
             string += f"-Q{provided_filters.get('quarter')}"
     return string
+
+
+def get_download_data_watermark(json_request: dict) -> str:
+    """
+    Returns a value which changes whenever new data is loaded for the download. For prime award and transaction
+    downloads this is the latest of their data load dates, for any other download it's the current date.
+    """
+    download_types = json_request.get("download_types") or []
+    if download_types and set(download_types) <= PRIME_AWARD_DOWNLOAD_TYPES:
+        last_load_dates = [get_last_load_date(load_type) for load_type in PRIME_AWARD_DATA_LOAD_TYPES]
+        if None not in last_load_dates:
+            return max(last_load_dates).isoformat()
+    return datetime.strftime(datetime.now(timezone.utc), "%Y-%m-%d")
+
+
+def create_download_result_key(ordered_json_request: str, json_request: dict) -> str:
+    """
+    Identify the result of a download by its canonical (ordered) request and its data watermark, so downloads with
+    the same key produce the same files and can share a single DownloadJob
+    """
+    watermark = get_download_data_watermark(json_request)
+    return hashlib.sha256(f"{ordered_json_request}|{watermark}".encode()).hexdigest()
+
+
+def lock_download_result_key(result_key: str) -> None:
+    """
+    Hold a lock on the result key until the end of the current transaction, so concurrent requests for the same
+    result find each other's DownloadJob instead of each creating one
+    """
+    lock_id = int.from_bytes(bytes.fromhex(result_key[:16]), "big", signed=True)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", [lock_id])
+
+
+def _estimate_queryset_rows(queryset) -> int:
+    """Row estimate of the Postgres planner for the queryset, which doesn't run the query"""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        return int(cursor.fetchone()[0][0]["Plan"]["Plan Rows"])
+
+
+def estimate_download_rows(json_request: dict) -> Optional[int]:
+    """
+    Estimate the number of rows of a download before it's generated. Download types from Elasticsearch are counted
+    the same way as the download count endpoint does, while the queries of the other types (e.g. the sub-awards of
+    award and transaction downloads) get the planner's estimate. Row-constrained downloads are capped by their limit.
+    Returns None if the download can't be estimated.
+    """
+    # Imported here since download_generation depends on this module
+    from usaspending_api.download.filestreaming.download_generation import get_download_sources
+
+    limit = json_request.get("limit")
+    download_types = json_request.get("download_types") or []
+    elasticsearch_types = [t for t in download_types if t in ELASTICSEARCH_DOWNLOADS]
+    other_types = [t for t in download_types if t not in ELASTICSEARCH_DOWNLOADS]
+    try:
+        total = 0
+        for download_type in elasticsearch_types:
+            count = ELASTICSEARCH_DOWNLOADS[download_type].count(json_request["filters"])
+            if count is None:
+                return None
+            total += min(count, limit) if limit else count
+        if other_types:
+            for source in get_download_sources({**json_request, "download_types": other_types}):
+                count = _estimate_queryset_rows(source.queryset)
+                total += min(count, limit) if limit else count
+    except (DatabaseError, ElasticsearchException):
+        logger.exception("Unable to estimate the size of the download")
+        return None
+    return total
+
+
+def get_download_lane(json_request: dict) -> str:
+    """Lane of the download workers a download is queued in, based on its estimated size"""
+    estimated_rows = estimate_download_rows(json_request)
+    if estimated_rows is not None and estimated_rows <= settings.DOWNLOAD_SMALL_JOB_MAX_ROWS:
+        return DOWNLOAD_LANE_SMALL
+    return DOWNLOAD_LANE_LARGE
+
+
+def get_download_lane_queue_name(lane: str) -> str:
+    """Name of the SQS queue of the lane. The small lane shares the main queue when it has no queue of its own"""
+    if lane == DOWNLOAD_LANE_SMALL and settings.BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME:
+        return settings.BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME
+    return settings.BULK_DOWNLOAD_SQS_QUEUE_NAME
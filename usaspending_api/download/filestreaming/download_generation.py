@@ -1,11 +1,15 @@
+import io
 import json
 import logging
 import multiprocessing
 import os
+from collections import deque
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Optional, Tuple, List
+from typing import Callable, List, NamedTuple, Optional, Tuple, Union
 
 import psutil as ps
+import psycopg2
 import re
 import shutil
 import subprocess
@@ -18,18 +22,29 @@ from django.conf import settings
 
 from usaspending_api.awards.v2.filters.filter_helpers import add_date_range_comparison_types
 from usaspending_api.awards.v2.lookups.lookups import contract_type_mapping, assistance_type_mapping, idv_type_mapping
-from usaspending_api.common.csv_helpers import count_rows_in_delimited_file, partition_large_delimited_file
+from usaspending_api.common.csv_helpers import partition_large_delimited_file
 from usaspending_api.common.exceptions import InvalidParameterException
 from usaspending_api.common.helpers.orm_helpers import generate_raw_quoted_query
-from usaspending_api.common.helpers.s3_helpers import multipart_upload
+from usaspending_api.common.helpers.s3_helpers import MultipartUploadFile, multipart_upload
 from usaspending_api.common.helpers.text_helpers import slugify_text_for_file_names
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
 from usaspending_api.download.download_utils import construct_data_date_range
 from usaspending_api.download.filestreaming import NAMING_CONFLICT_DISCRIMINATOR
 from usaspending_api.download.filestreaming.download_source import DownloadSource
 from usaspending_api.download.filestreaming.file_description import build_file_description, save_file_description
-from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file
+from usaspending_api.download.filestreaming.parquet_file import (
+    PARQUET_FETCH_SIZE,
+    write_cursor_to_parquet_zip_file,
+    write_empty_parquet_file,
+)
+from usaspending_api.download.filestreaming.zip_file import (
+    ParallelZipWriter,
+    append_files_to_zip_file,
+    open_zip_writer,
+    write_delimited_rows_to_zip_file,
+)
 from usaspending_api.download.helpers import verify_requested_columns_available, write_to_download_log as write_to_log
+from usaspending_api.download.helpers.elasticsearch_download_functions import drop_download_id_tables
 from usaspending_api.download.lookups import JOB_STATUS_DICT, VALUE_MAPPINGS, FILE_FORMATS
 from usaspending_api.download.models import DownloadJob
 
@@ -55,6 +70,8 @@ def generate_download(download_job: DownloadJob, origination: Optional[str] = No
 
     file_name = start_download(download_job)
     working_dir = None
+    # Stream the archive to S3 while it's generated, instead of uploading it once it's complete
+    streaming_upload = settings.BULK_DOWNLOAD_STREAMING_UPLOAD and not settings.IS_LOCAL
     try:
         # Create temporary files and working directory
         zip_file_path = settings.CSV_LOCAL_PATH + file_name
@@ -69,31 +86,71 @@ def generate_download(download_job: DownloadJob, origination: Optional[str] = No
 
         # Generate sources from the JSON request object
         sources = get_download_sources(json_request, origination)
-        for source in sources:
-            # Parse and write data to the file; if there are no matching columns for a source then add an empty file
-            source_column_count = len(source.columns(columns))
-            if source_column_count == 0:
-                create_empty_data_file(
-                    source, download_job, working_dir, piid, assistance_id, zip_file_path, file_format
-                )
-            else:
-                download_job.number_of_columns += source_column_count
-                parse_source(
-                    source, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format
-                )
-        include_data_dictionary = json_request.get("include_data_dictionary")
-        if include_data_dictionary:
-            add_data_dictionary_to_zip(working_dir, zip_file_path)
-        include_file_description = json_request.get("include_file_description")
-        if include_file_description:
-            write_to_log(message="Adding file description to zip file")
-            file_description = build_file_description(include_file_description["source"], sources)
-            file_description = file_description.replace("[AWARD_ID]", str(award_id))
-            file_description_path = save_file_description(
-                working_dir, include_file_description["destination"], file_description
+
+        if streaming_upload:
+            upload_file = MultipartUploadFile(
+                settings.BULK_DOWNLOAD_S3_BUCKET_NAME, settings.USASPENDING_AWS_REGION, file_name
             )
-            append_files_to_zip_file([file_description_path], zip_file_path)
-        download_job.file_size = os.stat(zip_file_path).st_size
+        else:
+            upload_file = nullcontext()
+
+        # An exception aborts the multipart upload, so a partial archive is never created in S3
+        with upload_file, ParallelZipWriter(upload_file if streaming_upload else zip_file_path) as zip_writer:
+            # When streaming to S3, the sources are exported one at a time straight into the archive, so none of them
+            # is staged on local disk and the upload starts with the first rows. Otherwise each source is written to
+            # its own zip file, so they can be exported concurrently. They're added to the archive in order as soon
+            # as they and every source before them are finished
+            source_zip_file_paths = [os.path.join(working_dir, f"source_{i}.zip") for i in range(len(sources))]
+            add_finished_source = ordered_zip_merger(source_zip_file_paths, zip_writer)
+            sources_to_parse = []
+            for source, source_zip_file_path in zip(sources, source_zip_file_paths):
+                # Parse and write data to the file; if there are no matching columns for a source then add an empty
+                # file
+                source_column_count = len(source.columns(columns))
+                if source_column_count == 0:
+                    create_empty_data_file(
+                        source,
+                        download_job,
+                        working_dir,
+                        piid,
+                        assistance_id,
+                        zip_writer if streaming_upload else source_zip_file_path,
+                        file_format,
+                        columns,
+                    )
+                    if not streaming_upload:
+                        add_finished_source(source_zip_file_path)
+                elif streaming_upload:
+                    download_job.number_of_columns += source_column_count
+                    export_source_to_zip_writer(
+                        source, columns, download_job, piid, assistance_id, zip_writer, limit, file_format
+                    )
+                else:
+                    download_job.number_of_columns += source_column_count
+                    sources_to_parse.append((source, source_zip_file_path))
+            parse_sources(
+                sources_to_parse, columns, download_job, piid, assistance_id, limit, file_format, add_finished_source
+            )
+
+            include_data_dictionary = json_request.get("include_data_dictionary")
+            if include_data_dictionary:
+                write_to_log(message="Adding data dictionary to zip file")
+                data_dictionary_file_path = retrieve_data_dictionary(working_dir)
+                zip_writer.write(data_dictionary_file_path, os.path.basename(data_dictionary_file_path))
+            include_file_description = json_request.get("include_file_description")
+            if include_file_description:
+                write_to_log(message="Adding file description to zip file")
+                file_description = build_file_description(include_file_description["source"], sources)
+                file_description = file_description.replace("[AWARD_ID]", str(award_id))
+                file_description_path = save_file_description(
+                    working_dir, include_file_description["destination"], file_description
+                )
+                zip_writer.write(file_description_path, os.path.basename(file_description_path))
+
+        if streaming_upload:
+            download_job.file_size = upload_file.tell()
+        else:
+            download_job.file_size = os.stat(zip_file_path).st_size
     except InvalidParameterException as e:
         exc_msg = "InvalidParameterException was raised while attempting to process the DownloadJob"
         fail_download(download_job, e, exc_msg)
@@ -108,10 +165,11 @@ def generate_download(download_job: DownloadJob, origination: Optional[str] = No
         if working_dir and os.path.exists(working_dir):
             shutil.rmtree(working_dir)
         _kill_spawned_processes(download_job)
+        drop_download_id_tables()
 
     try:
-        # push file to S3 bucket, if not local
-        if not settings.IS_LOCAL:
+        # push file to S3 bucket, if not local and not already streamed there
+        if not settings.IS_LOCAL and not streaming_upload:
             bucket = settings.BULK_DOWNLOAD_S3_BUCKET_NAME
             region = settings.USASPENDING_AWS_REGION
             start_uploading = time.perf_counter()
@@ -253,59 +311,166 @@ def build_data_file_name(source, download_job, piid, assistance_id):
     return data_file_name
 
 
-def parse_source(source, columns, download_job, working_dir, piid, assistance_id, zip_file_path, limit, file_format):
-    """Write to delimited text file(s) and zip file(s) using the source data"""
+class SourceExport(NamedTuple):
+    process: multiprocessing.Process
+    row_count: multiprocessing.Value
+    temp_file: int
+    temp_file_path: str
 
-    data_file_name = build_data_file_name(source, download_job, piid, assistance_id)
 
-    source_query = source.row_emitter(columns)
-    extension = FILE_FORMATS[file_format]["extension"]
-    source.file_name = f"{data_file_name}.{extension}"
-    source_path = os.path.join(working_dir, source.file_name)
+def parse_sources(
+    sources_and_zip_file_paths,
+    columns,
+    download_job,
+    piid,
+    assistance_id,
+    limit,
+    file_format,
+    on_export_complete: Optional[Callable[[str], None]] = None,
+):
+    """
+    Write to delimited text file(s) and zip file(s) using the data of each source, with each source written to its
+    own zip file. Up to DOWNLOAD_MAX_CONCURRENT_SOURCES sources are exported at a time, each by its own process
+    and DB connection. If given, on_export_complete is called with the zip file path of each source once its export
+    has succeeded.
+    """
+    exports = []
+    zip_threads = get_export_zip_threads(len(sources_and_zip_file_paths), settings.DOWNLOAD_MAX_CONCURRENT_SOURCES)
+    try:
+        for source, zip_file_path in sources_and_zip_file_paths:
+            export = prepare_source_export(
+                source, columns, download_job, piid, assistance_id, zip_file_path, limit, file_format, zip_threads
+            )
+            exports.append((export, zip_file_path))
 
-    write_to_log(message=f"Preparing to download data as {source.file_name}", download_job=download_job)
+        run_source_exports(exports, settings.DOWNLOAD_MAX_CONCURRENT_SOURCES, download_job, on_export_complete)
+
+        for export, _ in exports:
+            download_job.number_of_rows += export.row_count.value
+        download_job.save()
+    finally:
+        # Remove temporary files
+        for export, _ in exports:
+            os.close(export.temp_file)
+            os.remove(export.temp_file_path)
+
+
+def get_export_zip_threads(export_count: int, max_concurrent_exports: int) -> int:
+    """
+    Number of threads for the zip writer of each export, so the exports running at the same time share the
+    DOWNLOAD_ZIP_COMPRESSION_THREADS between them instead of each using that many
+    """
+    concurrent_exports = max(min(export_count, max_concurrent_exports), 1)
+    return max(settings.DOWNLOAD_ZIP_COMPRESSION_THREADS // concurrent_exports, 1)
 
-    # Generate the query file; values, limits, dates fixed
-    export_query = generate_export_query(source_query, limit, source, columns, file_format)
-    temp_file, temp_file_path = generate_export_query_temp_file(export_query, download_job)
 
+def run_source_exports(
+    exports_and_zip_file_paths: List[Tuple[SourceExport, str]],
+    max_concurrent_exports: int,
+    download_job: Optional[DownloadJob] = None,
+    on_export_complete: Optional[Callable[[str], None]] = None,
+):
+    """
+    Run the processes of the exports, up to max_concurrent_exports at a time, and wait for all of them to finish.
+    Raises as soon as one of them fails or the download runs out of time, once every running export is terminated.
+    If given, on_export_complete is called with the zip file path of each export once it has succeeded.
+    """
+    export_zip_file_paths = {export.process: zip_file_path for export, zip_file_path in exports_and_zip_file_paths}
     start_time = time.perf_counter()
+    pending = deque(export for export, _ in exports_and_zip_file_paths)
+    running = []
     try:
-        # Create a separate process to run the PSQL command; wait
-        psql_process = multiprocessing.Process(target=execute_psql, args=(temp_file_path, source_path, download_job))
-        psql_process.start()
-        wait_for_process(psql_process, start_time, download_job)
+        while pending or running:
+            while pending and len(running) < max_concurrent_exports:
+                export = pending.popleft()
+                export.process.start()
+                running.append(export)
+
+            finished = [export for export in running if not export.process.is_alive()]
+            for export in finished:
+                running.remove(export)
+                wait_for_process(export.process, start_time, download_job)  # Raises if the export failed
+                if on_export_complete:
+                    on_export_complete(export_zip_file_paths[export.process])
+
+            if running and not finished:
+                over_time = (time.perf_counter() - start_time) > MAX_VISIBILITY_TIMEOUT
+                if download_job and not download_job.monthly_download and over_time:
+                    raise TimeoutError(
+                        f"DownloadJob {download_job.download_job_id} lasted longer than "
+                        f"{MAX_VISIBILITY_TIMEOUT / 3600} hours"
+                    )
+                time.sleep(WAIT_FOR_PROCESS_SLEEP / 5)
+    except Exception:
+        # Don't leave the other exports running once the result is known to have failed
+        for export in running:
+            if export.process.is_alive():
+                write_to_log(
+                    message=f"Attempting to terminate process (pid {export.process.pid})",
+                    download_job=download_job,
+                    is_error=True,
+                )
+                export.process.terminate()
+        for export in running:
+            export.process.join()
+        raise
+
+
+def prepare_source_export(
+    source, columns, download_job, piid, assistance_id, zip_file_path, limit, file_format, zip_threads=None
+) -> SourceExport:
+    """Create the (unstarted) process which streams the data of the source into the zip file"""
+    data_file_name, temp_file, temp_file_path = _prepare_export_query(
+        source, columns, download_job, piid, assistance_id, limit, file_format
+    )
 
-        delim = FILE_FORMATS[file_format]["delimiter"]
+    # A separate process streams the PSQL output into the zip file, split and counted as it goes
+    row_count = multiprocessing.Value("q", 0)
+    stream_process = multiprocessing.Process(
+        target=stream_query_to_parquet_zip_file if file_format == "parquet" else stream_psql_to_zip_file,
+        args=(temp_file_path, zip_file_path, data_file_name, file_format, download_job, row_count, zip_threads),
+    )
+    return SourceExport(stream_process, row_count, temp_file, temp_file_path)
 
-        # Log how many rows we have
-        write_to_log(message="Counting rows in delimited text file", download_job=download_job)
-        try:
-            download_job.number_of_rows += count_rows_in_delimited_file(
-                filename=source_path, has_header=True, delimiter=delim
-            )
-        except Exception:
-            write_to_log(
-                message="Unable to obtain delimited text file line count", is_error=True, download_job=download_job
-            )
-        download_job.save()
 
-        # Create a separate process to split the large data files into smaller file and write to zip; wait
-        zip_process = multiprocessing.Process(
-            target=split_and_zip_data_files,
-            args=(zip_file_path, source_path, data_file_name, file_format, download_job),
-        )
-        zip_process.start()
-        wait_for_process(zip_process, start_time, download_job)
+def export_source_to_zip_writer(
+    source, columns, download_job, piid, assistance_id, zip_writer: ParallelZipWriter, limit, file_format
+) -> None:
+    """
+    Stream the data of the source straight into the archive of zip_writer, in this process, and add its rows to the
+    download job's. Unlike the exports of parse_sources(...), there's no process to terminate after
+    MAX_VISIBILITY_TIMEOUT, so the duration is bounded by the statement timeout of the export's DB connection.
+    """
+    data_file_name, temp_file, temp_file_path = _prepare_export_query(
+        source, columns, download_job, piid, assistance_id, limit, file_format
+    )
+    try:
+        row_count = multiprocessing.Value("q", 0)
+        stream_func = stream_query_to_parquet_zip_file if file_format == "parquet" else stream_psql_to_zip_file
+        stream_func(temp_file_path, zip_writer, data_file_name, file_format, download_job, row_count)
+        download_job.number_of_rows += row_count.value
         download_job.save()
-    except Exception as e:
-        raise e
     finally:
-        # Remove temporary files
         os.close(temp_file)
         os.remove(temp_file_path)
 
 
+def _prepare_export_query(source, columns, download_job, piid, assistance_id, limit, file_format):
+    """Name the data file of the source and save its export query, returning the name and the query temp file"""
+    data_file_name = build_data_file_name(source, download_job, piid, assistance_id)
+
+    source_query = source.row_emitter(columns)
+    extension = FILE_FORMATS[file_format]["extension"]
+    source.file_name = f"{data_file_name}.{extension}"
+
+    write_to_log(message=f"Preparing to download data as {source.file_name}", download_job=download_job)
+
+    # Generate the query file; values, limits, dates fixed
+    export_query = generate_export_query(source_query, limit, source, columns, file_format)
+    temp_file, temp_file_path = generate_export_query_temp_file(export_query, download_job)
+    return data_file_name, temp_file, temp_file_path
+
+
 def split_and_zip_data_files(zip_file_path, source_path, data_file_name, file_format, download_job=None):
     try:
         # Split data files into separate files
@@ -406,6 +571,9 @@ def generate_export_query(source_query, limit, source, columns, file_format):
     if limit:
         source_query = source_query[:limit]
     query_annotated = apply_annotations_to_sql(generate_raw_quoted_query(source_query), source.columns(columns))
+    if file_format == "parquet":
+        # Executed as is with a server-side cursor, see stream_query_to_parquet_zip_file(...)
+        return query_annotated
     options = FILE_FORMATS[file_format]["options"]
     return r"\COPY ({}) TO STDOUT {}".format(query_annotated, options)
 
@@ -529,6 +697,137 @@ def _top_level_split(sql, splitter):
     raise Exception(f"SQL string ${sql} cannot be split on ${splitter}")
 
 
+def stream_psql_to_zip_file(
+    temp_sql_file_path,
+    zip_file: Union[str, ParallelZipWriter],
+    data_file_name,
+    file_format,
+    download_job=None,
+    row_count=None,
+    zip_threads=None,
+):
+    """
+    Executes the PSQL export within its own Subprocess, writing its output directly into the zip file (a path or an
+    open ParallelZipWriter) as files of EXCEL_ROW_LIMIT rows and counting the rows on the way. Does the work of
+    execute_psql(...), counting the rows of the result and split_and_zip_data_files(...) in one pass, without
+    writing the full data file to disk.
+    """
+    psql_process = None
+    try:
+        log_time = time.perf_counter()
+        temp_env = os.environ.copy()
+        if download_job and not download_job.monthly_download:
+            # Since terminating the process isn't guarenteed to end the DB statement, add timeout to client connection
+            temp_env["PGOPTIONS"] = f"--statement-timeout={settings.DOWNLOAD_DB_TIMEOUT_IN_HOURS}h"
+
+        delim = FILE_FORMATS[file_format]["delimiter"]
+        extension = FILE_FORMATS[file_format]["extension"]
+        output_template = f"{data_file_name}_%s.{extension}"
+
+        # Errors go to a file rather than a pipe, so psql can't block on a full stderr while its stdout is read
+        with open(temp_sql_file_path, "r") as sql_file, tempfile.TemporaryFile() as psql_errors:
+            psql_process = subprocess.Popen(
+                ["psql", "-q", retrieve_db_string(), "-v", "ON_ERROR_STOP=1"],
+                stdin=sql_file,
+                stdout=subprocess.PIPE,
+                stderr=psql_errors,
+                env=temp_env,
+            )
+            lines = io.TextIOWrapper(psql_process.stdout, encoding="utf-8", newline="")
+            # Handle any NUL BYTE characters, as count_rows_in_delimited_file(...) does in its "safe" mode
+            number_of_rows, list_of_files = write_delimited_rows_to_zip_file(
+                (line.replace("\0", "") for line in lines),
+                zip_file,
+                output_template,
+                delim,
+                EXCEL_ROW_LIMIT,
+                threads=zip_threads,
+            )
+            return_code = psql_process.wait()
+            if return_code != 0:
+                psql_errors.seek(0)
+                raise subprocess.CalledProcessError(return_code, "psql", output=psql_errors.read())
+
+        if row_count is not None:
+            row_count.value = number_of_rows
+
+        duration = time.perf_counter() - log_time
+        write_to_log(
+            message=f"Wrote {number_of_rows:,} rows into {len(list_of_files)} files of {_zip_file_name(zip_file)}"
+            f", took {duration:.4f} seconds",
+            download_job=download_job,
+        )
+    except Exception as e:
+        if not settings.IS_LOCAL:
+            # Not logging the command as it can contain the database connection string
+            e.cmd = "[redacted psql command]"
+        logger.error(e)
+        sql = subprocess.check_output(["cat", temp_sql_file_path]).decode()
+        logger.error(f"Faulty SQL: {sql}")
+        raise e
+    finally:
+        if psql_process and psql_process.poll() is None:
+            psql_process.kill()
+
+
+def stream_query_to_parquet_zip_file(
+    temp_sql_file_path,
+    zip_file: Union[str, ParallelZipWriter],
+    data_file_name,
+    file_format,
+    download_job=None,
+    row_count=None,
+    zip_threads=None,
+):
+    """
+    Parquet counterpart of stream_psql_to_zip_file(...). Executes the query with a server-side cursor, writing the
+    results into the zip file as Parquet files of EXCEL_ROW_LIMIT rows, so the download is split into the same files
+    as the text formats.
+    """
+    connection = None
+    try:
+        log_time = time.perf_counter()
+        connection_options = {}
+        if download_job and not download_job.monthly_download:
+            # Since terminating the process isn't guarenteed to end the DB statement, add timeout to the connection
+            connection_options["options"] = f"-c statement_timeout={settings.DOWNLOAD_DB_TIMEOUT_IN_HOURS}h"
+
+        extension = FILE_FORMATS[file_format]["extension"]
+        output_template = f"{data_file_name}_%s.{extension}"
+
+        with open(temp_sql_file_path, "r") as sql_file:
+            sql = sql_file.read()
+        connection = psycopg2.connect(dsn=retrieve_db_string(), **connection_options)
+        with connection.cursor(name=f"download_{os.getpid()}") as cursor:
+            cursor.itersize = PARQUET_FETCH_SIZE
+            cursor.execute(sql)
+            number_of_rows, list_of_files = write_cursor_to_parquet_zip_file(
+                cursor, zip_file, output_template, EXCEL_ROW_LIMIT, zip_threads
+            )
+
+        if row_count is not None:
+            row_count.value = number_of_rows
+
+        duration = time.perf_counter() - log_time
+        write_to_log(
+            message=f"Wrote {number_of_rows:,} rows into {len(list_of_files)} files of {_zip_file_name(zip_file)}"
+            f", took {duration:.4f} seconds",
+            download_job=download_job,
+        )
+    except Exception as e:
+        logger.error(e)
+        sql = subprocess.check_output(["cat", temp_sql_file_path]).decode()
+        logger.error(f"Faulty SQL: {sql}")
+        raise e
+    finally:
+        if connection is not None:
+            connection.close()
+
+
+def _zip_file_name(zip_file: Union[str, ParallelZipWriter]) -> str:
+    return os.path.basename(zip_file) if isinstance(zip_file, (str, os.PathLike)) else "the download archive"
+
+
 def execute_psql(temp_sql_file_path, source_path, download_job):
     """Executes a single PSQL command within its own Subprocess"""
     try:
@@ -578,13 +877,37 @@ def fail_download(download_job, exception, message):
     download_job.save()
 
 
-def add_data_dictionary_to_zip(working_dir, zip_file_path):
-    write_to_log(message="Adding data dictionary to zip file")
+def ordered_zip_merger(source_zip_file_paths: List[str], zip_writer: ParallelZipWriter) -> Callable[[str], None]:
+    """
+    Return a function to call with each source zip file path once it's finished. The files of the finished sources
+    are copied into the archive in the order of source_zip_file_paths, regardless of the order they finish in, and
+    each source zip file is removed once it's copied.
+    """
+    finished = set()
+    merged_count = 0
+
+    def add_finished_source(source_zip_file_path: str) -> None:
+        nonlocal merged_count
+        finished.add(source_zip_file_path)
+        while merged_count < len(source_zip_file_paths) and source_zip_file_paths[merged_count] in finished:
+            zip_writer.copy_files_from(source_zip_file_paths[merged_count])
+            os.remove(source_zip_file_paths[merged_count])
+            merged_count += 1
+
+    return add_finished_source
+
+
+def retrieve_data_dictionary(working_dir) -> str:
     data_dictionary_file_name = "Data_Dictionary_Crosswalk.xlsx"
     data_dictionary_file_path = os.path.join(working_dir, data_dictionary_file_name)
     data_dictionary_url = settings.DATA_DICTIONARY_DOWNLOAD_URL
     RetrieveFileFromUri(data_dictionary_url).copy(data_dictionary_file_path)
-    append_files_to_zip_file([data_dictionary_file_path], zip_file_path)
+    return data_dictionary_file_path
+
+
+def add_data_dictionary_to_zip(working_dir, zip_file_path):
+    write_to_log(message="Adding data dictionary to zip file")
+    append_files_to_zip_file([retrieve_data_dictionary(working_dir)], zip_file_path)
 
 
 def _kill_spawned_processes(download_job=None):
@@ -609,8 +932,9 @@ def create_empty_data_file(
     working_dir: str,
     piid: str,
     assistance_id: str,
-    zip_file_path: str,
+    zip_file: Union[str, ParallelZipWriter],
     file_format: str,
+    columns: Optional[List[str]] = None,
 ) -> None:
     data_file_name = build_data_file_name(source, download_job, piid, assistance_id)
     extension = FILE_FORMATS[file_format]["extension"]
@@ -619,5 +943,10 @@ def create_empty_data_file(
     write_to_log(
         message=f"Skipping download of {source.file_name} due to no valid columns provided", download_job=download_job
     )
-    Path(source_path).touch()
-    append_files_to_zip_file([source_path], zip_file_path)
+    if file_format == "parquet":
+        # An empty file isn't valid Parquet, so write one with the schema of the source's columns and no rows
+        write_empty_parquet_file(source_path, source.columns(columns))
+    else:
+        Path(source_path).touch()
+    with open_zip_writer(zip_file) as zip_writer:
+        zip_writer.write(source_path, os.path.basename(source_path))
@@ -0,0 +1,148 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from typing import List, Optional, Sequence, Tuple, Union
+
+from usaspending_api.download.filestreaming.zip_file import ParallelZipWriter, open_zip_writer
+
+# Rows fetched from the server-side cursor at a time, each converted to an Arrow record batch
+PARQUET_FETCH_SIZE = 10000
+
+# Rows per row group. Row groups are buffered as Arrow record batches until they're written, which bounds memory
+PARQUET_ROW_GROUP_SIZE = 100000
+
+PARQUET_COMPRESSION = "snappy"
+
+# Arrow types of the Postgres types (by OID) found in downloads. Any other type is written as its text
+_POSTGRES_TYPES = {
+    16: pa.bool_(),  # bool
+    20: pa.int64(),  # int8
+    21: pa.int64(),  # int2
+    23: pa.int64(),  # int4
+    700: pa.float64(),  # float4
+    701: pa.float64(),  # float8
+    1082: pa.date32(),  # date
+    1114: pa.timestamp("us"),  # timestamp
+    1184: pa.timestamp("us", tz="UTC"),  # timestamptz
+}
+_POSTGRES_NUMERIC = 1700
+_MAX_DECIMAL_PRECISION = 38
+
+
+def parquet_schema_from_cursor_description(description: Sequence) -> pa.Schema:
+    """
+    Map the columns of a DB-API cursor description to an Arrow schema. Numerics with a declared precision keep it as
+    decimals, while unconstrained numerics and any other types are written as strings like in the text formats.
+    """
+    fields = []
+    for column in description:
+        if column.type_code in _POSTGRES_TYPES:
+            arrow_type = _POSTGRES_TYPES[column.type_code]
+        elif (
+            column.type_code == _POSTGRES_NUMERIC
+            and column.precision is not None
+            and 0 < column.precision <= _MAX_DECIMAL_PRECISION
+        ):
+            arrow_type = pa.decimal128(column.precision, column.scale or 0)
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _record_batch(rows: List[tuple], schema: pa.Schema) -> pa.RecordBatch:
+    columns = []
+    for i, field in enumerate(schema):
+        values = [row[i] for row in rows]
+        if pa.types.is_string(field.type):
+            values = [None if value is None else str(value) for value in values]
+        columns.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def write_cursor_to_parquet_zip_file(
+    cursor,
+    zip_file: Union[str, ParallelZipWriter],
+    output_name_template: str,
+    row_limit: Optional[int] = None,
+    zip_threads: Optional[int] = None,
+) -> Tuple[int, List[str]]:
+    """
+    Fetch the results of the executed query from ``cursor``, ideally a server-side (named) cursor, and write them as
+    Parquet files into the zip archive at the zip_file path, or of an open ParallelZipWriter. A new file, named from
+    the %s-style output_name_template and numbered from 1, is started after every ``row_limit`` rows, the same way
+    write_delimited_rows_to_zip_file splits the text formats.
+
+    Each file is written in row groups of PARQUET_ROW_GROUP_SIZE rows, dictionary encoded and compressed, so only
+    one row group of the results is held in memory at a time. An archive opened from its path is written with
+    ``zip_threads`` threads, DOWNLOAD_ZIP_COMPRESSION_THREADS by default.
+
+    Returns the number of rows written and the names of the files added to the zip.
+    """
+    schema = None
+    archive_names = []
+    row_count = 0
+
+    with open_zip_writer(zip_file, zip_threads) as zip_writer:
+        archive_file = parquet_writer = None
+        row_group = []
+        row_group_size = 0
+        file_row_count = 0
+
+        def _write_row_group():
+            nonlocal row_group, row_group_size
+            if row_group:
+                parquet_writer.write_table(pa.Table.from_batches(row_group, schema=schema))
+            row_group = []
+            row_group_size = 0
+
+        def _open_archive_file():
+            archive_name = output_name_template % (len(archive_names) + 1)
+            archive_names.append(archive_name)
+            archive_file = zip_writer.open(archive_name)
+            return archive_file, pq.ParquetWriter(
+                archive_file, schema, compression=PARQUET_COMPRESSION, use_dictionary=True
+            )
+
+        def _close_archive_file():
+            _write_row_group()
+            parquet_writer.close()
+            archive_file.close()
+
+        try:
+            while True:
+                rows = cursor.fetchmany(PARQUET_FETCH_SIZE)
+                if schema is None:
+                    # Always add at least one file, even if it only has the schema
+                    schema = parquet_schema_from_cursor_description(cursor.description)
+                    archive_file, parquet_writer = _open_archive_file()
+                if not rows:
+                    break
+
+                while rows:
+                    if row_limit and file_row_count == row_limit:
+                        _close_archive_file()
+                        archive_file, parquet_writer = _open_archive_file()
+                        file_row_count = 0
+                    batch_size = PARQUET_ROW_GROUP_SIZE - row_group_size
+                    if row_limit:
+                        batch_size = min(batch_size, row_limit - file_row_count)
+                    batch_rows, rows = rows[:batch_size], rows[batch_size:]
+
+                    row_group.append(_record_batch(batch_rows, schema))
+                    row_group_size += len(batch_rows)
+                    file_row_count += len(batch_rows)
+                    row_count += len(batch_rows)
+                    if row_group_size >= PARQUET_ROW_GROUP_SIZE:
+                        _write_row_group()
+        finally:
+            if parquet_writer is not None:
+                _close_archive_file()
+
+    return row_count, archive_names
+
+
+def write_empty_parquet_file(file_path: str, column_names: List[str]) -> None:
+    """Write a Parquet file with no rows, whose schema has a string column for each of column_names"""
+    schema = pa.schema([pa.field(column_name, pa.string()) for column_name in column_names])
+    pq.write_table(schema.empty_table(), file_path, compression=PARQUET_COMPRESSION)
@@ -1,5 +1,28 @@
+import csv
+import io
 import os
+import shutil
+import struct
+import time
 import zipfile
+import zlib
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.conf import settings
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple, Union
+
+# Files are split into blocks of this size which are deflated in parallel
+ZIP_BLOCK_SIZE = 1024 * 1024
+
+# Flag of the zip spec for CRC and sizes written after the data instead of in the local header
+_MASK_USE_DATA_DESCRIPTOR = 0x08
+_DATA_DESCRIPTOR_SIGNATURE = 0x08074B50
+
+# Size of the deflate window. The end of each block is used as the dictionary of the next, so the blocks
+# compress nearly as well as one continuous stream (the approach taken by pigz)
+ZIP_DICTIONARY_SIZE = 32 * 1024
 
 
 def append_files_to_zip_file(file_paths, zip_file_path):
@@ -13,7 +36,283 @@ def append_files_to_zip_file(file_paths, zip_file_path):
     Use caution in this case by removing the zip in the finally of an exception and also checking for and removing
     the zip if it exists before you begin to create it from scratch
     """
-    with zipfile.ZipFile(zip_file_path, "a", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as zip_file:
+    with ParallelZipWriter(zip_file_path) as zip_file:
         for file_path in file_paths:
             archive_name = os.path.basename(file_path)
             zip_file.write(file_path, archive_name)
+
+
+def merge_zip_files(source_zip_file_paths: List[str], zip_file_path: str) -> None:
+    """
+    Add the files of each source zip archive to the archive at zip_file_path, keeping the order of the sources.
+    The compressed data is copied as is. The same caution about appending to an existing zip file applies.
+    """
+    with ParallelZipWriter(zip_file_path) as zip_file:
+        for source_zip_file_path in source_zip_file_paths:
+            zip_file.copy_files_from(source_zip_file_path)
+
+
+@contextmanager
+def open_zip_writer(
+    zip_file: Union[str, "ParallelZipWriter"], threads: Optional[int] = None
+) -> Iterator["ParallelZipWriter"]:
+    """
+    Open a ParallelZipWriter adding files to the zip archive at the given path, closed on exit, or use the given
+    ParallelZipWriter as is, left open on exit so more files can be added to its archive
+    """
+    if isinstance(zip_file, ParallelZipWriter):
+        yield zip_file
+    else:
+        with ParallelZipWriter(zip_file, threads=threads) as zip_writer:
+            yield zip_writer
+
+
+def write_delimited_rows_to_zip_file(
+    lines: Iterable[str],
+    zip_file: Union[str, "ParallelZipWriter"],
+    output_name_template: str,
+    delimiter: str = ",",
+    row_limit: Optional[int] = None,
+    keep_headers: bool = True,
+    threads: Optional[int] = None,
+) -> Tuple[int, List[str]]:
+    """
+    Parse the delimited text in ``lines`` and write it straight into files of the zip archive at the zip_file path,
+    or of an open ParallelZipWriter, starting a new file after every ``row_limit`` rows. Files are named from the
+    %s-style output_name_template, numbered from 1, and each gets a copy of the header row when ``keep_headers`` is
+    set. An archive opened from its path is compressed on ``threads`` threads, DOWNLOAD_ZIP_COMPRESSION_THREADS by
+    default.
+
+    This produces the same files as partition_large_delimited_file(...) followed by append_files_to_zip_file(...),
+    without writing the data to disk and reading it back in between. The same caution about appending to an
+    existing zip file applies.
+
+    Returns the number of rows written (not counting headers) and the names of the files added to the zip.
+    """
+    reader = csv.reader(lines, delimiter=delimiter)
+    headers = next(reader, None) if keep_headers else None
+    archive_names = []
+    row_count = 0
+
+    with open_zip_writer(zip_file, threads) as zip_writer:
+
+        def _open_archive_file():
+            archive_name = output_name_template % (len(archive_names) + 1)
+            archive_names.append(archive_name)
+            archive_file = io.TextIOWrapper(zip_writer.open(archive_name), encoding="utf-8", newline="")
+            writer = csv.writer(archive_file, delimiter=delimiter)
+            if headers is not None:
+                writer.writerow(headers)
+            return archive_file, writer
+
+        # Always add at least one file, even if it only has the headers
+        archive_file, writer = _open_archive_file()
+        try:
+            for row in reader:
+                if row_limit and row_count and row_count % row_limit == 0:
+                    archive_file.close()
+                    archive_file, writer = _open_archive_file()
+                writer.writerow(row)
+                row_count += 1
+        finally:
+            archive_file.close()
+
+    return row_count, archive_names
+
+
+class ParallelZipWriter:
+    """
+    Adds files to a zip archive the same way as zipfile.ZipFile(zip_file_path, "a", ZIP_DEFLATED, allowZip64=True),
+    but deflates each file in ZIP_BLOCK_SIZE blocks on a pool of threads instead of on a single core. zlib releases
+    the GIL while compressing, so threads are enough to use every core.
+
+    Blocks are written to the archive in order as they finish, so only a couple of blocks per thread are held in
+    memory. Like ZipFile, only one file of the archive can be open for writing at a time.
+
+    Instead of a path, zip_file can be a writable file object, such as a MultipartUploadFile streaming the archive
+    to S3, in which case a new archive is written to it. The file object doesn't need to be seekable and is left
+    open when the writer is closed.
+
+    zipfile has no API for adding an already compressed file, so files are added the way ZipFile's own writer does
+    it: through its private fp, start_dir, filelist, NameToInfo, _seekable and _didModify attributes (unchanged
+    from Python 3.7 through 3.11). test_zipfile_internals_used_by_parallel_zip_writer pins how they're used, so
+    re-check them there when upgrading Python.
+    """
+
+    def __init__(
+        self,
+        zip_file: Union[str, BinaryIO],
+        compression_level: Optional[int] = None,
+        threads: Optional[int] = None,
+    ):
+        if compression_level is None:
+            compression_level = settings.DOWNLOAD_ZIP_COMPRESSION_LEVEL
+        self.compression_level = compression_level
+        self.threads = threads or settings.DOWNLOAD_ZIP_COMPRESSION_THREADS
+        mode = "a" if isinstance(zip_file, (str, os.PathLike)) else "w"
+        self._zip_file = zipfile.ZipFile(zip_file, mode, compression=zipfile.ZIP_DEFLATED, allowZip64=True)
+        self._executor = ThreadPoolExecutor(max_workers=self.threads)
+
+    def __enter__(self) -> "ParallelZipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._executor.shutdown()
+        self._zip_file.close()
+
+    def open(self, archive_name: Union[str, zipfile.ZipInfo]) -> "_ParallelZipWriteFile":
+        """Open a file of the archive for writing bytes, similar to ZipFile.open(archive_name, "w")"""
+        if isinstance(archive_name, zipfile.ZipInfo):
+            zinfo = archive_name
+        else:
+            zinfo = zipfile.ZipInfo(archive_name, date_time=time.localtime(time.time())[:6])
+            zinfo.external_attr = 0o600 << 16
+        zinfo.compress_type = zipfile.ZIP_DEFLATED
+        return _ParallelZipWriteFile(self, zinfo)
+
+    def write(self, file_path: str, archive_name: Optional[str] = None) -> None:
+        """Add the file at file_path to the archive, similar to ZipFile.write(file_path, archive_name)"""
+        zinfo = zipfile.ZipInfo.from_file(file_path, archive_name)
+        with open(file_path, "rb") as source, self.open(zinfo) as destination:
+            shutil.copyfileobj(source, destination, ZIP_BLOCK_SIZE)
+
+    def copy_files_from(self, zip_file_path: str) -> None:
+        """Add every file of another zip archive, in order, copying the compressed data without recompressing it"""
+        fp = self._zip_file.fp
+        with open(zip_file_path, "rb") as source, zipfile.ZipFile(source, "r") as source_zip_file:
+            for source_zinfo in source_zip_file.infolist():
+                # Skip past the source's local header, whose name and extra field lengths are its last 4 bytes
+                source.seek(source_zinfo.header_offset)
+                local_header = source.read(zipfile.sizeFileHeader)
+                name_length, extra_length = struct.unpack("<HH", local_header[-4:])
+                source.seek(name_length + extra_length, os.SEEK_CUR)
+
+                zinfo = zipfile.ZipInfo(source_zinfo.filename, date_time=source_zinfo.date_time)
+                zinfo.compress_type = source_zinfo.compress_type
+                zinfo.external_attr = source_zinfo.external_attr
+                zinfo.create_system = source_zinfo.create_system
+                zinfo.flag_bits = source_zinfo.flag_bits & ~_MASK_USE_DATA_DESCRIPTOR
+                zinfo.CRC = source_zinfo.CRC
+                zinfo.file_size = source_zinfo.file_size
+                zinfo.compress_size = source_zinfo.compress_size
+
+                self._zip_file._didModify = True
+                zinfo.header_offset = fp.tell()
+                fp.write(zinfo.FileHeader(zip64=True))
+                remaining = zinfo.compress_size
+                while remaining > 0:
+                    data = source.read(min(remaining, ZIP_BLOCK_SIZE))
+                    if not data:
+                        raise zipfile.BadZipFile(f"Truncated file '{zinfo.filename}' in {zip_file_path}")
+                    fp.write(data)
+                    remaining -= len(data)
+
+                self._zip_file.start_dir = fp.tell()
+                self._zip_file.filelist.append(zinfo)
+                self._zip_file.NameToInfo[zinfo.filename] = zinfo
+
+
+def _deflate_block(block: bytes, dictionary: bytes, compression_level: int, is_last_block: bool) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary)
+    else:
+        compressor = zlib.compressobj(compression_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # Every block but the last ends on a byte boundary without an "end of stream" marker, so they can be concatenated
+    return compressor.compress(block) + compressor.flush(zlib.Z_FINISH if is_last_block else zlib.Z_SYNC_FLUSH)
+
+
+class _ParallelZipWriteFile(io.BufferedIOBase):
+    """
+    Writable file of a ParallelZipWriter archive. Mirrors zipfile's own writer: the local header is written first
+    with ZIP64 sizes reserved, then rewritten with the final CRC and sizes on close. When the archive can't seek,
+    the CRC and sizes are written in a data descriptor after the data instead.
+    """
+
+    def __init__(self, writer: ParallelZipWriter, zinfo: zipfile.ZipInfo):
+        super().__init__()
+        self._writer = writer
+        self._zip_file = writer._zip_file
+        self._zinfo = zinfo
+        self._buffer = bytearray()
+        self._pending_blocks = deque()
+        self._dictionary = b""
+        self._crc = 0
+        self._file_size = 0
+        self._compress_size = 0
+
+        self._zip_file._didModify = True
+        if not self._zip_file._seekable:
+            self._zinfo.flag_bits |= _MASK_USE_DATA_DESCRIPTOR
+        self._zinfo.CRC = self._zinfo.file_size = self._zinfo.compress_size = 0
+        self._zinfo.header_offset = self._zip_file.fp.tell()
+        self._zip_file.fp.write(self._zinfo.FileHeader(zip64=True))
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._file_size + len(self._buffer)
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= ZIP_BLOCK_SIZE:
+            self._submit_block(bytes(self._buffer[:ZIP_BLOCK_SIZE]), False)
+            del self._buffer[:ZIP_BLOCK_SIZE]
+        return len(data)
+
+    def _submit_block(self, block: bytes, is_last_block: bool) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._file_size += len(block)
+        future = self._writer._executor.submit(
+            _deflate_block, block, self._dictionary, self._writer.compression_level, is_last_block
+        )
+        self._pending_blocks.append(future)
+        self._dictionary = block[-ZIP_DICTIONARY_SIZE:]
+
+        while len(self._pending_blocks) > self._writer.threads * 2:
+            self._write_next_block()
+
+    def _write_next_block(self) -> None:
+        compressed = self._pending_blocks.popleft().result()
+        self._compress_size += len(compressed)
+        self._zip_file.fp.write(compressed)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._submit_block(bytes(self._buffer), True)
+            self._buffer.clear()
+            while self._pending_blocks:
+                self._write_next_block()
+
+            self._zinfo.CRC = self._crc
+            self._zinfo.file_size = self._file_size
+            self._zinfo.compress_size = self._compress_size
+
+            fp = self._zip_file.fp
+            if self._zinfo.flag_bits & _MASK_USE_DATA_DESCRIPTOR:
+                fp.write(
+                    struct.pack(
+                        "<LLQQ",
+                        _DATA_DESCRIPTOR_SIGNATURE,
+                        self._zinfo.CRC,
+                        self._zinfo.compress_size,
+                        self._zinfo.file_size,
+                    )
+                )
+                self._zip_file.start_dir = fp.tell()
+            else:
+                # Seek backwards and rewrite the header, which now includes the correct CRC and file sizes
+                self._zip_file.start_dir = fp.tell()
+                fp.seek(self._zinfo.header_offset)
+                fp.write(self._zinfo.FileHeader(zip64=True))
+                fp.seek(self._zip_file.start_dir)
+
+            self._zip_file.filelist.append(self._zinfo)
+            self._zip_file.NameToInfo[self._zinfo.filename] = self._zinfo
+        finally:
+            super().close()
@@ -1,5 +1,9 @@
 from usaspending_api.download.helpers.csv_generation_helpers import verify_requested_columns_available
-from usaspending_api.download.helpers.monthly_helpers import pull_modified_agencies_cgacs, write_to_download_log
+from usaspending_api.download.helpers.monthly_helpers import (
+    get_monthly_archive_watermarks,
+    pull_modified_agencies_cgacs,
+    write_to_download_log,
+)
 from usaspending_api.download.helpers.request_validations_helpers import (
     check_types_and_assign_defaults,
     parse_limit,
@@ -8,6 +12,7 @@ from usaspending_api.download.helpers.request_validations_helpers import (
 
 __all__ = [
     "check_types_and_assign_defaults",
+    "get_monthly_archive_watermarks",
     "parse_limit",
     "pull_modified_agencies_cgacs",
     "validate_time_periods",
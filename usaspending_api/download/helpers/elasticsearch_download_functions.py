@@ -1,11 +1,20 @@
+import io
 import itertools
 import logging
+import math
+import psycopg2
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Union, List
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full, Queue
+from threading import Event
+from typing import Iterable, List, NamedTuple, Optional, Union
+from uuid import uuid4
 
 from django.conf import settings
 from django.db.models import QuerySet
-from elasticsearch_dsl import A
+from elasticsearch.helpers import scan
+from elasticsearch_dsl.connections import connections
 
 from usaspending_api.common.elasticsearch.search_wrappers import AwardSearch, TransactionSearch
 from usaspending_api.common.query_with_filters import QueryWithFilters
@@ -13,6 +22,136 @@ from usaspending_api.search.models import AwardSearchView, UniversalTransactionV
 
 logger = logging.getLogger(__name__)
 
+# IDs matching the filters of a download are staged in an unlogged table with this prefix in the download database,
+# which the download's query joins against. It can't be a temporary table since the download is exported by psql.
+# Table names include the time they were created, so tables left behind by workers which were killed before dropping
+# them can be dropped by drop_stale_download_id_tables().
+DOWNLOAD_ID_TABLE_PREFIX = "temp_download_ids_"
+
+# Names of the download ID tables created by this process which haven't been dropped yet
+_download_id_tables = []
+
+# Whether download ID tables can be created in the download database, which is checked once per process since it's
+# commonly a read-only replica
+_download_db_writable = None
+
+# How long each slice's scroll context is kept between pages
+DOWNLOAD_ID_SCROLL_TIMEOUT = "5m"
+
+
+class _SliceFinished(NamedTuple):
+    error: Optional[Exception]
+
+
+def _put_unless_stopped(batches: Queue, item, stop: Event) -> bool:
+    """Put the item on the queue, giving up if the consumer stops. Returns whether the item was put"""
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=1)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _connect_to_download_db() -> "psycopg2.extensions.connection":
+    # Imported here since download_generation depends on the download lookups, which depend on this module
+    from usaspending_api.download.filestreaming.download_generation import retrieve_db_string
+
+    connection = psycopg2.connect(dsn=retrieve_db_string())
+    connection.autocommit = True
+    return connection
+
+
+def download_db_is_writable() -> bool:
+    """Whether the download database accepts writes, i.e. it isn't a replica or set to read-only"""
+    global _download_db_writable
+    if _download_db_writable is None:
+        connection = _connect_to_download_db()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT NOT pg_is_in_recovery() AND current_setting('transaction_read_only') = 'off'")
+                _download_db_writable = cursor.fetchone()[0]
+        finally:
+            connection.close()
+        if not _download_db_writable:
+            logger.warning("The download database is read-only, so download IDs are included in download queries")
+    return _download_db_writable
+
+
+def _download_id_table_created_at(table_name: str) -> Optional[int]:
+    """Epoch seconds a download ID table was created at, or None if its name doesn't include it"""
+    created_at, _, unique_id = table_name[len(DOWNLOAD_ID_TABLE_PREFIX) :].partition("_")
+    return int(created_at) if unique_id and created_at.isdigit() else None
+
+
+def drop_stale_download_id_tables(max_age_hours: Optional[int] = None) -> int:
+    """
+    Drop the download ID tables older than DOWNLOAD_ID_TABLE_MAX_AGE_HOURS, left behind by downloads whose worker was
+    killed before it could drop them. Tables named before they included their creation time are dropped too.
+    Returns the number of tables dropped.
+    """
+    if not download_db_is_writable():
+        return 0
+    if max_age_hours is None:
+        max_age_hours = settings.DOWNLOAD_ID_TABLE_MAX_AGE_HOURS
+    created_before = time.time() - max_age_hours * 3600
+    dropped = 0
+    connection = _connect_to_download_db()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tablename FROM pg_tables WHERE schemaname = current_schema() AND tablename LIKE %s",
+                [DOWNLOAD_ID_TABLE_PREFIX.replace("_", "\\_") + "%"],
+            )
+            for (table_name,) in cursor.fetchall():
+                created_at = _download_id_table_created_at(table_name)
+                if created_at is None or created_at < created_before:
+                    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+                    dropped += 1
+    finally:
+        connection.close()
+    if dropped:
+        logger.info(f"Dropped {dropped:,} download ID tables older than {max_age_hours} hours")
+    return dropped
+
+
+def drop_download_id_tables() -> None:
+    """Drop the download ID tables created by this process, once the downloads using them are complete"""
+    if not _download_id_tables:
+        return
+    connection = _connect_to_download_db()
+    try:
+        with connection.cursor() as cursor:
+            while _download_id_tables:
+                cursor.execute(f"DROP TABLE IF EXISTS {_download_id_tables.pop()}")
+    finally:
+        connection.close()
+
+
+class _DelimitedIdStream(io.TextIOBase):
+    """Readable file of one ID per line, pulled from the batches of IDs as COPY reads it"""
+
+    def __init__(self, id_batches: Iterable[List[int]]):
+        self._id_batches = iter(id_batches)
+        self._buffer = ""
+        self.id_count = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) < size:
+            batch = next(self._id_batches, None)
+            if batch is None:
+                break
+            self.id_count += len(batch)
+            self._buffer += "".join(f"{int(download_id)}\n" for download_id in batch)
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
 
 class _ElasticsearchDownload(metaclass=ABCMeta):
     _source_field = None
@@ -22,53 +161,137 @@ class _ElasticsearchDownload(metaclass=ABCMeta):
     @classmethod
     def _get_download_ids_generator(cls, search: Union[AwardSearch, TransactionSearch], size: int):
         """
-        Takes an AwardSearch or TransactionSearch object (that specifies the index, filter, and source) and returns
-        a generator that yields list of IDs in chunksize SIZE.
+        Takes an AwardSearch or TransactionSearch object (that specifies the index and filter) and returns a
+        generator that yields lists of up to SIZE IDs, in no particular order, up to MAX_DOWNLOAD_LIMIT IDs in total.
+
+        The IDs are read from doc values by a sliced scroll, with each slice scrolled concurrently by its own thread,
+        and are yielded as soon as each page of a slice is retrieved.
         """
         max_retries = 10
         total = search.handle_count(retries=max_retries)
         if total is None:
             logger.error("Error retrieving total results. Max number of attempts reached.")
             return
-        max_iterations = settings.MAX_DOWNLOAD_LIMIT // size
-        req_iterations = (total // size) + 1
-        num_iterations = min(max(1, req_iterations), max_iterations)
-
-        # Setting the shard_size below works in this case because we are aggregating on a unique field. Otherwise, this
-        # would not work due to the number of records. Other places this is set are in the different spending_by
-        # endpoints which are either routed or contain less than 10k unique values, both allowing for the shard
-        # size to be manually set to 10k.
-        for iteration in range(num_iterations):
-            aggregation = A(
-                "terms",
-                field=cls._source_field,
-                include={"partition": iteration, "num_partitions": num_iterations},
-                size=size,
-                shard_size=size,
-            )
-            search.aggs.bucket("results", aggregation)
-            response = search.handle_execute(retries=max_retries).to_dict()
+        remaining = min(total, settings.MAX_DOWNLOAD_LIMIT)
+        if remaining == 0:
+            return
+        slice_count = max(1, min(settings.ES_DOWNLOAD_ID_SLICES, math.ceil(remaining / size)))
+
+        # Each slice can only get ahead of the consumer by a couple of pages
+        batches = Queue(maxsize=slice_count * 2)
+        stop = Event()
+        executor = ThreadPoolExecutor(max_workers=slice_count, thread_name_prefix="download-ids")
+        try:
+            for slice_id in range(slice_count):
+                executor.submit(cls._scroll_slice, search, slice_id, slice_count, size, batches, stop)
 
-            if response is None:
-                raise Exception("Breaking generator, unable to reach cluster")
-            results = []
-            for bucket in response["aggregations"]["results"]["buckets"]:
-                results.append(bucket["key"])
+            finished_slices = 0
+            while finished_slices < slice_count and remaining > 0:
+                batch = batches.get()
+                if isinstance(batch, _SliceFinished):
+                    if batch.error is not None:
+                        raise Exception("Breaking generator, unable to retrieve download IDs") from batch.error
+                    finished_slices += 1
+                    continue
+                batch = batch[:remaining]
+                remaining -= len(batch)
+                yield batch
+        finally:
+            stop.set()
+            executor.shutdown()
 
-            yield results
+    @classmethod
+    def _scroll_slice(
+        cls,
+        search: Union[AwardSearch, TransactionSearch],
+        slice_id: int,
+        slice_count: int,
+        size: int,
+        batches: Queue,
+        stop: Event,
+    ) -> None:
+        """Scroll through one slice of the search, putting each page of IDs on the batches queue"""
+        error = None
+        hits = None
+        try:
+            if slice_count > 1:
+                search = search.extra(slice={"id": slice_id, "max": slice_count})
+            search = search.source(False).extra(docvalue_fields=[cls._source_field])
+            hits = scan(
+                connections.get_connection(search._using),
+                query=search.to_dict(),
+                index=search._index,
+                size=size,
+                scroll=DOWNLOAD_ID_SCROLL_TIMEOUT,
+            )
+            batch = []
+            for hit in hits:
+                batch.append(hit["fields"][cls._source_field][0])
+                if len(batch) == size:
+                    if not _put_unless_stopped(batches, batch, stop):
+                        return
+                    batch = []
+            if batch:
+                _put_unless_stopped(batches, batch, stop)
+        except Exception as e:
+            logger.exception(f"Failed to retrieve slice {slice_id} of {slice_count} of {cls._source_field}")
+            error = e
+        finally:
+            if hits is not None:
+                hits.close()  # Clears the scroll when stopped early
+            _put_unless_stopped(batches, _SliceFinished(error), stop)
 
     @classmethod
-    def _get_download_ids(cls, filters: dict, size: int = 10000) -> QuerySet:
+    def _get_download_id_sql(cls, filters: dict) -> str:
         """
-        Takes a dictionary of the different download filters and returns a flattened list of ids.
+        SQL selecting the IDs matching the download filters: from a download ID table, or from an ARRAY literal of
+        the IDs when the download database is read-only
         """
+        if download_db_is_writable():
+            return f'SELECT "id" FROM {cls._get_download_ids(filters)}'
+        flat_ids = cls._get_download_id_list(filters)
+        return f"SELECT UNNEST(ARRAY{flat_ids}::INTEGER[])"
+
+    @classmethod
+    def _get_download_id_list(cls, filters: dict, size: int = 10000) -> List[int]:
+        """Takes a dictionary of the different download filters and returns a flattened list of ids"""
         filter_query = cls._filter_query_func(filters)
         search = cls._search_type().filter(filter_query).source([cls._source_field])
-        ids = cls._get_download_ids_generator(search, size)
-        flat_ids = list(itertools.chain.from_iterable(ids))
+        flat_ids = list(itertools.chain.from_iterable(cls._get_download_ids_generator(search, size)))
         logger.info(f"Found {len(flat_ids)} {cls._source_field} based on filters")
         return flat_ids
 
+    @classmethod
+    def _get_download_ids(cls, filters: dict, size: int = 10000) -> str:
+        """
+        Takes a dictionary of the different download filters and copies the matching ids, one batch at a time as
+        they're retrieved from Elasticsearch, into a new download ID table. Returns the name of the table.
+        """
+        filter_query = cls._filter_query_func(filters)
+        search = cls._search_type().filter(filter_query).source([cls._source_field])
+        id_stream = _DelimitedIdStream(cls._get_download_ids_generator(search, size))
+
+        table_name = f"{DOWNLOAD_ID_TABLE_PREFIX}{int(time.time())}_{uuid4().hex}"
+        connection = _connect_to_download_db()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE UNLOGGED TABLE {table_name} (id INTEGER NOT NULL)")
+                _download_id_tables.append(table_name)
+                cursor.copy_expert(f"COPY {table_name} (id) FROM STDIN", id_stream)
+                # Give the planner accurate statistics, so it can choose a hash join against the table
+                cursor.execute(f"ANALYZE {table_name}")
+        finally:
+            connection.close()
+        logger.info(f"Found {id_stream.id_count} {cls._source_field} based on filters")
+        return table_name
+
+    @classmethod
+    def count(cls, filters: dict) -> Optional[int]:
+        """Number of IDs a download with these filters would retrieve, or None if the count can't be retrieved"""
+        search = cls._search_type().filter(cls._filter_query_func(filters))
+        total = search.handle_count()
+        return None if total is None else min(total, settings.MAX_DOWNLOAD_LIMIT)
+
     @classmethod
     @abstractmethod
     def query(cls, filters: dict) -> QuerySet:
@@ -83,10 +306,8 @@ class AwardsElasticsearchDownload(_ElasticsearchDownload):
     @classmethod
     def query(cls, filters: dict, values: List[str] = None) -> QuerySet:
         base_queryset = AwardSearchView.objects.all()
-        flat_ids = cls._get_download_ids(filters)
-        queryset = base_queryset.extra(
-            where=[f'"vw_award_search"."award_id" = ANY(SELECT UNNEST(ARRAY{flat_ids}::INTEGER[]))']
-        )
+        download_id_sql = cls._get_download_id_sql(filters)
+        queryset = base_queryset.extra(where=[f'"vw_award_search"."award_id" IN ({download_id_sql})'])
         if values:
             queryset = queryset.values(*values)
         return queryset
@@ -100,8 +321,6 @@ class TransactionsElasticsearchDownload(_ElasticsearchDownload):
     @classmethod
     def query(cls, filters: dict) -> QuerySet:
         base_queryset = UniversalTransactionView.objects.all()
-        flat_ids = cls._get_download_ids(filters)
-        queryset = base_queryset.extra(
-            where=[f'"transaction_normalized"."id" = ANY(SELECT UNNEST(ARRAY{flat_ids}::INTEGER[]))']
-        )
+        download_id_sql = cls._get_download_id_sql(filters)
+        queryset = base_queryset.extra(where=[f'"transaction_normalized"."id" IN ({download_id_sql})'])
         return queryset
@@ -1,9 +1,19 @@
+import hashlib
 import logging
 
+from collections import defaultdict
+from django.db.models import Count, Max
+
+from usaspending_api.awards.models import TransactionNormalized
+from usaspending_api.broker.helpers.last_load_date import get_last_load_date
 from usaspending_api.references.models import ToptierAgency
 
 logger = logging.getLogger(__name__)
 
+# Loads which change the monthly archives without (necessarily) updating their transactions: the award sources,
+# recipients' executive compensation, and the File C data of agency submissions
+MONTHLY_ARCHIVE_DATA_LOAD_TYPES = ("fpds", "fabs", "exec_comp", "submissions")
+
 
 def write_to_download_log(
     message, job_type="USAspendingDownloader", download_job=None, is_debug=False, is_error=False, other_params=None,
@@ -46,3 +56,36 @@ def download_job_to_log_dict(download_job, log_dict=None):
 
 def pull_modified_agencies_cgacs():
     return ToptierAgency.objects.filter(agency__user_selectable=True).values_list("toptier_code", flat=True)
+
+
+def get_monthly_archive_watermarks(start_date: str, end_date: str) -> dict:
+    """
+    Content watermarks of the monthly archives of transactions with an action date in the given range, keyed by
+    (toptier_agency_id, is_fpds), with "all" in place of the id for the archives of all agencies. A watermark is made
+    of the number of transactions, their latest update and the last load dates of MONTHLY_ARCHIVE_DATA_LOAD_TYPES, so
+    it changes whenever transactions are added, updated or deleted, or other data of the archives is loaded.
+    """
+    last_load_dates = [get_last_load_date(load_type) for load_type in MONTHLY_ARCHIVE_DATA_LOAD_TYPES]
+    last_loads = "|".join(last_load_date.isoformat() if last_load_date else "" for last_load_date in last_load_dates)
+
+    counts = defaultdict(int)
+    last_updates = {}
+    rows = (
+        TransactionNormalized.objects.filter(action_date__gte=start_date, action_date__lte=end_date)
+        .values("awarding_agency__toptier_agency_id", "is_fpds")
+        .annotate(count=Count("id"), last_update=Max("update_date"))
+    )
+    for row in rows:
+        for agency in ("all", row["awarding_agency__toptier_agency_id"]):
+            if agency is None:
+                continue
+            key = (agency, row["is_fpds"])
+            counts[key] += row["count"]
+            if row["last_update"] and (key not in last_updates or row["last_update"] > last_updates[key]):
+                last_updates[key] = row["last_update"]
+
+    watermarks = {}
+    for key, count in counts.items():
+        last_update = last_updates[key].isoformat() if key in last_updates else ""
+        watermarks[key] = hashlib.sha256(f"{count}|{last_update}|{last_loads}".encode()).hexdigest()
+    return watermarks
@@ -316,6 +316,8 @@ FILE_FORMATS = {
     "csv": {"delimiter": ",", "extension": "csv", "options": "WITH CSV HEADER"},
     "tsv": {"delimiter": "\t", "extension": "tsv", "options": r"WITH CSV DELIMITER E'\t' HEADER"},
     "pstxt": {"delimiter": "|", "extension": "txt", "options": "WITH CSV DELIMITER '|' HEADER"},
+    # Written from a server-side cursor instead of a psql COPY
+    "parquet": {"delimiter": None, "extension": "parquet", "options": None},
 }
 
 VALID_ACCOUNT_SUBMISSION_TYPES = ("account_balances", "object_class_program_activity", "award_financial")
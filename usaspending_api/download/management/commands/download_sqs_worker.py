@@ -6,15 +6,24 @@ from ddtrace.ext import SpanTypes
 from ddtrace.ext.priority import USER_REJECT
 from ddtrace.constants import ANALYTICS_SAMPLE_RATE_KEY
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
 from usaspending_api.common.sqs.sqs_handler import get_sqs_queue
 from usaspending_api.common.sqs.sqs_work_dispatcher import (
+    QueueLane,
+    QueueLanes,
     SQSWorkDispatcher,
     QueueWorkerProcessError,
     QueueWorkDispatcherError,
 )
+from usaspending_api.download.download_utils import (
+    DOWNLOAD_LANE_LARGE,
+    DOWNLOAD_LANE_SMALL,
+    get_download_lane_queue_name,
+)
 from usaspending_api.download.filestreaming.download_generation import generate_download
+from usaspending_api.download.helpers.elasticsearch_download_functions import drop_stale_download_id_tables
 from usaspending_api.common.sqs.sqs_job_logging import log_job_message
 from usaspending_api.download.helpers.monthly_helpers import download_job_to_log_dict
 from usaspending_api.download.lookups import JOB_STATUS_DICT
@@ -25,6 +34,17 @@ JOB_TYPE = "USAspendingDownloader"
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lanes",
+            nargs="+",
+            choices=[DOWNLOAD_LANE_SMALL, DOWNLOAD_LANE_LARGE],
+            default=[DOWNLOAD_LANE_SMALL, DOWNLOAD_LANE_LARGE],
+            help="Lanes of downloads to work on, by their estimated size. Each lane's concurrency is the number of "
+            "workers running with it. When working on both lanes, the small lane is polled first "
+            "DOWNLOAD_SMALL_LANE_WEIGHT times for each time the large lane is",
+        )
+
     def handle(self, *args, **options):
         # Drop uninteresting polls of the queue from the Tracer
         if tracer.writer._filters:
@@ -32,8 +52,16 @@ class Command(BaseCommand):
         else:
             tracer.writer._filters = [DatadogEagerlyDropTraceFilter()]
 
-        queue = get_sqs_queue()
-        log_job_message(logger=logger, message="Starting SQS polling", job_type=JOB_TYPE)
+        queue_lanes = get_download_queue_lanes(options["lanes"])
+        queue_urls = ",".join(lane.queue.url for lane in queue_lanes.lanes)
+        lane_names = ", ".join(lane.name for lane in queue_lanes.lanes)
+        log_job_message(logger=logger, message=f"Starting SQS polling of lanes: {lane_names}", job_type=JOB_TYPE)
+
+        try:
+            drop_stale_download_id_tables()
+        except Exception:
+            # Not a reason to stop working on downloads, the tables can be dropped when the next worker starts
+            logger.exception("Unable to drop stale download ID tables")
 
         message_found = None
         keep_polling = True
@@ -41,7 +69,7 @@ class Command(BaseCommand):
 
             # Start a Datadog Trace for this poll iter to capture activity in APM
             with tracer.trace(
-                name=f"job.{JOB_TYPE}", service="bulk-download", resource=queue.url, span_type=SpanTypes.WORKER
+                name=f"job.{JOB_TYPE}", service="bulk-download", resource=queue_urls, span_type=SpanTypes.WORKER
             ) as span:
                 # Set True to add trace to App Analytics:
                 # - https://docs.datadoghq.com/tracing/app_analytics/?tab=python#custom-instrumentation
@@ -49,7 +77,7 @@ class Command(BaseCommand):
 
                 # Setup dispatcher that coordinates job activity on SQS
                 dispatcher = SQSWorkDispatcher(
-                    queue, worker_process_name=JOB_TYPE, worker_can_start_child_processes=True
+                    queue_lanes, worker_process_name=JOB_TYPE, worker_can_start_child_processes=True
                 )
 
                 try:
@@ -84,6 +112,22 @@ class Command(BaseCommand):
                 keep_polling = not dispatcher.is_exiting
 
 
+def get_download_queue_lanes(lanes):
+    """Lanes of the queues of the given download lanes. Lanes sharing a queue, when the small lane has no queue of
+    its own, are polled as one
+    """
+    if DOWNLOAD_LANE_LARGE not in lanes and not settings.BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME:
+        # The small lane would poll the main queue, which also has the large downloads
+        raise CommandError("Working on the small lane alone requires BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME to be set")
+    weights = {DOWNLOAD_LANE_SMALL: settings.DOWNLOAD_SMALL_LANE_WEIGHT, DOWNLOAD_LANE_LARGE: 1}
+    queue_lanes = {}
+    for lane in lanes:
+        queue_name = get_download_lane_queue_name(lane)
+        if queue_name not in queue_lanes:
+            queue_lanes[queue_name] = QueueLane(lane, get_sqs_queue(queue_name=queue_name), weights[lane])
+    return QueueLanes(list(queue_lanes.values()))
+
+
 def download_service_app(download_job_id):
     with tracer.trace(name=f"job.{JOB_TYPE}.download", service="bulk-download", span_type=SpanTypes.WORKER) as span:
         # Set True to add trace to App Analytics:
@@ -1,8 +1,5 @@
-import boto3
 import logging
 import os
-import pandas as pd
-import re
 import shutil
 import subprocess
 import tempfile
@@ -25,6 +22,7 @@ from usaspending_api.download.filestreaming.download_source import DownloadSourc
 from usaspending_api.download.helpers import pull_modified_agencies_cgacs
 from usaspending_api.download.lookups import VALUE_MAPPINGS
 from usaspending_api.references.models import ToptierAgency, SubtierAgency
+from usaspending_api.transactions.deletion_journal import get_deleted_records, ingest_deletion_journals
 
 
 logger = logging.getLogger(__name__)
@@ -45,8 +43,8 @@ AWARD_MAPPINGS = {
         "correction_delete_ind": "correction_delete_ind",
         "date_filter": "updated_at",
         "letter_name": "d1",
-        "match": re.compile(r"(?P<month>\d{2})-(?P<day>\d{2})-(?P<year>\d{4})_delete_records_(IDV|award)_\d{10}.csv"),
         "model": "contract_data",
+        "transaction_type": "fpds",
         "unique_iden": "detached_award_proc_unique",
     },
     "Assistance": {
@@ -63,8 +61,8 @@ AWARD_MAPPINGS = {
         "correction_delete_ind": "correction_delete_ind",
         "date_filter": "modified_at",
         "letter_name": "d2",
-        "match": re.compile(r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})_FABSdeletions_\d{10}.csv"),
         "model": "assistance_data",
+        "transaction_type": "fabs",
         "unique_iden": "afa_generated_unique",
     },
 }
@@ -211,73 +209,39 @@ class Command(BaseCommand):
 
         return zipfile_path
 
-    @staticmethod
-    def split_transaction_id(tid):
-        """
-        Split the transaction id on underscores and append the original transaction
-        id to the result.  The returned components should conform to the column
-        definitions provided in AWARD_MAPPINGS[award_type]['column_headers'].
-
-        USAspending uppercases transaction unique ids, but older version of Broker
-        did not so we'll uppercase just to be safe.  Won't hurt anything to uppercase
-        an uppercased id.
-        """
-        tid = tid.upper()
-        return pd.Series(tid.split("_") + [tid])
-
     def add_deletion_records(self, source_path, working_dir, award_type, agency_code, source, generate_since):
-        """ Retrieve deletion files from S3 and append necessary records to the end of the file """
-        logger.info("Retrieving deletion records from S3 files and appending to the CSV")
+        """ Retrieve deletion records from the deletion journal and append necessary records to the end of the file """
+        logger.info("Retrieving deletion records from the deletion journal and appending to the CSV")
+        award_map = AWARD_MAPPINGS[award_type]
 
         # Retrieve all SubtierAgency IDs within this TopTierAgency
-        subtier_agencies = list(
-            SubtierAgency.objects.filter(agency__toptier_agency__toptier_code=agency_code).values_list(
-                "subtier_code", flat=True
+        agency_codes = None
+        if agency_code != "all":
+            agency_codes = list(
+                SubtierAgency.objects.filter(agency__toptier_agency__toptier_code=agency_code).values_list(
+                    "subtier_code", flat=True
+                )
             )
-        )
 
-        # Create a list of keys in the bucket that match the date range we want
-        bucket = boto3.resource("s3", region_name=settings.USASPENDING_AWS_REGION).Bucket(
-            settings.DELETED_TRANSACTION_JOURNAL_FILES
+        deletions = get_deleted_records(
+            award_map["transaction_type"], agency_codes, **self.journal_date_filters(award_type, generate_since)
         )
 
-        all_deletions = pd.DataFrame()
-        for key in bucket.objects.all():
-            match_date = self.check_regex_match(award_type, key.key, generate_since)
-            if match_date:
-                # Create a local copy of the deletion file
-                delete_filepath = "{}{}".format(working_dir, key.key)
-                bucket.download_file(key.key, delete_filepath)
-                df = pd.read_csv(delete_filepath)
-                os.remove(delete_filepath)
-
-                # Split unique identifier into usable columns and add unused columns
-                df = (
-                    df[AWARD_MAPPINGS[award_type]["unique_iden"]]
-                    .apply(self.split_transaction_id)
-                    .replace("-none-", "")
-                    .replace("-NONE-", "")
-                    .rename(columns=AWARD_MAPPINGS[award_type]["column_headers"])
-                )
-
-                # Only include records within the correct agency, and populated files
-                if len(df.index) == 0:
-                    continue
-                if agency_code != "all":
-                    df = df[df[AWARD_MAPPINGS[award_type]["agency_field"]].isin(subtier_agencies)]
-                    if len(df.index) == 0:
-                        continue
-
-                # Reorder columns to make it CSV-ready, and append
-                df = self.organize_deletion_columns(source, df, award_type, match_date)
-                logger.info("Found {} deletion records to include".format(len(df.index)))
-                all_deletions = all_deletions.append(df, ignore_index=True)
-
         # Only append to file if there are any records
-        if len(all_deletions.index) == 0:
+        if len(deletions.index) == 0:
             logger.info("No deletion records to append to file")
-        else:
-            self.add_deletions_to_file(all_deletions, award_type, source_path)
+            return
+
+        # Split unique identifier into usable columns, with the unique identifier itself last
+        column_headers = award_map["column_headers"]
+        df = deletions["unique_key"].str.split("_", expand=True).iloc[:, : len(column_headers) - 1]
+        df[len(column_headers) - 1] = deletions["unique_key"]
+        df = df.replace("-NONE-", "").rename(columns=column_headers)
+
+        # Reorder columns to make it CSV-ready
+        df = self.organize_deletion_columns(source, df, award_type, deletions["journal_date"].astype(str))
+        logger.info("Found {} deletion records to include".format(len(df.index)))
+        self.add_deletions_to_file(df, award_type, source_path)
 
     def organize_deletion_columns(self, source, dataframe, award_type, match_date):
         """ Ensure that the dataframe has all necessary columns in the correct order """
@@ -289,7 +253,7 @@ class Command(BaseCommand):
         unique_values_map = {"correction_delete_ind": "D", "last_modified_date": match_date}
         for header in ordered_columns:
             if header in unique_values_map:
-                dataframe[header] = [unique_values_map[header]] * len(dataframe.index)
+                dataframe[header] = unique_values_map[header]
 
             elif header not in list(AWARD_MAPPINGS[award_type]["column_headers"].values()):
                 dataframe[header] = [""] * len(dataframe.index)
@@ -307,36 +271,26 @@ class Command(BaseCommand):
         logger.info("Appending {} records to the end of the file".format(len(deduped_df.index)))
         deduped_df.to_csv(source_path, mode="a", header=False, index=False)
 
-    def check_regex_match(self, award_type, file_name, generate_since):
-        """ Create a date object from a regular expression match """
-        re_match = re.match(AWARD_MAPPINGS[award_type]["match"], file_name)
-        if not re_match:
-            return False
-
-        year = re_match.group("year")
-        month = re_match.group("month")
-        day = re_match.group("day")
-
-        # Ignore files that are not within the script's time frame
+    def journal_date_filters(self, award_type, generate_since):
+        """ Filters of the journal dates of the deletion records within the script's time frame """
         # Note: Contract deletion files are made in the evening, Assistance files in the morning
-        file_date = date(int(year), int(month), int(day))
         generate_since_date = datetime.strptime(generate_since, "%Y-%m-%d").date()
-        if (award_type == "Assistance" and file_date <= generate_since_date) or (
-            award_type == "Contracts" and file_date < generate_since_date
-        ):
-            return False
+        if award_type == "Assistance":
+            filters = {"journal_date__gt": generate_since_date}
+        else:
+            filters = {"journal_date__gte": generate_since_date}
 
         if self.debugging_end_date:
             # The logic on this is configured to match the logic in the above
             # statements, specifically the bit concerning "Contract deletion
             # files are made in the evening, Assistance files in the morning".
             end_date_date = datetime.strptime(self.debugging_end_date, "%Y-%m-%d").date()
-            if (award_type == "Assistance" and file_date > end_date_date) or (
-                award_type == "Contracts" and file_date >= end_date_date
-            ):
-                return False
+            if award_type == "Assistance":
+                filters["journal_date__lte"] = end_date_date
+            else:
+                filters["journal_date__lt"] = end_date_date
 
-        return "{}-{}-{}".format(year, month, day)
+        return filters
 
     def parse_filters(self, award_types, agency):
         """ Convert readable filters to a filter object usable for the matview filter """
@@ -414,6 +368,10 @@ class Command(BaseCommand):
         if include_all:
             toptier_agencies.append("all")
 
+        if not self.debugging_skip_deleted:
+            # Bring in any new deletion journal files once, before they're queried for each delta file
+            ingest_deletion_journals()
+
         for agency in toptier_agencies:
             for award_type in award_types:
                 self.download(award_type.capitalize(), agency, last_date)
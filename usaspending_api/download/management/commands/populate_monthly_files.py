@@ -3,16 +3,20 @@ import datetime
 import json
 import boto3
 import re
+import time
 
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import connections
+from typing import List, NamedTuple, Optional
 from usaspending_api.awards.v2.lookups.lookups import procurement_type_mapping, assistance_type_mapping
 from usaspending_api.common.helpers.dict_helpers import order_nested_object
 from usaspending_api.common.helpers.fiscal_year_helpers import generate_fiscal_year
 from usaspending_api.common.helpers.s3_helpers import multipart_upload
 from usaspending_api.common.sqs.sqs_handler import get_sqs_queue
 from usaspending_api.download.filestreaming import download_generation
-from usaspending_api.download.helpers import pull_modified_agencies_cgacs
+from usaspending_api.download.helpers import get_monthly_archive_watermarks, pull_modified_agencies_cgacs
 from usaspending_api.download.lookups import JOB_STATUS_DICT
 from usaspending_api.download.models import DownloadJob
 from usaspending_api.download.v2.request_validations import validate_award_request
@@ -27,6 +31,51 @@ award_mappings = {
 }
 
 
+class MonthlyArchive(NamedTuple):
+    """One archive of the monthly files: the awards of a fiscal year, agency and award type"""
+
+    file_name: str
+    fiscal_year: int
+    agency: str
+    award_type: str
+    start_date: str
+    end_date: str
+    watermark: Optional[str] = None
+
+
+class MonthlyArchiveResult(NamedTuple):
+    file_name: str
+    status: str
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    seconds: float = 0.0
+
+
+def _generate_monthly_archive(archive: MonthlyArchive, cleanup: bool) -> MonthlyArchiveResult:
+    """Generate an archive in a process of the pool, which opens its own DB connections"""
+    command = Command()
+    command.bucket = boto3.resource("s3", region_name=settings.USASPENDING_AWS_REGION).Bucket(
+        settings.MONTHLY_DOWNLOAD_S3_BUCKET_NAME
+    )
+    return command.generate_archive(archive, cleanup=cleanup, use_sqs=False)
+
+
+def generate_monthly_archives_in_pool(
+    archives: List[MonthlyArchive], cleanup: bool, processes: int
+) -> List[MonthlyArchiveResult]:
+    """Generate the archives locally on a pool of processes, returning their results in the order they finish"""
+    # Settings are inherited by the processes of the pool, which are forked from this one
+    settings.BULK_DOWNLOAD_S3_BUCKET_NAME = settings.MONTHLY_DOWNLOAD_S3_BUCKET_NAME
+    # Each process opens its own DB connections, rather than sharing the ones of this process
+    connections.close_all()
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(_generate_monthly_archive, archive, cleanup) for archive in archives]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
 class Command(BaseCommand):
     def download(
         self,
@@ -42,6 +91,7 @@ class Command(BaseCommand):
         monthly_download=False,
         cleanup=False,
         use_sqs=False,
+        monthly_watermark=None,
     ):
         date_range = {}
         if start_date:
@@ -67,6 +117,7 @@ class Command(BaseCommand):
             file_name=file_name,
             json_request=json.dumps(order_nested_object(validated_request)),
             monthly_download=True,
+            monthly_watermark=monthly_watermark,
         )
 
         if not use_sqs:
@@ -86,6 +137,54 @@ class Command(BaseCommand):
         else:
             queue = get_sqs_queue(queue_name=settings.BULK_DOWNLOAD_SQS_QUEUE_NAME)
             queue.send_message(MessageBody=str(download_job.download_job_id))
+        return download_job
+
+    def generate_archive(self, archive: MonthlyArchive, cleanup=False, use_sqs=False) -> MonthlyArchiveResult:
+        start = time.perf_counter()
+        try:
+            download_job = self.download(
+                file_name=archive.file_name,
+                prime_award_types=award_mappings[archive.award_type],
+                agency=archive.agency,
+                date_type="action_date",
+                start_date=archive.start_date,
+                end_date=archive.end_date,
+                monthly_download=True,
+                cleanup=cleanup,
+                use_sqs=use_sqs,
+                monthly_watermark=archive.watermark,
+            )
+        except Exception:
+            logger.exception(f"Failed to generate {archive.file_name}")
+            return MonthlyArchiveResult(archive.file_name, "failed", seconds=time.perf_counter() - start)
+        if use_sqs:
+            return MonthlyArchiveResult(archive.file_name, "queued", seconds=time.perf_counter() - start)
+        return MonthlyArchiveResult(
+            archive.file_name,
+            "generated",
+            download_job.number_of_rows,
+            download_job.file_size,
+            time.perf_counter() - start,
+        )
+
+    def is_unchanged(self, archive: MonthlyArchive, bucket_keys: set) -> bool:
+        """Whether the last archive generated for the same files has the same watermark and is still in the bucket"""
+        file_name_prefix = archive.file_name[:-12]  # subtracting the 'YYYYMMDD.zip'
+        last_download_job = (
+            DownloadJob.objects.filter(
+                monthly_download=True,
+                file_name__startswith=file_name_prefix,
+                job_status_id=JOB_STATUS_DICT["finished"],
+            )
+            .order_by("-download_job_id")
+            .values("file_name", "monthly_watermark")
+            .first()
+        )
+        return (
+            last_download_job is not None
+            and last_download_job["monthly_watermark"] == archive.watermark
+            and last_download_job["file_name"] in bucket_keys
+        )
 
     def upload_placeholder(self, file_name, empty_file):
         bucket = settings.BULK_DOWNLOAD_S3_BUCKET_NAME
@@ -152,6 +251,22 @@ class Command(BaseCommand):
             help="Deletes the previous version of the newly generated file after uploading"
             " (only applies if --local is also provided).",
         )
+        parser.add_argument(
+            "--processes",
+            dest="processes",
+            default=1,
+            type=int,
+            help="Number of archives generated at the same time, each in its own process"
+            " (only applies if --local is also provided).",
+        )
+        parser.add_argument(
+            "--skip_unchanged",
+            action="store_true",
+            dest="skip_unchanged",
+            default=False,
+            help="Skips archives whose transactions haven't been added, updated or deleted since they were last"
+            " generated, leaving the last archive in place.",
+        )
         parser.add_argument(
             "--empty-asssistance-file",
             dest="empty_asssistance_file",
@@ -184,6 +299,8 @@ class Command(BaseCommand):
         cleanup = options["cleanup"]
         empty_asssistance_file = options["empty_asssistance_file"]
         empty_contracts_file = options["empty_contracts_file"]
+        processes = options["processes"]
+        skip_unchanged = options["skip_unchanged"]
         if placeholders and (not empty_asssistance_file or not empty_contracts_file):
             raise Exception("Placeholder arg provided but empty files not provided")
 
@@ -213,37 +330,77 @@ class Command(BaseCommand):
         region_name = settings.USASPENDING_AWS_REGION
         self.bucket = boto3.resource("s3", region_name=region_name).Bucket(bucket_name)
 
+        bucket_keys = {key.key for key in self.bucket.objects.all()}
+        reuploads = []
         if not clobber:
-            reuploads = []
-            for key in self.bucket.objects.all():
-                re_match = re.findall("(.*)_Full_{}.zip".format(updated_date_timestamp), key.key)
+            for key in bucket_keys:
+                re_match = re.findall("(.*)_Full_{}.zip".format(updated_date_timestamp), key)
                 if re_match:
                     reuploads.append(re_match[0])
 
-        logger.info("Generating {} files...".format(len(toptier_agencies) * len(fiscal_years) * 2))
-        for agency in toptier_agencies:
-            for fiscal_year in fiscal_years:
-                start_date = "{}-10-01".format(fiscal_year - 1)
-                end_date = "{}-09-30".format(fiscal_year)
+        # Build the whole matrix of archives up front
+        archives = []
+        results = []
+        for fiscal_year in fiscal_years:
+            start_date = "{}-10-01".format(fiscal_year - 1)
+            end_date = "{}-09-30".format(fiscal_year)
+            watermarks = get_monthly_archive_watermarks(start_date, end_date) if skip_unchanged else {}
+            for agency in toptier_agencies:
                 for award_type in award_types:
                     file_name = f"FY{fiscal_year}_{agency['toptier_code']}_{award_type.capitalize()}"
                     full_file_name = f"{file_name}_Full_{updated_date_timestamp}.zip"
                     if not clobber and file_name in reuploads:
                         logger.info(f"Skipping already uploaded: {full_file_name}")
                         continue
-                    if placeholders:
-                        empty_file = empty_contracts_file if award_type == "contracts" else empty_asssistance_file
-                        self.upload_placeholder(file_name=full_file_name, empty_file=empty_file)
-                    else:
-                        self.download(
-                            file_name=full_file_name,
-                            prime_award_types=award_mappings[award_type],
-                            agency=agency["toptier_agency_id"],
-                            date_type="action_date",
-                            start_date=start_date,
-                            end_date=end_date,
-                            monthly_download=True,
-                            cleanup=cleanup,
-                            use_sqs=(not local),
-                        )
+                    watermark = watermarks.get((agency["toptier_agency_id"], award_type == "contracts"), "")
+                    archive = MonthlyArchive(
+                        full_file_name,
+                        fiscal_year,
+                        agency["toptier_agency_id"],
+                        award_type,
+                        start_date,
+                        end_date,
+                        watermark if skip_unchanged else None,
+                    )
+                    if skip_unchanged and self.is_unchanged(archive, bucket_keys):
+                        logger.info(f"Skipping unchanged: {full_file_name}")
+                        results.append(MonthlyArchiveResult(full_file_name, "unchanged"))
+                        continue
+                    archives.append(archive)
+
+        logger.info("Generating {} files...".format(len(archives)))
+        if placeholders:
+            for archive in archives:
+                start = time.perf_counter()
+                empty_file = empty_contracts_file if archive.award_type == "contracts" else empty_asssistance_file
+                self.upload_placeholder(file_name=archive.file_name, empty_file=empty_file)
+                results.append(
+                    MonthlyArchiveResult(archive.file_name, "placeholder", seconds=time.perf_counter() - start)
+                )
+        elif local and processes > 1:
+            results.extend(generate_monthly_archives_in_pool(archives, cleanup, processes))
+        else:
+            for archive in archives:
+                results.append(self.generate_archive(archive, cleanup=cleanup, use_sqs=(not local)))
+
+        log_monthly_archive_summary(results)
+        failed = [result.file_name for result in results if result.status == "failed"]
+        if failed:
+            raise Exception(f"Failed to generate {len(failed)} archive(s): {', '.join(failed)}")
         logger.info("Populate Monthly Files complete")
+
+
+def log_monthly_archive_summary(results):
+    """Log the rows, bytes and seconds of each archive, then the totals"""
+    for result in sorted(results, key=lambda r: r.file_name):
+        logger.info(
+            f"{result.file_name}: {result.status}, {result.rows or 0:,} rows, {result.bytes or 0:,} bytes, "
+            f"{result.seconds:.1f} seconds"
+        )
+    logger.info(
+        f"{sum(1 for r in results if r.status == 'generated')} generated, "
+        f"{sum(1 for r in results if r.status == 'unchanged')} unchanged, "
+        f"{sum(1 for r in results if r.status == 'failed')} failed: "
+        f"{sum(r.rows or 0 for r in results):,} rows, {sum(r.bytes or 0 for r in results):,} bytes, "
+        f"{sum(r.seconds for r in results):.1f} seconds of work"
+    )
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('download', '0003_auto_20180306_1726'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadjob',
+            name='result_key',
+            field=models.TextField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('download', '0004_downloadjob_result_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='downloadjob',
+            name='monthly_watermark',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -26,6 +26,10 @@ class DownloadJob(models.Model):
     update_date = models.DateTimeField(auto_now=True, null=True)
     monthly_download = models.BooleanField(default=False)
     json_request = models.TextField(blank=True, null=True)
+    # Identifies the result of the download, see create_download_result_key(...)
+    result_key = models.TextField(blank=True, null=True, db_index=True)
+    # Content watermark of a monthly archive, see get_monthly_archive_watermarks(...)
+    monthly_watermark = models.TextField(blank=True, null=True)
 
     class Meta:
         managed = True
@@ -0,0 +1,104 @@
+import json
+import pytest
+
+from datetime import datetime, timedelta, timezone
+from model_mommy import mommy
+from rest_framework import status
+from unittest.mock import Mock
+
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE
+from usaspending_api.broker.models import ExternalDataType
+from usaspending_api.download.download_utils import PRIME_AWARD_DATA_LOAD_TYPES
+from usaspending_api.download.lookups import JOB_STATUS, JOB_STATUS_DICT
+from usaspending_api.download.models import DownloadJob
+from usaspending_api.download.v2.base_download_viewset import BaseDownloadViewSet
+
+LAST_LOAD_DATE = datetime(2020, 10, 1, 12, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def download_reuse(db, settings, monkeypatch):
+    for js in JOB_STATUS:
+        mommy.make("download.JobStatus", job_status_id=js.id, name=js.name, description=js.desc)
+    for edt in EXTERNAL_DATA_TYPE:
+        # Some types are already added by migration
+        ExternalDataType.objects.get_or_create(
+            external_data_type_id=edt.id, defaults={"name": edt.name, "description": edt.desc}
+        )
+    for load_type in PRIME_AWARD_DATA_LOAD_TYPES:
+        update_last_load_date(load_type, LAST_LOAD_DATE)
+
+    settings.IS_LOCAL = False
+    process_request = Mock()
+    monkeypatch.setattr(BaseDownloadViewSet, "process_request", process_request)
+    yield process_request
+
+
+def _post(client, endpoint="/api/v2/download/transactions/", **filters):
+    resp = client.post(
+        endpoint,
+        content_type="application/json",
+        data=json.dumps({"filters": {"award_type_codes": ["A"], **filters}, "columns": []}),
+    )
+    assert resp.status_code == status.HTTP_200_OK
+    return resp.json()["file_name"]
+
+
+def test_identical_download_reuses_job(client, download_reuse):
+    file_name = _post(client)
+
+    assert _post(client) == file_name
+    assert _post(client, keywords=["test"]) != file_name
+    assert download_reuse.call_count == 2
+
+
+def test_download_is_reused_until_new_data_is_loaded(client, download_reuse):
+    file_name = _post(client)
+    DownloadJob.objects.filter(file_name=file_name).update(job_status_id=JOB_STATUS_DICT["finished"])
+
+    assert _post(client) == file_name
+
+    update_last_load_date("fpds", LAST_LOAD_DATE + timedelta(days=1))
+
+    new_file_name = _post(client)
+    assert new_file_name != file_name
+    DownloadJob.objects.filter(file_name=new_file_name).update(job_status_id=JOB_STATUS_DICT["finished"])
+
+    update_last_load_date("submissions", LAST_LOAD_DATE + timedelta(days=1))
+
+    assert _post(client) not in (file_name, new_file_name)
+
+
+def test_stale_unfinished_download_is_not_reused(client, download_reuse, settings):
+    file_name = _post(client)
+    DownloadJob.objects.filter(file_name=file_name).update(job_status_id=JOB_STATUS_DICT["running"])
+
+    assert _post(client) == file_name
+
+    DownloadJob.objects.filter(file_name=file_name).update(
+        update_date=datetime.now(timezone.utc) - timedelta(minutes=settings.DOWNLOAD_UNFINISHED_REUSE_MINUTES + 1)
+    )
+    new_file_name = _post(client)
+    assert new_file_name != file_name
+
+    # Finished downloads are reused no matter when they were last updated
+    DownloadJob.objects.filter(file_name=new_file_name).update(
+        job_status_id=JOB_STATUS_DICT["finished"],
+        update_date=datetime.now(timezone.utc) - timedelta(days=1),
+    )
+    assert _post(client) == new_file_name
+
+
+def test_failed_and_expired_downloads_are_not_reused(client, download_reuse, settings):
+    file_name = _post(client)
+    DownloadJob.objects.filter(file_name=file_name).update(job_status_id=JOB_STATUS_DICT["failed"])
+
+    retried_file_name = _post(client)
+    assert retried_file_name != file_name
+
+    DownloadJob.objects.filter(file_name=retried_file_name).update(
+        create_date=datetime.now(timezone.utc) - timedelta(days=settings.DOWNLOAD_RESULT_MAX_AGE_DAYS + 1)
+    )
+
+    assert _post(client) not in (file_name, retried_file_name)
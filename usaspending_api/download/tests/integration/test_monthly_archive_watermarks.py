@@ -0,0 +1,89 @@
+import pytest
+
+from datetime import datetime, timezone
+from model_mommy import mommy
+
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.broker.lookups import EXTERNAL_DATA_TYPE
+from usaspending_api.broker.models import ExternalDataType
+from usaspending_api.download.helpers import get_monthly_archive_watermarks
+from usaspending_api.download.lookups import JOB_STATUS, JOB_STATUS_DICT
+from usaspending_api.download.management.commands.populate_monthly_files import Command, MonthlyArchive
+
+
+@pytest.fixture
+def monthly_transactions():
+    agency = mommy.make("references.Agency", id=1, toptier_agency_id=5)
+    mommy.make("awards.TransactionNormalized", id=1, action_date="2020-01-01", awarding_agency=agency, is_fpds=True)
+    mommy.make("awards.TransactionNormalized", id=2, action_date="2020-02-01", awarding_agency=agency, is_fpds=False)
+    mommy.make("awards.TransactionNormalized", id=3, action_date="2020-03-01", awarding_agency=None, is_fpds=True)
+    mommy.make("awards.TransactionNormalized", id=4, action_date="2021-01-01", awarding_agency=agency, is_fpds=True)
+
+
+@pytest.mark.django_db
+def test_monthly_archive_watermarks(monthly_transactions):
+    watermarks = get_monthly_archive_watermarks("2019-10-01", "2020-09-30")
+    assert set(watermarks) == {(5, True), (5, False), ("all", True), ("all", False)}
+    assert watermarks[(5, True)] != watermarks[("all", True)]
+
+    # Watermarks only change with the transactions of their agency and fiscal year
+    mommy.make("awards.TransactionNormalized", id=5, action_date="2021-02-01", is_fpds=True)
+    assert get_monthly_archive_watermarks("2019-10-01", "2020-09-30") == watermarks
+
+    mommy.make("awards.TransactionNormalized", id=6, action_date="2020-04-01", is_fpds=True)
+    new_watermarks = get_monthly_archive_watermarks("2019-10-01", "2020-09-30")
+    assert new_watermarks[(5, True)] == watermarks[(5, True)]
+    assert new_watermarks[("all", True)] != watermarks[("all", True)]
+
+
+@pytest.mark.django_db
+def test_monthly_archive_watermarks_change_with_load_dates(monthly_transactions):
+    for edt in EXTERNAL_DATA_TYPE:
+        ExternalDataType.objects.get_or_create(
+            external_data_type_id=edt.id, defaults={"name": edt.name, "description": edt.desc}
+        )
+    watermarks = get_monthly_archive_watermarks("2019-10-01", "2020-09-30")
+
+    update_last_load_date("es_awards", datetime(2020, 10, 1, tzinfo=timezone.utc))
+    assert get_monthly_archive_watermarks("2019-10-01", "2020-09-30") == watermarks
+
+    for load_type in ("fpds", "fabs", "exec_comp", "submissions"):
+        update_last_load_date(load_type, datetime(2020, 10, 1, tzinfo=timezone.utc))
+        new_watermarks = get_monthly_archive_watermarks("2019-10-01", "2020-09-30")
+        assert set(new_watermarks) == set(watermarks)
+        assert all(new_watermarks[key] != watermarks[key] for key in watermarks)
+        watermarks = new_watermarks
+
+
+@pytest.mark.django_db
+def test_unchanged_monthly_archive_is_skipped():
+    for js in JOB_STATUS:
+        mommy.make("download.JobStatus", job_status_id=js.id, name=js.name, description=js.desc)
+    archive = MonthlyArchive(
+        "FY2020_005_Contracts_Full_20201001.zip", 2020, 5, "contracts", "2019-10-01", "2020-09-30", "watermark"
+    )
+    bucket_keys = {"FY2020_005_Contracts_Full_20200901.zip"}
+    command = Command()
+
+    assert not command.is_unchanged(archive, bucket_keys)
+
+    mommy.make(
+        "download.DownloadJob",
+        file_name="FY2020_005_Contracts_Full_20200901.zip",
+        monthly_download=True,
+        job_status_id=JOB_STATUS_DICT["finished"],
+        monthly_watermark="watermark",
+    )
+    assert command.is_unchanged(archive, bucket_keys)
+    assert not command.is_unchanged(archive._replace(watermark="new watermark"), bucket_keys)
+    assert not command.is_unchanged(archive, set())  # the last archive is no longer in the bucket
+
+    # Only the last finished archive counts
+    mommy.make(
+        "download.DownloadJob",
+        file_name="FY2020_005_Contracts_Full_20200915.zip",
+        monthly_download=True,
+        job_status_id=JOB_STATUS_DICT["finished"],
+        monthly_watermark="new watermark",
+    )
+    assert not command.is_unchanged(archive, bucket_keys | {"FY2020_005_Contracts_Full_20200915.zip"})
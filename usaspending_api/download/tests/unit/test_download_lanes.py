@@ -0,0 +1,88 @@
+import pytest
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from types import SimpleNamespace
+
+from usaspending_api.download import download_utils
+from usaspending_api.download.filestreaming import download_generation
+from usaspending_api.download.download_utils import (
+    DOWNLOAD_LANE_LARGE,
+    DOWNLOAD_LANE_SMALL,
+    estimate_download_rows,
+    get_download_lane,
+    get_download_lane_queue_name,
+)
+from usaspending_api.download.helpers.elasticsearch_download_functions import (
+    AwardsElasticsearchDownload,
+    TransactionsElasticsearchDownload,
+)
+from usaspending_api.download.management.commands.download_sqs_worker import get_download_queue_lanes
+
+
+@pytest.fixture
+def es_counts(monkeypatch):
+    counts = {AwardsElasticsearchDownload: 10, TransactionsElasticsearchDownload: 40000}
+    for download, count in counts.items():
+        monkeypatch.setattr(download, "count", classmethod(lambda cls, filters: counts[cls]))
+    return counts
+
+
+@pytest.fixture
+def sub_award_estimates(monkeypatch):
+    """Planner estimates of the queries of the download types which aren't from Elasticsearch"""
+    estimates = {"sub_awards": 500}
+
+    def _get_download_sources(json_request):
+        return [SimpleNamespace(queryset=download_type) for download_type in json_request["download_types"]]
+
+    monkeypatch.setattr(download_generation, "get_download_sources", _get_download_sources)
+    monkeypatch.setattr(download_utils, "_estimate_queryset_rows", lambda queryset: estimates[queryset])
+    return estimates
+
+
+# The download types sent by the award and transaction download endpoints
+@pytest.mark.parametrize(
+    "download_types,expected_rows,expected_limited_rows",
+    [(["elasticsearch_awards", "sub_awards"], 510, 110), (["elasticsearch_transactions", "sub_awards"], 40500, 200)],
+)
+def test_estimate_download_rows(es_counts, sub_award_estimates, download_types, expected_rows, expected_limited_rows):
+    json_request = {"download_types": download_types, "filters": {}}
+    assert estimate_download_rows(json_request) == expected_rows
+    assert estimate_download_rows({**json_request, "limit": 100}) == expected_limited_rows
+
+
+def test_small_award_download_lane(es_counts, sub_award_estimates, monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SMALL_JOB_MAX_ROWS", 1000)
+    json_request = {"download_types": ["elasticsearch_awards", "sub_awards"], "filters": {}}
+    assert get_download_lane(json_request) == DOWNLOAD_LANE_SMALL
+
+
+def test_unknown_download_size_is_large(es_counts, sub_award_estimates):
+    es_counts[TransactionsElasticsearchDownload] = None
+    json_request = {"download_types": ["elasticsearch_transactions", "sub_awards"], "filters": {}}
+    assert estimate_download_rows(json_request) is None
+    assert get_download_lane(json_request) == DOWNLOAD_LANE_LARGE
+
+
+def test_download_lane_by_size(monkeypatch):
+    monkeypatch.setattr(settings, "DOWNLOAD_SMALL_JOB_MAX_ROWS", 1000)
+    monkeypatch.setattr(download_utils, "estimate_download_rows", lambda json_request: json_request["rows"])
+    assert get_download_lane({"rows": 1000}) == DOWNLOAD_LANE_SMALL
+    assert get_download_lane({"rows": 1001}) == DOWNLOAD_LANE_LARGE
+
+
+def test_small_lane_falls_back_to_main_queue(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_DOWNLOAD_SQS_QUEUE_NAME", "downloads")
+    monkeypatch.setattr(settings, "BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME", "")
+    assert get_download_lane_queue_name(DOWNLOAD_LANE_SMALL) == "downloads"
+
+    monkeypatch.setattr(settings, "BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME", "small-downloads")
+    assert get_download_lane_queue_name(DOWNLOAD_LANE_SMALL) == "small-downloads"
+    assert get_download_lane_queue_name(DOWNLOAD_LANE_LARGE) == "downloads"
+
+
+def test_small_lane_alone_requires_its_own_queue(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME", "")
+    with pytest.raises(CommandError):
+        get_download_queue_lanes([DOWNLOAD_LANE_SMALL])
@@ -0,0 +1,131 @@
+import itertools
+import psycopg2
+import pytest
+import time
+
+from unittest.mock import Mock
+
+from usaspending_api.common.helpers.generic_helper import generate_test_db_connection_string
+from usaspending_api.download.filestreaming import download_generation
+from usaspending_api.download.helpers import elasticsearch_download_functions
+from usaspending_api.download.helpers.elasticsearch_download_functions import (
+    AwardsElasticsearchDownload,
+    DOWNLOAD_ID_TABLE_PREFIX,
+    drop_download_id_tables,
+    drop_stale_download_id_tables,
+    TransactionsElasticsearchDownload,
+)
+
+
+@pytest.fixture
+def download_ids(db, monkeypatch):
+    monkeypatch.setattr(
+        download_generation, "retrieve_db_string", Mock(return_value=generate_test_db_connection_string())
+    )
+    monkeypatch.setattr(elasticsearch_download_functions, "_download_id_tables", [])
+    monkeypatch.setattr(elasticsearch_download_functions, "_download_db_writable", None)
+    monkeypatch.setattr(
+        elasticsearch_download_functions.QueryWithFilters, "generate_awards_elasticsearch_query", Mock()
+    )
+    monkeypatch.setattr(
+        elasticsearch_download_functions.QueryWithFilters, "generate_transactions_elasticsearch_query", Mock()
+    )
+    batches = [[1, 2, 3], [], [40, 50]]
+    for download_class in (AwardsElasticsearchDownload, TransactionsElasticsearchDownload):
+        monkeypatch.setattr(download_class, "_get_download_ids_generator", Mock(return_value=iter(batches)))
+    yield
+    drop_download_id_tables()
+
+
+def _select_ids(table_name):
+    with psycopg2.connect(dsn=generate_test_db_connection_string()) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {table_name} ORDER BY id")
+            return [row[0] for row in cursor.fetchall()]
+
+
+@pytest.mark.parametrize("download_class", [AwardsElasticsearchDownload, TransactionsElasticsearchDownload])
+def test_download_ids_are_staged_in_table(download_ids, download_class):
+    queryset = download_class.query({})
+
+    table_name = elasticsearch_download_functions._download_id_tables[0]
+    sql = str(queryset.query)
+    assert table_name.startswith(DOWNLOAD_ID_TABLE_PREFIX)
+    assert f'IN (SELECT "id" FROM {table_name})' in sql
+    assert "ARRAY" not in sql
+    assert _select_ids(table_name) == [1, 2, 3, 40, 50]
+
+    drop_download_id_tables()
+
+    with pytest.raises(psycopg2.ProgrammingError):
+        _select_ids(table_name)
+
+
+@pytest.mark.parametrize("download_class", [AwardsElasticsearchDownload, TransactionsElasticsearchDownload])
+def test_download_ids_are_inlined_for_read_only_database(download_ids, download_class, monkeypatch):
+    monkeypatch.setattr(elasticsearch_download_functions, "_download_db_writable", False)
+
+    sql = str(download_class.query({}).query)
+
+    assert "UNNEST(ARRAY[1, 2, 3, 40, 50]::INTEGER[])" in sql
+    assert elasticsearch_download_functions._download_id_tables == []
+
+
+def _create_table(table_name):
+    with psycopg2.connect(dsn=generate_test_db_connection_string()) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE UNLOGGED TABLE {table_name} (id INTEGER NOT NULL)")
+
+
+def test_drop_stale_download_id_tables(download_ids):
+    stale_table = f"{DOWNLOAD_ID_TABLE_PREFIX}{int(time.time()) - 25 * 3600}_stale"
+    unnamed_table = f"{DOWNLOAD_ID_TABLE_PREFIX}0123456789abcdef"
+    recent_table = f"{DOWNLOAD_ID_TABLE_PREFIX}{int(time.time())}_recent"
+    for table_name in (stale_table, unnamed_table, recent_table):
+        _create_table(table_name)
+
+    assert drop_stale_download_id_tables(24) == 2
+
+    for table_name in (stale_table, unnamed_table):
+        with pytest.raises(psycopg2.ProgrammingError):
+            _select_ids(table_name)
+    assert _select_ids(recent_table) == []
+    elasticsearch_download_functions._download_id_tables.append(recent_table)  # dropped by the fixture
+
+
+@pytest.fixture
+def sliced_scroll(settings, monkeypatch):
+    settings.ES_HOSTNAME = "http://localhost:9200"
+    settings.ES_DOWNLOAD_ID_SLICES = 3
+    monkeypatch.setattr(AwardsElasticsearchDownload._search_type, "handle_count", Mock(return_value=25))
+    queries = []
+
+    def scan(client, query, index, size, scroll):
+        queries.append(query)
+        slice_id, slice_count = query["slice"]["id"], query["slice"]["max"]
+        for award_id in range(1, 26):
+            if award_id % slice_count == slice_id:
+                yield {"_id": str(award_id), "fields": {"award_id": [award_id]}}
+
+    monkeypatch.setattr(elasticsearch_download_functions, "scan", scan)
+    yield queries
+
+
+def test_download_ids_are_scrolled_in_slices(sliced_scroll):
+    search = AwardsElasticsearchDownload._search_type()
+
+    batches = list(AwardsElasticsearchDownload._get_download_ids_generator(search, 4))
+
+    assert sorted(itertools.chain.from_iterable(batches)) == list(range(1, 26))
+    assert all(len(batch) <= 4 for batch in batches)
+    assert sorted(query["slice"]["id"] for query in sliced_scroll) == [0, 1, 2]
+    assert all(query["_source"] is False and query["docvalue_fields"] == ["award_id"] for query in sliced_scroll)
+
+
+def test_download_ids_are_limited(sliced_scroll, settings):
+    settings.MAX_DOWNLOAD_LIMIT = 10
+    search = AwardsElasticsearchDownload._search_type()
+
+    batches = list(AwardsElasticsearchDownload._get_download_ids_generator(search, 4))
+
+    assert len(list(itertools.chain.from_iterable(batches))) == 10
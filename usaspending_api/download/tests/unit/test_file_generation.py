@@ -1,7 +1,17 @@
+import boto3
+import io
+import json
+import multiprocessing
+import pytest
+import tempfile
+import time
+import zipfile
+
 from unittest.mock import MagicMock
 
 from usaspending_api.awards.v2.lookups.lookups import award_type_mapping, contract_type_mapping, idv_type_mapping
 from usaspending_api.download.filestreaming import download_generation
+from usaspending_api.download.filestreaming.zip_file import ParallelZipWriter, write_delimited_rows_to_zip_file
 from usaspending_api.download.lookups import VALUE_MAPPINGS
 
 
@@ -127,3 +137,164 @@ def test_idv_treasury_account_funding_csv_sources():
     VALUE_MAPPINGS["idv_federal_account_funding"]["filter_function"] = original
     assert csv_sources[0].file_type == "treasury_account"
     assert csv_sources[0].source_type == "idv_federal_account_funding"
+
+
+def _fake_source_export(row_count, rows, seconds, running, max_running):
+    with running.get_lock():
+        running.value += 1
+        max_running.value = max(max_running.value, running.value)
+    time.sleep(seconds)
+    with running.get_lock():
+        running.value -= 1
+    if rows < 0:
+        raise ValueError("Export failed")
+    row_count.value = rows
+
+
+def _patch_source_exports(monkeypatch, settings, max_concurrent_sources):
+    settings.DOWNLOAD_MAX_CONCURRENT_SOURCES = max_concurrent_sources
+    monkeypatch.setattr(download_generation, "WAIT_FOR_PROCESS_SLEEP", 0.1)
+    running = multiprocessing.Value("i", 0)
+    max_running = multiprocessing.Value("i", 0)
+
+    def _prepare_source_export(
+        source, columns, download_job, piid, assistance_id, zip_file_path, limit, file_format, zip_threads
+    ):
+        row_count = multiprocessing.Value("q", 0)
+        process = multiprocessing.Process(
+            target=_fake_source_export, args=(row_count, source["rows"], source["seconds"], running, max_running)
+        )
+        temp_file, temp_file_path = tempfile.mkstemp()
+        return download_generation.SourceExport(process, row_count, temp_file, temp_file_path)
+
+    monkeypatch.setattr(download_generation, "prepare_source_export", _prepare_source_export)
+    return max_running
+
+
+def test_parse_sources_concurrently(monkeypatch, settings):
+    max_running = _patch_source_exports(monkeypatch, settings, 2)
+    download_job = MagicMock(monthly_download=False, number_of_rows=0)
+    sources = [({"rows": rows, "seconds": 0.5}, f"source_{i}.zip") for i, rows in enumerate([1, 20, 300, 4000])]
+
+    download_generation.parse_sources(sources, None, download_job, None, None, None, "csv")
+
+    assert download_job.number_of_rows == 4321
+    assert max_running.value == 2
+    download_job.save.assert_called_once()
+
+
+def test_parse_sources_failure(monkeypatch, settings):
+    _patch_source_exports(monkeypatch, settings, 2)
+    download_job = MagicMock(monthly_download=False, number_of_rows=0)
+    sources = [({"rows": 1, "seconds": 0.1}, "source_0.zip"), ({"rows": -1, "seconds": 0.1}, "source_1.zip")]
+
+    with pytest.raises(Exception, match="Command failed"):
+        download_generation.parse_sources(sources, None, download_job, None, None, None, "csv")
+
+
+def test_run_source_exports_without_download_job(monkeypatch):
+    monkeypatch.setattr(download_generation, "WAIT_FOR_PROCESS_SLEEP", 0.1)
+    running = multiprocessing.Value("i", 0)
+    max_running = multiprocessing.Value("i", 0)
+    exports = []
+    for i, (rows, seconds) in enumerate([(1, 0.6), (20, 0.1), (300, 0.1)]):
+        row_count = multiprocessing.Value("q", 0)
+        process = multiprocessing.Process(
+            target=_fake_source_export, args=(row_count, rows, seconds, running, max_running)
+        )
+        exports.append((download_generation.SourceExport(process, row_count, None, None), f"file_{i}.zip"))
+    completed = []
+
+    download_generation.run_source_exports(exports, 3, on_export_complete=completed.append)
+
+    assert max_running.value == 3
+    assert [export.row_count.value for export, _ in exports] == [1, 20, 300]
+    assert completed == ["file_1.zip", "file_2.zip", "file_0.zip"]
+
+
+def test_run_source_exports_timeout_terminates_every_export(monkeypatch):
+    monkeypatch.setattr(download_generation, "WAIT_FOR_PROCESS_SLEEP", 0.1)
+    monkeypatch.setattr(download_generation, "MAX_VISIBILITY_TIMEOUT", 0.5)
+    running = multiprocessing.Value("i", 0)
+    max_running = multiprocessing.Value("i", 0)
+    exports = []
+    for i in range(3):
+        row_count = multiprocessing.Value("q", 0)
+        process = multiprocessing.Process(target=_fake_source_export, args=(row_count, 1, 60, running, max_running))
+        exports.append((download_generation.SourceExport(process, row_count, None, None), f"file_{i}.zip"))
+    download_job = MagicMock(monthly_download=False, download_job_id=1)
+
+    with pytest.raises(TimeoutError):
+        download_generation.run_source_exports(exports, 2, download_job)
+
+    assert max_running.value == 2
+    assert [export.process.exitcode is not None for export, _ in exports] == [True, True, False]  # 3rd never started
+
+
+@pytest.mark.parametrize(
+    "export_count,max_concurrent_exports,expected_threads", [(1, 4, 8), (2, 4, 4), (6, 4, 2), (4, 16, 2), (0, 4, 8)]
+)
+def test_get_export_zip_threads(settings, export_count, max_concurrent_exports, expected_threads):
+    settings.DOWNLOAD_ZIP_COMPRESSION_THREADS = 8
+
+    assert download_generation.get_export_zip_threads(export_count, max_concurrent_exports) == expected_threads
+
+
+def test_generate_download_streaming_upload(monkeypatch, settings, tmp_path):
+    moto = pytest.importorskip("moto")
+    mock_s3 = getattr(moto, "mock_s3", None) or moto.mock_aws
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    settings.IS_LOCAL = False
+    settings.BULK_DOWNLOAD_STREAMING_UPLOAD = True
+    settings.BULK_DOWNLOAD_S3_BUCKET_NAME = "test-bucket"
+    settings.USASPENDING_AWS_REGION = "us-east-1"
+    settings.CSV_LOCAL_PATH = f"{tmp_path}/"
+
+    sources = [MagicMock(rows=rows) for rows in (3, 2)]
+    for source in sources:
+        source.columns.return_value = ["id"]
+    exported = []
+
+    def _prepare_export_query(source, columns, download_job, piid, assistance_id, limit, file_format):
+        return (f"source_{len(exported)}", *tempfile.mkstemp())
+
+    def _stream_psql_to_zip_file(temp_sql_file_path, zip_file, data_file_name, file_format, download_job, row_count):
+        # Written straight into the archive being uploaded, without a zip file of the source on local disk
+        assert isinstance(zip_file, ParallelZipWriter)
+        assert list(tmp_path.rglob("*.zip")) == []
+        source = sources[len(exported)]
+        lines = ["id\n"] + [f"{i}\n" for i in range(source.rows)]
+        row_count.value, _ = write_delimited_rows_to_zip_file(lines, zip_file, f"{data_file_name}_%s.csv")
+        exported.append(data_file_name)
+
+    def _prepare_source_export(*args, **kwargs):
+        raise AssertionError("Sources are exported in this process when streaming to S3")
+
+    monkeypatch.setattr(download_generation, "get_download_sources", lambda json_request, origination: sources)
+    monkeypatch.setattr(download_generation, "_prepare_export_query", _prepare_export_query)
+    monkeypatch.setattr(download_generation, "stream_psql_to_zip_file", _stream_psql_to_zip_file)
+    monkeypatch.setattr(download_generation, "prepare_source_export", _prepare_source_export)
+    monkeypatch.setattr(download_generation, "write_to_log", lambda **kwargs: None)
+    monkeypatch.setattr(download_generation, "drop_download_id_tables", lambda: None)
+    monkeypatch.setattr(download_generation, "_kill_spawned_processes", lambda download_job=None: None)
+    download_job = MagicMock(
+        json_request=json.dumps({"file_format": "csv"}), file_name="test.zip", monthly_download=False
+    )
+
+    with mock_s3():
+        s3_client = boto3.client("s3", region_name="us-east-1")
+        s3_client.create_bucket(Bucket="test-bucket")
+
+        assert download_generation.generate_download(download_job) == "test.zip"
+
+        s3_object = s3_client.get_object(Bucket="test-bucket", Key="test.zip")
+        with zipfile.ZipFile(io.BytesIO(s3_object["Body"].read())) as zf:
+            assert zf.namelist() == ["source_0_1.csv", "source_1_1.csv"]
+            assert zf.read("source_1_1.csv") == b"id\r\n0\r\n1\r\n"
+
+    assert exported == ["source_0", "source_1"]
+    assert download_job.number_of_rows == 5
+    assert download_job.number_of_columns == 2
+    assert download_job.file_size == s3_object["ContentLength"]
+    assert list(tmp_path.iterdir()) == []
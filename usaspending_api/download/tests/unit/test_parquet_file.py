@@ -0,0 +1,116 @@
+import pytest
+import zipfile
+
+from collections import namedtuple
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+from usaspending_api.download.filestreaming import download_generation, parquet_file
+from usaspending_api.download.filestreaming.parquet_file import write_cursor_to_parquet_zip_file
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+Column = namedtuple("Column", ["name", "type_code", "precision", "scale"])
+
+DESCRIPTION = [
+    Column("award_id", 23, None, None),
+    Column("recipient_name", 25, None, None),
+    Column("obligation", 1700, 23, 2),
+    Column("unconstrained_amount", 1700, None, None),
+    Column("action_date", 1082, None, None),
+    Column("last_modified_date", 1184, None, None),
+    Column("is_active", 16, None, None),
+]
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._rows = list(rows)
+        self.description = None
+
+    def fetchmany(self, size):
+        self.description = DESCRIPTION
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def _rows(count):
+    return [
+        (
+            i,
+            None if i % 5 == 0 else f"Recipient {i % 3}",
+            Decimal(f"{i}.25"),
+            Decimal("1.5") * i,
+            date(2020, 1, 1 + i % 28),
+            datetime(2020, 6, 1, tzinfo=timezone.utc),
+            i % 2 == 0,
+        )
+        for i in range(count)
+    ]
+
+
+def test_write_cursor_to_parquet_zip_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(parquet_file, "PARQUET_FETCH_SIZE", 7)
+    monkeypatch.setattr(parquet_file, "PARQUET_ROW_GROUP_SIZE", 10)
+    rows = _rows(45)
+    zip_file_path = str(tmp_path / "test.zip")
+
+    row_count, archive_names = write_cursor_to_parquet_zip_file(
+        FakeCursor(rows), zip_file_path, "data_%s.parquet", row_limit=20
+    )
+
+    assert row_count == 45
+    assert archive_names == ["data_1.parquet", "data_2.parquet", "data_3.parquet"]
+    with zipfile.ZipFile(zip_file_path) as zf:
+        assert zf.namelist() == archive_names
+        tables = []
+        for archive_name, expected_rows, row_groups in zip(archive_names, [20, 20, 5], [[10, 10], [10, 10], [5]]):
+            zf.extract(archive_name, str(tmp_path))
+            parquet = pq.ParquetFile(str(tmp_path / archive_name))
+            assert parquet.metadata.num_rows == expected_rows
+            assert [parquet.metadata.row_group(i).num_rows for i in range(parquet.num_row_groups)] == row_groups
+            tables.append(parquet.read())
+
+    table = pa.concat_tables(tables)
+    assert table.schema.names == [column.name for column in DESCRIPTION]
+    assert table.schema.field("obligation").type == pa.decimal128(23, 2)
+    assert table.schema.field("unconstrained_amount").type == pa.string()
+    assert [tuple(row.values()) for row in table.to_pylist()] == [
+        (i, name, obligation, str(amount), action_date, modified, active)
+        for i, name, obligation, amount, action_date, modified, active in rows
+    ]
+
+
+def test_write_cursor_to_parquet_zip_file_without_rows(tmp_path):
+    zip_file_path = str(tmp_path / "test.zip")
+
+    row_count, archive_names = write_cursor_to_parquet_zip_file(FakeCursor([]), zip_file_path, "data_%s.parquet")
+
+    assert row_count == 0
+    with zipfile.ZipFile(zip_file_path) as zf:
+        zf.extract(archive_names[0], str(tmp_path))
+    table = pq.read_table(str(tmp_path / archive_names[0]))
+    assert table.num_rows == 0
+    assert table.schema.names == [column.name for column in DESCRIPTION]
+
+
+def test_create_empty_parquet_data_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_generation, "write_to_log", lambda **kwargs: None)
+    source = MagicMock()
+    source.columns.return_value = ["award_id", "recipient_name"]
+    download_job = MagicMock(monthly_download=True, file_name="FY2020_All_Contracts_Full_20201001.zip")
+    zip_file_path = str(tmp_path / "test.zip")
+
+    download_generation.create_empty_data_file(
+        source, download_job, str(tmp_path), None, None, zip_file_path, "parquet", ["award_id", "recipient_name"]
+    )
+
+    source.columns.assert_called_once_with(["award_id", "recipient_name"])
+    with zipfile.ZipFile(zip_file_path) as zf:
+        assert zf.namelist() == ["FY2020_All_Contracts_Full_20201001.parquet"]
+        zf.extract("FY2020_All_Contracts_Full_20201001.parquet", str(tmp_path / "extracted"))
+    table = pq.read_table(str(tmp_path / "extracted" / "FY2020_All_Contracts_Full_20201001.parquet"))
+    assert table.num_rows == 0
+    assert table.schema.names == ["award_id", "recipient_name"]
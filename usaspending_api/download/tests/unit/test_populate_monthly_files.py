@@ -0,0 +1,29 @@
+import os
+
+from usaspending_api.download.management.commands import populate_monthly_files
+from usaspending_api.download.management.commands.populate_monthly_files import (
+    MonthlyArchive,
+    MonthlyArchiveResult,
+    generate_monthly_archives_in_pool,
+)
+
+
+def _generate_monthly_archive_in_test(archive, cleanup):
+    # Report the process which generated the archive in place of its rows
+    return MonthlyArchiveResult(archive.file_name, "generated", rows=os.getpid())
+
+
+def test_generate_monthly_archives_in_pool(settings, monkeypatch):
+    settings.MONTHLY_DOWNLOAD_S3_BUCKET_NAME = "monthly-bucket"
+    monkeypatch.setattr(populate_monthly_files, "_generate_monthly_archive", _generate_monthly_archive_in_test)
+    archives = [
+        MonthlyArchive(f"FY2020_{agency:03}_Contracts_Full_20201001.zip", 2020, agency, "contracts", "", "")
+        for agency in range(6)
+    ]
+
+    results = generate_monthly_archives_in_pool(archives, cleanup=False, processes=2)
+
+    assert sorted(result.file_name for result in results) == sorted(archive.file_name for archive in archives)
+    assert {result.status for result in results} == {"generated"}
+    assert os.getpid() not in {result.rows for result in results}
+    assert settings.BULK_DOWNLOAD_S3_BUCKET_NAME == "monthly-bucket"
@@ -1,8 +1,18 @@
+import io
 import os
 import zipfile
+import zlib
 
 from tempfile import NamedTemporaryFile
-from usaspending_api.download.filestreaming.zip_file import append_files_to_zip_file
+from usaspending_api.common.csv_helpers import partition_large_delimited_file
+from usaspending_api.download.filestreaming import zip_file as zip_file_module
+from usaspending_api.download.filestreaming.zip_file import (
+    append_files_to_zip_file,
+    merge_zip_files,
+    ParallelZipWriter,
+    write_delimited_rows_to_zip_file,
+    ZIP_BLOCK_SIZE,
+)
 
 
 def test_append_files_to_zip_file():
@@ -20,3 +30,185 @@ def test_append_files_to_zip_file():
                         os.path.basename(include_file_1.name),
                         os.path.basename(include_file_2.name),
                     ]
+
+
+def test_write_delimited_rows_to_zip_file(tmp_path):
+    lines = ["a,b\r\n", "1,one\r\n", '2,"two\r\nlines"\r\n', "3,three\r\n", "4,\r\n", "5,five\r\n"]
+    zip_file_path = str(tmp_path / "test.zip")
+
+    row_count, archive_names = write_delimited_rows_to_zip_file(lines, zip_file_path, "data_%s.csv", row_limit=2)
+
+    assert row_count == 5
+    assert archive_names == ["data_1.csv", "data_2.csv", "data_3.csv"]
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.namelist() == archive_names
+        assert zf.read("data_1.csv").decode() == 'a,b\r\n1,one\r\n2,"two\r\nlines"\r\n'
+        assert zf.read("data_2.csv").decode() == "a,b\r\n3,three\r\n4,\r\n"
+        assert zf.read("data_3.csv").decode() == "a,b\r\n5,five\r\n"
+
+
+def test_write_delimited_rows_to_zip_file_matches_partitioned_files(tmp_path):
+    lines = ["a|b\n"] + [f"{i}|value {i}\n" for i in range(7)]
+    source_path = tmp_path / "source.txt"
+    source_path.write_text("".join(lines))
+    partitioned_files = partition_large_delimited_file(
+        str(source_path), delimiter="|", row_limit=3, output_name_template="data_%s.txt"
+    )
+
+    row_count, archive_names = write_delimited_rows_to_zip_file(
+        lines, str(tmp_path / "test.zip"), "data_%s.txt", delimiter="|", row_limit=3
+    )
+
+    assert row_count == 7
+    assert archive_names == [os.path.basename(f) for f in partitioned_files]
+    with zipfile.ZipFile(str(tmp_path / "test.zip"), "r") as zf:
+        for file_path in partitioned_files:
+            with open(file_path, "rb") as f:
+                assert zf.read(os.path.basename(file_path)) == f.read()
+
+
+def test_write_delimited_rows_to_zip_file_headers_only(tmp_path):
+    zip_file_path = str(tmp_path / "test.zip")
+
+    row_count, archive_names = write_delimited_rows_to_zip_file(["a,b\n"], zip_file_path, "data_%s.csv", row_limit=2)
+
+    assert (row_count, archive_names) == (0, ["data_1.csv"])
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.read("data_1.csv") == b"a,b\r\n"
+
+
+class _UnseekableFile(io.RawIOBase):
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+    def tell(self):
+        return len(self.data)
+
+
+def _large_csv(row_count):
+    return "".join(
+        f'{i},"Agency {i % 97}",{i * 31 % 100003}.25,"Description {i * 7919 % 10007}"\r\n' for i in range(row_count)
+    )
+
+
+def test_parallel_zip_writer(tmp_path):
+    data = _large_csv(200000).encode()  # several ZIP_BLOCK_SIZE blocks
+    source_path = tmp_path / "large.csv"
+    source_path.write_bytes(data)
+    zip_file_path = str(tmp_path / "test.zip")
+
+    with ParallelZipWriter(zip_file_path, compression_level=6, threads=3) as zip_file:
+        zip_file.write(str(source_path), "large.csv")
+        with zip_file.open("empty.csv"):
+            pass
+    with zipfile.ZipFile(str(tmp_path / "sequential.zip"), "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.write(str(source_path), "large.csv")
+
+    assert len(data) > 3 * ZIP_BLOCK_SIZE
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["large.csv", "empty.csv"]
+        assert zf.read("large.csv") == data
+        assert zf.read("empty.csv") == b""
+        # Blocks share their dictionaries, so they compress about as well as a single stream
+        sequential_size = zipfile.ZipFile(str(tmp_path / "sequential.zip")).getinfo("large.csv").compress_size
+        assert zf.getinfo("large.csv").compress_size < sequential_size * 1.01
+
+
+def test_parallel_zip_writer_small_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(zip_file_module, "ZIP_BLOCK_SIZE", 1024)
+    data = _large_csv(500).encode()  # about 30 blocks
+    source_path = tmp_path / "small.csv"
+    source_path.write_bytes(data)
+    zip_file_path = str(tmp_path / "test.zip")
+
+    with ParallelZipWriter(zip_file_path, compression_level=6, threads=2) as zip_file:
+        zip_file.write(str(source_path), "small.csv")
+
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.read("small.csv") == data
+        assert zf.getinfo("small.csv").CRC == zlib.crc32(data)
+
+
+def test_zipfile_internals_used_by_parallel_zip_writer(tmp_path):
+    """
+    ParallelZipWriter adds files by updating private attributes of zipfile.ZipFile, the same way ZipFile's own
+    writer does. Pin how it relies on them, so a Python upgrade which changes them fails here.
+    """
+    zip_file_path = str(tmp_path / "test.zip")
+    with zipfile.ZipFile(zip_file_path, "w") as zf:
+        zf.writestr("a.csv", b"a")
+
+    data = b"b"
+    with zipfile.ZipFile(zip_file_path, "a") as zf:
+        assert zf._seekable is True
+        assert zf._didModify is False
+        assert zf.start_dir == zf.fp.tell()
+        assert list(zf.NameToInfo) == ["a.csv"]
+
+        zinfo = zipfile.ZipInfo("b.csv")
+        zinfo.CRC = zlib.crc32(data)
+        zinfo.file_size = zinfo.compress_size = len(data)
+        zinfo.header_offset = zf.fp.tell()
+        zf.fp.write(zinfo.FileHeader(zip64=True))
+        zf.fp.write(data)
+        zf.start_dir = zf.fp.tell()
+        zf.filelist.append(zinfo)
+        zf.NameToInfo[zinfo.filename] = zinfo
+        zf._didModify = True  # otherwise the central directory isn't rewritten on close
+
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["a.csv", "b.csv"]
+        assert zf.read("b.csv") == data
+
+    with zipfile.ZipFile(_UnseekableFile(), "w") as zf:
+        assert zf._seekable is False
+
+
+def test_merge_zip_files(tmp_path):
+    source_zip_file_paths = []
+    for i, names in enumerate([["b.csv", "a.csv"], [], ["c.csv"]]):
+        source_zip_file_path = str(tmp_path / f"source_{i}.zip")
+        with zipfile.ZipFile(source_zip_file_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name in names:
+                zf.writestr(name, f"contents of {name}\n" * 1000)
+        source_zip_file_paths.append(source_zip_file_path)
+    zip_file_path = str(tmp_path / "merged.zip")
+    append_files_to_zip_file([str(tmp_path / "source_2.zip")], zip_file_path)
+
+    merge_zip_files(source_zip_file_paths, zip_file_path)
+
+    with zipfile.ZipFile(zip_file_path, "r") as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["source_2.zip", "b.csv", "a.csv", "c.csv"]
+        for name in ["b.csv", "a.csv", "c.csv"]:
+            assert zf.read(name) == f"contents of {name}\n".encode() * 1000
+            assert zf.getinfo(name).compress_size < zf.getinfo(name).file_size
+
+
+def test_parallel_zip_writer_to_unseekable_file(tmp_path):
+    data = _large_csv(100000).encode()
+    source_zip_file_path = str(tmp_path / "source.zip")
+    with zipfile.ZipFile(source_zip_file_path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("copied.csv", data)
+    unseekable_file = _UnseekableFile()
+
+    with ParallelZipWriter(unseekable_file, compression_level=6, threads=2) as zip_file:
+        with zip_file.open("written.csv") as archive_file:
+            archive_file.write(data)
+        zip_file.copy_files_from(source_zip_file_path)
+
+    with zipfile.ZipFile(io.BytesIO(bytes(unseekable_file.data)), "r") as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["written.csv", "copied.csv"]
+        assert zf.read("written.csv") == data
+        assert zf.read("copied.csv") == data
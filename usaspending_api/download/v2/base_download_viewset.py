@@ -1,10 +1,12 @@
 import json
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import Optional
 
 from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
 from rest_framework.exceptions import NotFound
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -13,7 +15,14 @@ from rest_framework.views import APIView
 from usaspending_api.common.api_versioning import api_transformations, API_TRANSFORM_FUNCTIONS
 from usaspending_api.common.helpers.dict_helpers import order_nested_object
 from usaspending_api.common.sqs.sqs_handler import get_sqs_queue
-from usaspending_api.download.download_utils import create_unique_filename, log_new_download_job
+from usaspending_api.download.download_utils import (
+    create_download_result_key,
+    create_unique_filename,
+    get_download_lane,
+    get_download_lane_queue_name,
+    lock_download_result_key,
+    log_new_download_job,
+)
 from usaspending_api.download.filestreaming import download_generation
 from usaspending_api.download.filestreaming.s3_handler import S3Handler
 from usaspending_api.download.helpers import write_to_download_log as write_to_log
@@ -62,26 +71,38 @@ class BaseDownloadViewSet(APIView):
         json_request["request_type"] = request_type.value["name"]
         ordered_json_request = json.dumps(order_nested_object(json_request))
 
-        # Check if the same request has been called today
-        # TODO!!! Use external_data_load_date to determine data freshness
-        updated_date_timestamp = datetime.strftime(datetime.now(timezone.utc), "%Y-%m-%d")
-        cached_download = (
-            DownloadJob.objects.filter(json_request=ordered_json_request, update_date__gte=updated_date_timestamp)
-            .exclude(job_status_id=JOB_STATUS_DICT["failed"])
-            .values("download_job_id", "file_name")
-            .first()
-        )
-
-        if cached_download and not settings.IS_LOCAL:
-            # By returning the cached files, there should be no duplicates on a daily basis
-            write_to_log(message=f"Generating file from cached download job ID: {cached_download['download_job_id']}")
-            cached_filename = cached_download["file_name"]
-            return self.get_download_response(file_name=cached_filename)
+        # Reuse the job of the same request made since its data was last loaded, whether it's finished or still
+        # running, so there are no duplicate downloads until new data arrives. Unfinished jobs are only reused while
+        # they're recently updated, rather than waiting on one whose worker may have died
+        result_key = create_download_result_key(ordered_json_request, json_request)
+        now = datetime.now(timezone.utc)
+        oldest_reusable_date = now - timedelta(days=settings.DOWNLOAD_RESULT_MAX_AGE_DAYS)
+        oldest_unfinished_update = now - timedelta(minutes=settings.DOWNLOAD_UNFINISHED_REUSE_MINUTES)
+        with transaction.atomic():
+            lock_download_result_key(result_key)
+            cached_download = (
+                DownloadJob.objects.filter(result_key=result_key, create_date__gte=oldest_reusable_date)
+                .filter(Q(job_status_id=JOB_STATUS_DICT["finished"]) | Q(update_date__gte=oldest_unfinished_update))
+                .exclude(job_status_id=JOB_STATUS_DICT["failed"])
+                .order_by("-download_job_id")
+                .values("download_job_id", "file_name")
+                .first()
+            )
 
-        final_output_zip_name = create_unique_filename(json_request, origination=origination)
-        download_job = DownloadJob.objects.create(
-            job_status_id=JOB_STATUS_DICT["ready"], file_name=final_output_zip_name, json_request=ordered_json_request
-        )
+            if cached_download and not settings.IS_LOCAL:
+                write_to_log(
+                    message=f"Generating file from cached download job ID: {cached_download['download_job_id']}"
+                )
+                cached_filename = cached_download["file_name"]
+                return self.get_download_response(file_name=cached_filename)
+
+            final_output_zip_name = create_unique_filename(json_request, origination=origination)
+            download_job = DownloadJob.objects.create(
+                job_status_id=JOB_STATUS_DICT["ready"],
+                file_name=final_output_zip_name,
+                json_request=ordered_json_request,
+                result_key=result_key,
+            )
 
         log_new_download_job(request, download_job)
         self.process_request(download_job)
@@ -95,11 +116,17 @@ class BaseDownloadViewSet(APIView):
         else:
             # Send a SQS message that will be processed by another server which will eventually run
             # download_generation.generate_download(download_source) (see download_sqs_worker.py)
+            # Queue it in the lane of its size, so small downloads aren't stuck behind large ones
+            lane = get_download_lane(json.loads(download_job.json_request))
             write_to_log(
-                message=f"Passing download_job {download_job.download_job_id} to SQS", download_job=download_job
+                message=f"Passing download_job {download_job.download_job_id} to SQS in the {lane} lane",
+                download_job=download_job,
+            )
+            queue = get_sqs_queue(queue_name=get_download_lane_queue_name(lane))
+            queue.send_message(
+                MessageBody=str(download_job.download_job_id),
+                MessageAttributes={"lane": {"DataType": "String", "StringValue": lane}},
             )
-            queue = get_sqs_queue(queue_name=settings.BULK_DOWNLOAD_SQS_QUEUE_NAME)
-            queue.send_message(MessageBody=str(download_job.download_job_id))
 
     def get_download_response(self, file_name: str):
         """
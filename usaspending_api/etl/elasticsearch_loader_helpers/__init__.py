@@ -4,10 +4,13 @@ from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import (
     deleted_awards,
     deleted_transactions,
     get_deleted_award_ids,
+    get_max_terms_count,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.extract_data import (
     count_of_records_to_process,
     extract_records,
+    extract_records_in_batches,
+    get_partition_boundaries,
     obtain_extract_sql,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.index_config import (
@@ -18,24 +21,37 @@ from usaspending_api.etl.elasticsearch_loader_helpers.index_config import (
     toggle_refresh_off,
     toggle_refresh_on,
 )
-from usaspending_api.etl.elasticsearch_loader_helpers.load_data import load_data
+from usaspending_api.etl.elasticsearch_loader_helpers.load_data import load_data, load_data_in_batches
 from usaspending_api.etl.elasticsearch_loader_helpers.transform_data import (
     transform_award_data,
     transform_covid19_faba_data,
+    transform_covid19_faba_data_in_batches,
     transform_transaction_data,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
     chunks,
     execute_sql_statement,
+    execute_sql_statement_reusing_connection,
     format_log,
     gen_random_name,
+    stream_sql_statement,
+    stream_sql_statement_reusing_connection,
     TaskSpec,
+    threaded_prefetch,
+)
+from usaspending_api.etl.elasticsearch_loader_helpers.checkpoint import (
+    clear_checkpoint,
+    get_completed_partitions,
+    mark_partition_complete,
+    read_checkpoint_plan,
+    write_checkpoint_plan,
 )
 from usaspending_api.etl.elasticsearch_loader_helpers.controller import Controller
 
 __all__ = [
     "check_awards_for_deletes",
     "chunks",
+    "clear_checkpoint",
     "Controller",
     "count_of_records_to_process",
     "create_award_type_aliases",
@@ -44,19 +60,32 @@ __all__ = [
     "deleted_awards",
     "deleted_transactions",
     "execute_sql_statement",
+    "execute_sql_statement_reusing_connection",
     "extract_records",
+    "extract_records_in_batches",
     "format_log",
     "gen_random_name",
+    "get_completed_partitions",
     "get_deleted_award_ids",
+    "get_max_terms_count",
+    "get_partition_boundaries",
     "load_data",
+    "load_data_in_batches",
+    "mark_partition_complete",
     "obtain_extract_sql",
+    "read_checkpoint_plan",
     "set_final_index_config",
+    "stream_sql_statement",
+    "stream_sql_statement_reusing_connection",
     "swap_aliases",
     "take_snapshot",
     "TaskSpec",
+    "threaded_prefetch",
     "toggle_refresh_off",
     "toggle_refresh_on",
     "transform_award_data",
     "transform_covid19_faba_data",
+    "transform_covid19_faba_data_in_batches",
     "transform_transaction_data",
+    "write_checkpoint_plan",
 ]
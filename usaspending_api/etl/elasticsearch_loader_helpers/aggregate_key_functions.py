@@ -1,7 +1,8 @@
 import json
 import logging
 
-from typing import Optional, List
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, List, Tuple
 
 
 logger = logging.getLogger("script")
@@ -179,3 +180,102 @@ def _country_agg_key(location_type, record: dict) -> Optional[str]:
             "country_name": record[f"{location_type}_country_name"],
         }
     )
+
+
+@dataclass(frozen=True)
+class JsonAggKey:
+    """
+    Declarative form of an agg key function above which builds a JSON object straight from record fields.
+    Used by transform_compiler.compile_transform(...) to inline the key's creation. It must produce exactly
+    the same string as the function it is registered for in JSON_AGG_KEY_SPECS.
+    """
+
+    required_fields: Tuple[str, ...]  # agg key is None if any of these record fields is None
+    fields: Tuple[Tuple[str, str], ...]  # (JSON key, record field) in the order they must appear
+    optional_fields: Tuple[str, ...] = ()  # record fields left out of the JSON when the record has no such field
+
+
+def _agency_agg_key_spec(agency_type: str, agency_tier: str) -> JsonAggKey:
+    prefix = f"{agency_type}_{agency_tier}_agency"
+    return JsonAggKey(
+        required_fields=(f"{prefix}_name",),
+        fields=(
+            ("name", f"{prefix}_name"),
+            ("abbreviation", f"{prefix}_abbreviation"),
+            ("code", f"{prefix}_code"),
+            ("id", f"{agency_type}_toptier_agency_id"),
+        ),
+        optional_fields=(f"{prefix}_abbreviation", f"{prefix}_code"),
+    )
+
+
+def _county_agg_key_spec(location_type: str) -> JsonAggKey:
+    return JsonAggKey(
+        required_fields=(f"{location_type}_state_code", f"{location_type}_county_code"),
+        fields=(
+            ("country_code", f"{location_type}_country_code"),
+            ("state_code", f"{location_type}_state_code"),
+            ("state_fips", f"{location_type}_state_fips"),
+            ("county_code", f"{location_type}_county_code"),
+            ("county_name", f"{location_type}_county_name"),
+            ("population", f"{location_type}_county_population"),
+        ),
+    )
+
+
+def _congressional_agg_key_spec(location_type: str) -> JsonAggKey:
+    return JsonAggKey(
+        required_fields=(f"{location_type}_state_code", f"{location_type}_congressional_code"),
+        fields=(
+            ("country_code", f"{location_type}_country_code"),
+            ("state_code", f"{location_type}_state_code"),
+            ("state_fips", f"{location_type}_state_fips"),
+            ("congressional_code", f"{location_type}_congressional_code"),
+            ("population", f"{location_type}_congressional_population"),
+        ),
+    )
+
+
+def _state_agg_key_spec(location_type: str) -> JsonAggKey:
+    return JsonAggKey(
+        required_fields=(f"{location_type}_state_code",),
+        fields=(
+            ("country_code", f"{location_type}_country_code"),
+            ("state_code", f"{location_type}_state_code"),
+            ("state_name", f"{location_type}_state_name"),
+            ("population", f"{location_type}_state_population"),
+        ),
+    )
+
+
+def _country_agg_key_spec(location_type: str) -> JsonAggKey:
+    return JsonAggKey(
+        required_fields=(f"{location_type}_country_code",),
+        fields=(
+            ("country_code", f"{location_type}_country_code"),
+            ("country_name", f"{location_type}_country_name"),
+        ),
+    )
+
+
+JSON_AGG_KEY_SPECS: Dict[Callable, JsonAggKey] = {
+    awarding_subtier_agency_agg_key: _agency_agg_key_spec("awarding", "subtier"),
+    awarding_toptier_agency_agg_key: _agency_agg_key_spec("awarding", "toptier"),
+    funding_subtier_agency_agg_key: _agency_agg_key_spec("funding", "subtier"),
+    funding_toptier_agency_agg_key: _agency_agg_key_spec("funding", "toptier"),
+    naics_agg_key: JsonAggKey(
+        required_fields=("naics_code",), fields=(("code", "naics_code"), ("description", "naics_description"))
+    ),
+    psc_agg_key: JsonAggKey(
+        required_fields=("product_or_service_code",),
+        fields=(("code", "product_or_service_code"), ("description", "product_or_service_description")),
+    ),
+    pop_county_agg_key: _county_agg_key_spec("pop"),
+    recipient_location_county_agg_key: _county_agg_key_spec("recipient_location"),
+    pop_congressional_agg_key: _congressional_agg_key_spec("pop"),
+    recipient_location_congressional_agg_key: _congressional_agg_key_spec("recipient_location"),
+    pop_state_agg_key: _state_agg_key_spec("pop"),
+    recipient_location_state_agg_key: _state_agg_key_spec("recipient_location"),
+    pop_country_agg_key: _country_agg_key_spec("pop"),
+    recipient_location_country_agg_key: _country_agg_key_spec("recipient_location"),
+}
@@ -0,0 +1,108 @@
+import json
+import logging
+import os
+import shutil
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Set, Tuple
+
+from usaspending_api.etl.elasticsearch_loader_helpers.utilities import format_log
+
+logger = logging.getLogger("script")
+
+PLAN_FILE_NAME = "plan.json"
+PARTITION_FILE_NAME = "partition_{partition_number}.json"
+
+
+def checkpoint_path(checkpoint_dir: str, index_name: str) -> Path:
+    """Each index being loaded gets its own sub-directory of checkpoint files"""
+    return Path(checkpoint_dir) / index_name
+
+
+def _write_json_atomically(path: Path, contents: dict) -> None:
+    """Write to a temp file and rename it, so a crash can't leave a partially written checkpoint behind"""
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    temp_path.write_text(json.dumps(contents, sort_keys=True))
+    os.replace(temp_path, path)
+
+
+def write_checkpoint_plan(
+    config: dict,
+    record_count: int,
+    min_id: int,
+    max_id: int,
+    partition_ranges: List[Tuple[int, int]],
+    extra_null_partition: bool,
+) -> None:
+    """
+        Record the partitions of a new ETL run. Any checkpoints left from a previous run into an index of
+        the same name are discarded, since its partitions may not line up with these.
+    """
+    path = checkpoint_path(config["checkpoint_dir"], config["index_name"])
+    if path.exists():
+        shutil.rmtree(path)
+    path.mkdir(parents=True)
+
+    plan = {
+        "index_name": config["index_name"],
+        "data_type": config["data_type"],
+        "record_count": record_count,
+        "min_id": min_id,
+        "max_id": max_id,
+        "partition_ranges": partition_ranges,
+        "extra_null_partition": extra_null_partition,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    _write_json_atomically(path / PLAN_FILE_NAME, plan)
+    logger.info(format_log(f"Writing checkpoints for {len(partition_ranges):,} partitions to '{path}'"))
+
+
+def read_checkpoint_plan(config: dict) -> dict:
+    path = checkpoint_path(config["checkpoint_dir"], config["index_name"]) / PLAN_FILE_NAME
+    if not path.exists():
+        raise RuntimeError(f"No checkpoint found to resume at '{path}'")
+
+    plan = json.loads(path.read_text())
+    if plan["data_type"] != config["data_type"]:
+        raise RuntimeError(f"Checkpoint at '{path}' is for '{plan['data_type']}' data, not '{config['data_type']}'")
+    plan["partition_ranges"] = [tuple(r) for r in plan["partition_ranges"]]
+    return plan
+
+
+def mark_partition_complete(
+    checkpoint_dir: str,
+    index_name: str,
+    partition_number: int,
+    id_range: Optional[Tuple[int, int]],
+    success: int,
+    fail: int,
+) -> None:
+    """
+        Record that a partition was fully loaded. Safe to be called concurrently by many worker processes.
+        Partitions with failed docs should not be marked complete, so they are loaded again on --resume.
+    """
+    checkpoint = {
+        "index_name": index_name,
+        "partition_number": partition_number,
+        "id_range": id_range,
+        "success": success,
+        "fail": fail,
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+    }
+    path = checkpoint_path(checkpoint_dir, index_name) / PARTITION_FILE_NAME.format(partition_number=partition_number)
+    _write_json_atomically(path, checkpoint)
+
+
+def get_completed_partitions(config: dict) -> Set[int]:
+    """Partitions loaded without any failed docs"""
+    path = checkpoint_path(config["checkpoint_dir"], config["index_name"])
+    checkpoints = [json.loads(p.read_text()) for p in path.glob(PARTITION_FILE_NAME.format(partition_number="*"))]
+    return {checkpoint["partition_number"] for checkpoint in checkpoints if not checkpoint["fail"]}
+
+
+def clear_checkpoint(config: dict) -> None:
+    path = checkpoint_path(config["checkpoint_dir"], config["index_name"])
+    if path.exists():
+        shutil.rmtree(path)
+        logger.info(format_log(f"Removed checkpoints at '{path}'"))
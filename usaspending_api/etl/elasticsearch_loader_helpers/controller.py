@@ -1,27 +1,43 @@
 import logging
+import os
+import psutil as ps
 
 from django.core.management import call_command
 from math import ceil
-from multiprocessing import Pool, Event, Value
+from multiprocessing import Pool, Event, Process, Queue, Value
+from queue import Empty
 from time import perf_counter
-from typing import Generator, List, Tuple
+from typing import Generator, List, Optional, Tuple
 
 from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from elasticsearch import Elasticsearch
+
 from usaspending_api.common.elasticsearch.client import instantiate_elasticsearch_client
 from usaspending_api.etl.elasticsearch_loader_helpers import (
+    clear_checkpoint,
     count_of_records_to_process,
     create_index,
+    execute_sql_statement_reusing_connection,
     deleted_awards,
     deleted_transactions,
     extract_records,
+    extract_records_in_batches,
     format_log,
     gen_random_name,
+    get_completed_partitions,
+    get_partition_boundaries,
     load_data,
+    load_data_in_batches,
+    mark_partition_complete,
     obtain_extract_sql,
+    read_checkpoint_plan,
     set_final_index_config,
+    stream_sql_statement_reusing_connection,
     swap_aliases,
     TaskSpec,
+    threaded_prefetch,
     toggle_refresh_on,
+    write_checkpoint_plan,
 )
 from usaspending_api.common.helpers.sql_helpers import close_all_django_db_conns
 
@@ -30,6 +46,13 @@ logger = logging.getLogger("script")
 total_doc_success = Value("i", 0, lock=True)
 total_doc_fail = Value("i", 0, lock=True)
 
+# Max number of batches buffered between each stage of a streamed partition (extract -> transform -> load)
+PIPELINE_QUEUE_SIZE = 2
+
+# ES client kept for the life of a worker process, so it's only created once no matter how many partitions it runs
+_worker_es_client = None
+_worker_es_client_pid = None
+
 
 def init_shared_abort(a: Event) -> None:
     """
@@ -46,8 +69,13 @@ class Controller:
     def __init__(self, config):
         self.config = config
         self.tasks = []
+        self.partition_ranges = []
 
     def prepare_for_etl(self) -> None:
+        if self.config.get("resume"):
+            self.prepare_to_resume_etl()
+            return
+
         if self.config["process_deletes"]:
             self.run_deletes()
         logger.info(format_log("Assessing data to process"))
@@ -57,10 +85,24 @@ class Controller:
             self.processes = []
             return
 
-        self.config["partitions"] = self.determine_partitions()
+        if self.config.get("partition_strategy") == "density":
+            self.partition_ranges = self.determine_partition_ranges_by_density()
+            self.config["partitions"] = len(self.partition_ranges)
+        else:
+            self.config["partitions"] = self.determine_partitions()
         self.config["processes"] = min(self.config["processes"], self.config["partitions"])
         self.tasks = self.construct_tasks()
 
+        if self.config.get("checkpoint_dir"):
+            write_checkpoint_plan(
+                self.config,
+                self.record_count,
+                self.min_id,
+                self.max_id,
+                [self.get_id_range_for_partition(p) for p in range(self.config["partitions"])],
+                self.config["extra_null_partition"],
+            )
+
         logger.info(
             format_log(
                 f"Created {len(self.tasks):,} task partitions"
@@ -75,20 +117,118 @@ class Controller:
             call_command("es_configure", "--template-only", f"--load-type={self.config['data_type']}")
             create_index(self.config["index_name"], instantiate_elasticsearch_client())
 
+    def prepare_to_resume_etl(self) -> None:
+        """Rebuild the partitions of a previous run from its checkpoint, keeping only those not yet completed"""
+        plan = read_checkpoint_plan(self.config)
+        completed = get_completed_partitions(self.config)
+        self.record_count, self.min_id, self.max_id = plan["record_count"], plan["min_id"], plan["max_id"]
+        self.partition_ranges = plan["partition_ranges"]
+        self.config["partitions"] = len(self.partition_ranges)
+        self.config["extra_null_partition"] = plan["extra_null_partition"]
+
+        self.tasks = [task for task in self.construct_tasks() if task.partition_number not in completed]
+        self.config["processes"] = max(min(self.config["processes"], len(self.tasks)), 1)
+
+        logger.info(
+            format_log(
+                f"Resuming load into '{self.config['index_name']}' from checkpoint: {len(completed):,} of"
+                f" {len(self.tasks) + len(completed):,} partitions were already completed,"
+                f" {len(self.tasks):,} remain with {self.config['processes']:,} parallel processes"
+            )
+        )
+
     def dispatch_tasks(self) -> None:
+        if self.config.get("persistent_workers"):
+            self.dispatch_tasks_to_persistent_workers()
+            return
+
         _abort = Event()  # Event which when set signals an error occured in a subprocess
         parellel_procs = self.config["processes"]
         with Pool(parellel_procs, maxtasksperchild=1, initializer=init_shared_abort, initargs=(_abort,)) as pool:
-            pool.map(extract_transform_load, self.tasks)
+            # chunksize=1 so that idle workers pull the next partition from the shared task queue one at a time,
+            # instead of being handed a fixed share of the partitions up-front
+            for _ in pool.imap_unordered(extract_transform_load, self.tasks, chunksize=1):
+                pass
+
+        msg = f"Total documents indexed: {total_doc_success.value}, total document fails: {total_doc_fail.value}"
+        logger.info(format_log(msg))
+
+        if _abort.is_set():
+            raise RuntimeError("One or more partitions failed!")
+
+    def dispatch_tasks_to_persistent_workers(self) -> None:
+        """
+            Run the tasks on long-lived worker processes which each handle many partitions, reusing their DB
+            connection and ES client between them. A worker is only replaced once its memory use passes
+            ``worker_max_memory`` (MB), rather than after every partition.
+        """
+        _abort = Event()  # Event which when set signals an error occured in a subprocess
+        task_queue, report_queue = Queue(), Queue()
+        for task in self.tasks:
+            task_queue.put(task)
+        for _ in range(self.config["processes"]):
+            task_queue.put(None)  # one "no more work" marker for each worker which will run until the end
+
+        close_all_django_db_conns()  # don't let forked workers share the parent's DB connection
+        worker_args = (task_queue, report_queue, _abort, self.config.get("worker_max_memory"))
+        workers = [Process(target=persistent_worker, args=worker_args) for _ in range(self.config["processes"])]
+        for worker in workers:
+            worker.start()
+
+        reported_pids, recycled_count = set(), 0
+        while workers:
+            reports = []
+            try:
+                reports.append(report_queue.get(timeout=1))
+            except Empty:
+                pass
+
+            exited = [w for w in workers if not w.is_alive()]
+            if any(w.pid not in reported_pids for w in exited):
+                # A report may have been sent just after the queue read timed out. Drain before judging.
+                reports.extend(drain_queue(report_queue, timeout=1))
+
+            for report in reports:
+                reported_pids.add(report["pid"])
+                log_worker_report(report)
+                if report["recycled"]:
+                    recycled_count += 1
+                    replacement = Process(target=persistent_worker, args=worker_args)
+                    replacement.start()
+                    workers.append(replacement)
+
+            lost_worker = False
+            for worker in exited:
+                workers.remove(worker)
+                worker.join()
+                if worker.pid not in reported_pids:
+                    # The worker died without reporting (e.g. OOM-killed), so the partition it held is lost
+                    logger.error(format_log(f"Worker {worker.pid} exited unexpectedly with code {worker.exitcode}"))
+                    lost_worker = True
+
+            if lost_worker:
+                _abort.set()
+                for worker in workers:
+                    worker.terminate()
+                    worker.join()
+                workers = []
 
         msg = f"Total documents indexed: {total_doc_success.value}, total document fails: {total_doc_fail.value}"
         logger.info(format_log(msg))
+        if recycled_count:
+            logger.info(format_log(f"{recycled_count:,} workers were recycled after exceeding their memory limit"))
 
         if _abort.is_set():
             raise RuntimeError("One or more partitions failed!")
 
     def complete_process(self) -> None:
         client = instantiate_elasticsearch_client()
+        if self.config.get("checkpoint_dir"):
+            if total_doc_fail.value > 0:
+                msg = "Keeping the checkpoint, so partitions with failed docs can be loaded again with --resume"
+                logger.warning(format_log(msg))
+            else:
+                clear_checkpoint(self.config)  # Nothing is left to resume once all partitions are loaded
         if self.config["create_new_index"]:
             set_final_index_config(client, self.config["index_name"])
             if self.config["skip_delete_index"]:
@@ -113,6 +253,17 @@ class Controller:
         # return ceil(self.record_count / self.config["partition_size"])
         return ceil(max((self.max_id - self.min_id), self.record_count) / (self.config["partition_size"]))
 
+    def determine_partition_ranges_by_density(self) -> List[Tuple[int, int]]:
+        """
+            Build ID ranges holding about ``partition_size`` records each from the sampled distribution of IDs,
+            so sparse or clustered IDs don't produce a mix of nearly-empty and overloaded partitions
+        """
+        target_partitions = ceil(self.record_count / self.config["partition_size"])
+        boundaries = [b for b in get_partition_boundaries(self.config, target_partitions) if b > self.min_id]
+        lower_bounds = [self.min_id] + boundaries
+        upper_bounds = [b - 1 for b in boundaries] + [self.max_id]
+        return list(zip(lower_bounds, upper_bounds))
+
     def construct_tasks(self) -> List[TaskSpec]:
         """Create the Task objects w/ the appropriate configuration"""
         name_gen = gen_random_name()
@@ -128,10 +279,17 @@ class Controller:
         sql_config = {**self.config, **{"lower_bound": lower_bound, "upper_bound": upper_bound}}
         sql_str = obtain_extract_sql(sql_config, is_null_partition)
 
+        execute_sql_func = self.config["execute_sql_func"]
+        stream_sql_func = self.config.get("stream_sql_func")
+        if self.config.get("persistent_workers"):
+            execute_sql_func = execute_sql_statement_reusing_connection
+            if stream_sql_func:
+                stream_sql_func = stream_sql_statement_reusing_connection
+
         return TaskSpec(
             base_table=self.config["base_table"],
             base_table_id=self.config["base_table_id"],
-            execute_sql_func=self.config["execute_sql_func"],
+            execute_sql_func=execute_sql_func,
             index=self.config["index_name"],
             is_incremental=self.config["is_incremental_load"],
             name=next(name_gen),
@@ -140,10 +298,19 @@ class Controller:
             field_for_es_id=self.config["field_for_es_id"],
             sql=sql_str,
             transform_func=self.config["data_transform_func"],
+            batch_transform_func=self.config.get("data_batch_transform_func"),
             view=self.config["sql_view"],
+            stream_sql_func=stream_sql_func,
+            batch_size=self.config.get("batch_size"),
+            id_range=None if is_null_partition else (lower_bound, upper_bound),
+            checkpoint_dir=self.config.get("checkpoint_dir"),
+            bulk_threads=self.config.get("bulk_threads"),
+            bulk_max_in_flight=self.config.get("bulk_max_in_flight"),
         )
 
     def get_id_range_for_partition(self, partition_number: int) -> Tuple[int, int]:
+        if partition_number < len(self.partition_ranges):
+            return self.partition_ranges[partition_number]
         range_size = ceil((self.max_id - self.min_id) / self.config["partitions"])
         lower_bound = self.min_id + (range_size * partition_number)
         upper_bound = min(self.min_id + ((range_size * (partition_number + 1) - 1)), self.max_id)
@@ -161,27 +328,95 @@ class Controller:
             raise RuntimeError(f"No delete function implemented for type {self.config['data_type']}")
 
 
-def extract_transform_load(task: TaskSpec) -> None:
+def get_worker_es_client() -> Elasticsearch:
+    """Return the ES client for this process, creating it on first use (and after a fork)"""
+    global _worker_es_client, _worker_es_client_pid
+    if _worker_es_client is None or _worker_es_client_pid != os.getpid():
+        _worker_es_client = instantiate_elasticsearch_client()
+        _worker_es_client_pid = os.getpid()
+    return _worker_es_client
+
+
+def drain_queue(queue: Queue, timeout: float) -> List:
+    items = []
+    while True:
+        try:
+            items.append(queue.get(timeout=timeout))
+        except Empty:
+            return items
+
+
+def log_worker_report(report: dict) -> None:
+    msg = (
+        f"Worker {report['pid']} {'was recycled after' if report['recycled'] else 'finished'}"
+        f" {report['partitions']:,} partitions: {report['docs']:,} docs in {report['duration']:.2f}s"
+        f" ({report['docs'] / max(report['duration'], 0.001):,.0f} docs/s),"
+        f" peak memory {report['max_memory_mb']:,.0f}MB"
+    )
+    logger.info(format_log(msg))
+
+
+def persistent_worker(task_queue: Queue, report_queue: Queue, abort_event: Event, max_memory_mb: Optional[int]):
+    """
+        Process tasks from the queue until a "no more work" marker is found or memory use passes the limit.
+        Always sends a report of the partitions and documents it processed before exiting.
+    """
+    init_shared_abort(abort_event)
+    process = ps.Process()
+    start = perf_counter()
+    partitions, docs, max_memory_mb_seen, recycled = 0, 0, 0, False
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        success, fail = extract_transform_load(task)
+        partitions += 1
+        docs += success + fail
+
+        memory_mb = process.memory_info().rss / (1024 * 1024)
+        max_memory_mb_seen = max(max_memory_mb_seen, memory_mb)
+        if max_memory_mb and memory_mb > max_memory_mb:
+            recycled = True
+            break
+
+    report_queue.put(
+        {
+            "pid": os.getpid(),
+            "partitions": partitions,
+            "docs": docs,
+            "duration": perf_counter() - start,
+            "max_memory_mb": max_memory_mb_seen,
+            "recycled": recycled,
+        }
+    )
+
+
+def extract_transform_load(task: TaskSpec) -> Tuple[int, int]:
     if abort.is_set():
         logger.warning(format_log(f"Skipping partition #{task.partition_number} due to previous error", name=task.name))
-        return
+        return 0, 0
 
     start = perf_counter()
     msg = f"Started processing on partition #{task.partition_number}: {task.name}"
     logger.info(format_log(msg, name=task.name))
 
-    client = instantiate_elasticsearch_client()
+    client = get_worker_es_client()
+    success, fail = 0, 0
     try:
-        records = task.transform_func(task, extract_records(task))
-        if abort.is_set():
-            f"Prematurely ending partition #{task.partition_number} due to error in another process"
-            logger.warning(format_log(msg, name=task.name))
-            return
-        if len(records) > 0:
-            success, fail = load_data(task, records, client)
+        if task.batch_size:
+            success, fail = load_data_in_batches(task, stream_transformed_batches(task), client)
         else:
-            logger.info(format_log("No records to index", name=task.name))
-            success, fail = 0, 0
+            records = task.transform_func(task, extract_records(task))
+            if abort.is_set():
+                f"Prematurely ending partition #{task.partition_number} due to error in another process"
+                logger.warning(format_log(msg, name=task.name))
+                return 0, 0
+            if len(records) > 0:
+                success, fail = load_data(task, records, client)
+            else:
+                logger.info(format_log("No records to index", name=task.name))
+                success, fail = 0, 0
         with total_doc_success.get_lock():
             total_doc_success.value += success
         with total_doc_fail.get_lock():
@@ -194,5 +429,42 @@ def extract_transform_load(task: TaskSpec) -> None:
             logger.error(format_log(f"{task.name} failed!", name=task.name))
             abort.set()
     else:
+        if fail > 0:
+            # Left out of the checkpoint, so --resume loads the partition again
+            msg = f"Partition #{task.partition_number} was processed with {fail:,} failed docs"
+            logger.warning(format_log(msg, name=task.name))
+            return success, fail
+        if task.checkpoint_dir:
+            mark_partition_complete(
+                task.checkpoint_dir, task.index, task.partition_number, task.id_range, success, fail
+            )
         msg = f"Partition #{task.partition_number} was successfully processed in {perf_counter() - start:.2f}s"
         logger.info(format_log(msg, name=task.name))
+    return success, fail
+
+
+def stream_transformed_batches(task: TaskSpec) -> Generator[List[dict], None, None]:
+    """
+        Extract and transform the partition one batch at a time. The DB cursor reads and the transforms each
+        run in their own background thread, so they overlap with the ES bulk requests made by the consumer of
+        this generator. Only PIPELINE_QUEUE_SIZE batches are buffered between stages, keeping memory use
+        bounded by the batch size rather than the partition size.
+    """
+    extracted_batches = threaded_prefetch(extract_records_in_batches(task), PIPELINE_QUEUE_SIZE)
+
+    def _checked_batches() -> Generator[List[dict], None, None]:
+        for batch in extracted_batches:
+            if abort.is_set():
+                msg = f"Prematurely ending partition #{task.partition_number} due to error in another process"
+                raise RuntimeError(msg)
+            yield batch
+
+    def _transform() -> Generator[List[dict], None, None]:
+        if task.batch_transform_func:
+            # Transforms which carry state between batches (e.g. grouping records) consume the whole stream
+            yield from task.batch_transform_func(task, _checked_batches())
+        else:
+            for batch in _checked_batches():
+                yield task.transform_func(task, batch)
+
+    return threaded_prefetch(_transform(), PIPELINE_QUEUE_SIZE)
@@ -1,6 +1,5 @@
 import json
 import logging
-import pandas as pd
 
 from collections import defaultdict
 from django.conf import settings
@@ -10,16 +9,21 @@ from typing import Tuple, List, Optional
 from elasticsearch import Elasticsearch
 from elasticsearch_dsl import Search, Q as ES_Q
 
-from usaspending_api.common.helpers.s3_helpers import retrieve_s3_bucket_object_list, access_s3_object
+from usaspending_api.common.helpers.s3_helpers import get_s3_bucket
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
     execute_sql_statement,
     format_log,
     chunks,
     filter_query,
 )
+from usaspending_api.transactions.deletion_journal import get_deleted_transaction_ids, ingest_deletion_journals
 
 logger = logging.getLogger("script")
 
+# ES default for the index.max_terms_count setting: the max number of terms that can be added to a terms filter query
+ES_DEFAULT_MAX_TERMS_COUNT = 65536
+_max_terms_count_by_index = {}
+
 
 def delete_query(response: dict) -> dict:
     return {"query": {"ids": {"values": [i["_id"] for i in response["hits"]["hits"]]}}}
@@ -104,6 +108,7 @@ def delete_docs_by_unique_key(client: Elasticsearch, key: str, value_list: list,
     """
     start = perf_counter()
 
+    value_list = list(dict.fromkeys(value_list))  # de-dupe, preserving order
     if len(value_list) == 0:
         logger.info(format_log("Nothing to delete", action="Delete", name=task_id))
         return 0
@@ -115,8 +120,7 @@ def delete_docs_by_unique_key(client: Elasticsearch, key: str, value_list: list,
     deleted = 0
     is_error = False
     try:
-        # 65,536 is max number of terms that can be added to an ES terms filter query
-        values_generator = chunks(value_list, 50000)
+        values_generator = chunks(value_list, get_max_terms_count(client, index))
         for chunk_of_values in values_generator:
             # Creates an Elasticsearch query criteria for the _delete_by_query call
             q = ES_Q("terms", **{key: chunk_of_values})
@@ -139,6 +143,26 @@ def delete_docs_by_unique_key(client: Elasticsearch, key: str, value_list: list,
     return deleted
 
 
+def get_max_terms_count(client: Elasticsearch, index: str) -> int:
+    """
+    Look up the max number of terms allowed in a terms query for the index (or indices behind an alias), so deletes
+    can be sent in as few ``_delete_by_query`` requests as possible. Falls back to the ES default if not set.
+    """
+    if index not in _max_terms_count_by_index:
+        setting = "index.max_terms_count"
+        try:
+            response = client.indices.get_settings(index=index, name=setting, flat_settings=True, include_defaults=True)
+            values = [
+                s.get("settings", {}).get(setting) or s.get("defaults", {}).get(setting) for s in response.values()
+            ]
+            counts = [int(v) for v in values if v]
+        except Exception:
+            logger.exception(format_log(f"Unable to read {setting}, using the ES default", action="Delete"))
+            counts = []
+        _max_terms_count_by_index[index] = min(counts) if counts else ES_DEFAULT_MAX_TERMS_COUNT
+    return _max_terms_count_by_index[index]
+
+
 def get_deleted_award_ids(client: Elasticsearch, id_list: list, config: dict, index: Optional[str] = None) -> list:
     """
         id_list = [{key:'key1',col:'transaction_id'},
@@ -203,8 +227,8 @@ def deleted_transactions(client: Elasticsearch, config: dict) -> None:
 
 def gather_deleted_ids(config: dict) -> list:
     """
-    Connect to S3 and gather all of the transaction ids stored in CSV files
-    generated by the broker when transactions are removed from the DB.
+    Ingest any new CSV files generated by the broker in S3 when transactions are removed from the DB into the
+    deletion journal, then gather from it all of the transaction ids deleted since the starting date.
     """
 
     if not config["process_deletes"]:
@@ -214,42 +238,14 @@ def gather_deleted_ids(config: dict) -> list:
     logger.info(format_log(f"Gathering all deleted transactions from S3", action="Delete"))
     start = perf_counter()
 
-    bucket_objects = retrieve_s3_bucket_object_list(bucket_name=config["s3_bucket"])
-    logger.info(format_log(f"{len(bucket_objects):,} files found in bucket '{config['s3_bucket']}'", action="Delete"))
+    bucket = get_s3_bucket(bucket_name=config["s3_bucket"])
+    new_file_count = ingest_deletion_journals(bucket)
+    logger.info(format_log(f"{new_file_count:,} new files ingested from bucket '{config['s3_bucket']}'", action="Delete"))
 
     if config["verbose"]:
         logger.info(format_log(f"CSV data from {config['starting_date']} to now", action="Delete"))
 
-    filtered_csv_list = [
-        x
-        for x in bucket_objects
-        if (x.key.endswith(".csv") and not x.key.startswith("staging") and x.last_modified >= config["starting_date"])
-    ]
-
-    if config["verbose"]:
-        logger.info(format_log(f"Found {len(filtered_csv_list)} csv files", action="Delete"))
-
-    deleted_ids = {}
-
-    for obj in filtered_csv_list:
-        object_data = access_s3_object(bucket_name=config["s3_bucket"], obj=obj)
-
-        # Ingests the CSV into a dataframe. pandas thinks some ids are dates, so disable parsing
-        data = pd.read_csv(object_data, dtype=str)
-
-        if "detached_award_proc_unique" in data:
-            new_ids = ["CONT_TX_" + x.upper() for x in data["detached_award_proc_unique"].values]
-        elif "afa_generated_unique" in data:
-            new_ids = ["ASST_TX_" + x.upper() for x in data["afa_generated_unique"].values]
-        else:
-            logger.info(format_log(f"[Missing valid col] in {obj.key}", action="Delete"))
-
-        for uid in new_ids:
-            if uid in deleted_ids:
-                if deleted_ids[uid]["timestamp"] < obj.last_modified:
-                    deleted_ids[uid]["timestamp"] = obj.last_modified
-            else:
-                deleted_ids[uid] = {"timestamp": obj.last_modified}
+    deleted_ids = get_deleted_transaction_ids(config["starting_date"])
 
     if config["verbose"]:
         for uid, deleted_dict in deleted_ids.items():
@@ -264,14 +260,11 @@ def gather_deleted_ids(config: dict) -> list:
 
 
 def check_awards_for_deletes(id_list: list) -> list:
-    formatted_value_ids = ""
-    for x in id_list:
-        formatted_value_ids += "('" + x + "'),"
-
+    """Return the awards from ``id_list`` (by generated_unique_award_id) which no longer exist in the database"""
     sql = """
         SELECT x.generated_unique_award_id
-        FROM (values {ids}) AS x(generated_unique_award_id)
+        FROM unnest(%s::text[]) AS x(generated_unique_award_id)
         LEFT JOIN awards a ON a.generated_unique_award_id = x.generated_unique_award_id
         WHERE a.generated_unique_award_id IS NULL"""
 
-    return execute_sql_statement(sql.format(ids=formatted_value_ids[:-1]), results=True)
+    return execute_sql_statement(sql, results=True, params=[list(dict.fromkeys(id_list))])
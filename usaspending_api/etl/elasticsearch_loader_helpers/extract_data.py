@@ -1,7 +1,7 @@
 import logging
 
 from time import perf_counter
-from typing import List, Tuple
+from typing import Generator, List, Tuple
 
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec, format_log, execute_sql_statement
 
@@ -31,6 +31,14 @@ MIN_MAX_COUNT_SQL = """
     "\n", ""
 )
 
+ID_QUANTILES_SQL = """
+    SELECT percentile_disc(ARRAY[{fractions}]::float8[]) WITHIN GROUP (ORDER BY "{primary_key}") AS boundaries
+    FROM "{sql_view}"
+    {optional_predicate}
+""".replace(
+    "\n", ""
+)
+
 
 def obtain_min_max_count_sql(config: dict) -> str:
     if "optional_predicate" not in config:
@@ -39,6 +47,14 @@ def obtain_min_max_count_sql(config: dict) -> str:
     return sql
 
 
+def obtain_id_quantiles_sql(config: dict, partitions: int) -> str:
+    if "optional_predicate" not in config:
+        config["optional_predicate"] = ""
+    fractions = ",".join(str(i / partitions) for i in range(1, partitions))
+    sql = ID_QUANTILES_SQL.format(fractions=fractions, **config)
+    return sql.format(**config)  # fugly. Allow string values to have expressions
+
+
 def obtain_extract_sql(config: dict, is_null_partition: bool = False) -> str:
     if not config.get("optional_predicate"):
         config["optional_predicate"] = "WHERE"
@@ -49,6 +65,8 @@ def obtain_extract_sql(config: dict, is_null_partition: bool = False) -> str:
         sql = EXTRACT_NULL_SQL
     else:
         sql = EXTRACT_SQL
+    if config.get("extract_order_by"):
+        sql += ' ORDER BY "{extract_order_by}"'  # lets the transform group records as they stream in
     return sql.format(**config).format(**config)  # fugly. Allow string values to have expressions
 
 
@@ -61,6 +79,22 @@ def count_of_records_to_process(config: dict) -> Tuple[int, int, int]:
     return count, min_id, max_id
 
 
+def get_partition_boundaries(config: dict, partitions: int) -> List[int]:
+    """
+        Sample the distribution of primary key values to find the IDs which split the records into
+        ``partitions`` ranges holding (about) the same number of rows, regardless of gaps in the IDs.
+        Returned IDs are the sorted, de-duplicated lower bounds of each range after the first.
+    """
+    if partitions < 2:
+        return []
+    start = perf_counter()
+    results = execute_sql_statement(obtain_id_quantiles_sql(config, partitions), True, config["verbose"])[0]
+    boundaries = sorted(set(results["boundaries"] or []))
+    msg = f"Sampled {len(boundaries):,} ID boundaries by record density, took {perf_counter() - start:.2f}s"
+    logger.info(format_log(msg, action="Extract"))
+    return boundaries
+
+
 def extract_records(task: TaskSpec) -> List[dict]:
     start = perf_counter()
     logger.info(format_log(f"Extracting data from source", name=task.name, action="Extract"))
@@ -74,3 +108,21 @@ def extract_records(task: TaskSpec) -> List[dict]:
     msg = f"{len(records):,} records extracted in {perf_counter() - start:.2f}s"
     logger.info(format_log(msg, name=task.name, action="Extract"))
     return records
+
+
+def extract_records_in_batches(task: TaskSpec) -> Generator[List[dict], None, None]:
+    start = perf_counter()
+    msg = f"Streaming data from source in batches of {task.batch_size:,}"
+    logger.info(format_log(msg, name=task.name, action="Extract"))
+
+    count = 0
+    try:
+        for batch in task.stream_sql_func(task.sql, task.batch_size):
+            count += len(batch)
+            yield batch
+    except Exception as e:
+        logger.exception(f"Failed on partition {task.name} with '{task.sql}'")
+        raise e
+
+    msg = f"{count:,} records extracted in {perf_counter() - start:.2f}s"
+    logger.info(format_log(msg, name=task.name, action="Extract"))
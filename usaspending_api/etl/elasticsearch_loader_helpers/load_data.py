@@ -1,8 +1,11 @@
 import logging
 
-from elasticsearch import Elasticsearch, helpers
-from time import perf_counter
-from typing import List, Tuple
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from elasticsearch import Elasticsearch, helpers, TransportError
+from threading import BoundedSemaphore, Lock
+from time import perf_counter, sleep
+from typing import Generator, Iterable, List, Optional, Tuple
 
 from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import delete_docs_by_unique_key
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec, format_log
@@ -25,31 +28,110 @@ ES_MAX_BATCH_BYTES = 10 * 1024 * 1024
 # Ex: 5-data-node cluster of i3.xlarge.elasticsearch = 4 vCPU * 5 nodes = 20 vCPU: 300*20 = 6000 doc batches
 ES_BATCH_ENTRIES = 4000
 
+# When bulk requests are sent from a thread pool, the number of docs per request adapts between these bounds,
+# aiming for requests which ES handles in about ES_TARGET_BULK_TOOK_MS. 429 (rejected) responses halve the size.
+ES_MIN_BATCH_ENTRIES = 250
+ES_MAX_BATCH_ENTRIES = 10000
+ES_TARGET_BULK_TOOK_MS = 2000
+ES_BULK_MAX_RETRIES = 10
+ES_BULK_INITIAL_BACKOFF = 2  # seconds, doubled on each retry of rejected docs
+ES_BULK_MAX_BACKOFF = 60
+
+
+class AdaptiveBatchSize:
+    """Number of docs to send per bulk request, tuned from the observed ES ``took`` times and 429 rejections"""
+
+    def __init__(
+        self,
+        initial: int = ES_BATCH_ENTRIES,
+        minimum: int = ES_MIN_BATCH_ENTRIES,
+        maximum: int = ES_MAX_BATCH_ENTRIES,
+        target_took_ms: int = ES_TARGET_BULK_TOOK_MS,
+    ):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_took_ms = target_took_ms
+        self._lock = Lock()
+
+    def record_response(self, took_ms: int) -> None:
+        with self._lock:
+            if took_ms > self.target_took_ms * 1.5:
+                self.size = max(self.minimum, int(self.size * 0.8))
+            elif took_ms < self.target_took_ms * 0.5:
+                self.size = min(self.maximum, int(self.size * 1.25))
+
+    def record_rejection(self) -> None:
+        with self._lock:
+            self.size = max(self.minimum, self.size // 2)
+
 
 def load_data(worker: TaskSpec, records: List[dict], client: Elasticsearch) -> Tuple[int, int]:
     start = perf_counter()
     logger.info(format_log(f"Starting Index operation", name=worker.name, action="Index"))
     success, failed = streaming_post_to_es(
-        client, records, worker.index, worker.name, delete_before_index=worker.is_incremental
+        client,
+        records,
+        worker.index,
+        worker.name,
+        delete_before_index=worker.is_incremental,
+        bulk_threads=worker.bulk_threads,
+        max_in_flight=worker.bulk_max_in_flight,
+    )
+    logger.info(format_log(f"Index operation took {perf_counter() - start:.2f}s", name=worker.name, action="Index"))
+    return success, failed
+
+
+def load_data_in_batches(worker: TaskSpec, batches: Iterable[List[dict]], client: Elasticsearch) -> Tuple[int, int]:
+    """
+    Index documents as their batches arrive, rather than waiting on the full partition.
+    Any delete-before-index is done per batch, just ahead of that batch's documents being sent to ES.
+    """
+    start = perf_counter()
+    logger.info(format_log(f"Starting streaming Index operation", name=worker.name, action="Index"))
+    if worker.is_incremental:
+        actions = delete_then_yield_docs(client, batches, worker.index, worker.name)
+    else:
+        actions = (doc for batch in batches for doc in batch)
+    success, failed = streaming_post_to_es(
+        client,
+        actions,
+        worker.index,
+        worker.name,
+        delete_before_index=False,
+        bulk_threads=worker.bulk_threads,
+        max_in_flight=worker.bulk_max_in_flight,
     )
     logger.info(format_log(f"Index operation took {perf_counter() - start:.2f}s", name=worker.name, action="Index"))
     return success, failed
 
 
+def delete_then_yield_docs(
+    client: Elasticsearch, batches: Iterable[List[dict]], index_name: str, job_name: str, delete_key: str = "_id"
+) -> Generator[dict, None, None]:
+    """Delete the documents of each batch by ``delete_key`` before yielding them to be (re-)indexed"""
+    for batch in batches:
+        delete_docs_by_unique_key(client, delete_key, [doc[delete_key] for doc in batch], job_name, index_name)
+        yield from batch
+
+
 def streaming_post_to_es(
     client: Elasticsearch,
-    chunk: list,
+    chunk: Iterable[dict],
     index_name: str,
     job_name: str = None,
     delete_before_index: bool = True,
     delete_key: str = "_id",
+    bulk_threads: Optional[int] = None,
+    max_in_flight: Optional[int] = None,
 ) -> Tuple[int, int]:
     """
     Pump data into an Elasticsearch index.
 
     Args:
         client: Elasticsearch client
-        chunk (List[dict]): list of dictionary objects holding field_name:value data
+        chunk (Iterable[dict]): list (or generator) of dictionary objects holding field_name:value data. Must be a
+            list if delete_before_index is True
         index_name (str): name of targetted index
         job_name (str): name of ES ETL job being run, used in logging
         delete_before_index (bool): When true, attempts to delete given documents by a unique key before indexing them.
@@ -64,6 +146,11 @@ def streaming_post_to_es(
             deleted, if delete_before_index is True. Currently defaulting to "_id", taking advantage of the fact
             that we are explicitly setting "_id" in the documents to-be-indexed, which is a unique key for each doc
             (e.g. the PK of the DB row)
+        bulk_threads (int): When provided, bulk requests are sent concurrently from this many threads, with the
+            number of docs per request adapted to the cluster's response times (see threaded_bulk(...)).
+            Otherwise requests are sent one at a time with a fixed ES_BATCH_ENTRIES batch size.
+        max_in_flight (int): Max number of bulk requests sent or waiting to be sent at once when using bulk_threads.
+            Defaults to twice the number of threads.
 
     Returns: (succeeded, failed) tuple, which counts successful index doc writes vs. failed doc writes
     """
@@ -73,18 +160,23 @@ def streaming_post_to_es(
         if delete_before_index:
             value_list = [doc[delete_key] for doc in chunk]
             delete_docs_by_unique_key(client, delete_key, value_list, job_name, index_name)
-        for ok, item in helpers.streaming_bulk(
-            client,
-            actions=chunk,
-            chunk_size=ES_BATCH_ENTRIES,
-            max_chunk_bytes=ES_MAX_BATCH_BYTES,
-            max_retries=10,
-            index=index_name,
-        ):
-            if ok:
-                success += 1
-            else:
-                failed += 1
+        if bulk_threads:
+            success, failed = threaded_bulk(
+                client, chunk, index_name, job_name, bulk_threads, max_in_flight or bulk_threads * 2
+            )
+        else:
+            for ok, item in helpers.streaming_bulk(
+                client,
+                actions=chunk,
+                chunk_size=ES_BATCH_ENTRIES,
+                max_chunk_bytes=ES_MAX_BATCH_BYTES,
+                max_retries=ES_BULK_MAX_RETRIES,
+                index=index_name,
+            ):
+                if ok:
+                    success += 1
+                else:
+                    failed += 1
 
     except Exception as e:
         logger.error(f"Error on partition {job_name}:\n\n{str(e)[:2000]}\n...\n{str(e)[-2000:]}\n")
@@ -92,3 +184,119 @@ def streaming_post_to_es(
 
     logger.info(format_log(f"Success: {success:,} | Fail: {failed:,}", name=job_name, action="Index"))
     return success, failed
+
+
+def threaded_bulk(
+    client: Elasticsearch,
+    actions: Iterable[dict],
+    index_name: str,
+    job_name: str,
+    threads: int,
+    max_in_flight: int,
+) -> Tuple[int, int]:
+    """
+    Send bulk index requests concurrently from a pool of threads.
+
+    Docs are only pulled from ``actions`` while fewer than ``max_in_flight`` requests are pending, so a slow
+    cluster applies backpressure to the producer rather than requests piling up in memory. The number of docs
+    per request starts at ES_BATCH_ENTRIES and is adapted by AdaptiveBatchSize as responses come back.
+
+    Like helpers.streaming_bulk, a BulkIndexError is raised if any doc fails to index, or is still rejected after
+    ES_BULK_MAX_RETRIES retries, so the partition fails rather than silently dropping docs.
+
+    Returns: (succeeded, failed) tuple, which counts successful index doc writes vs. failed doc writes
+    """
+    batch_size = AdaptiveBatchSize(initial=ES_BATCH_ENTRIES)
+    in_flight = BoundedSemaphore(max_in_flight)
+    pending = deque()
+    success = 0
+
+    def _collect(future: Future) -> None:
+        nonlocal success
+        success += future.result()  # re-raises any error from the request's thread
+
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"bulk-{job_name}") as executor:
+        try:
+            for bulk_lines in _chunk_bulk_lines(client, actions, batch_size):
+                in_flight.acquire()
+                future = executor.submit(_send_bulk_lines, client, bulk_lines, index_name, batch_size)
+                future.add_done_callback(lambda f: in_flight.release())
+                pending.append(future)
+                while pending and pending[0].done():
+                    _collect(pending.popleft())
+            while pending:
+                _collect(pending.popleft())
+        except Exception:
+            for future in pending:
+                future.cancel()
+            raise
+
+    msg = f"Bulk requests sent from {threads} threads, ending with {batch_size.size:,} docs per request"
+    logger.info(format_log(msg, name=job_name, action="Index"))
+    return success, 0
+
+
+def _chunk_bulk_lines(
+    client: Elasticsearch, actions: Iterable[dict], batch_size: AdaptiveBatchSize
+) -> Generator[List[Tuple[str, Optional[str]]], None, None]:
+    """Serialize actions into (action line, doc line) pairs, grouped by the current batch size and max bytes"""
+    serializer = client.transport.serializer
+    bulk_lines, bulk_bytes = [], 0
+    for action in actions:
+        action_line, doc = helpers.expand_action(action)
+        action_line = serializer.dumps(action_line)
+        doc_line = serializer.dumps(doc) if doc is not None else None
+        line_bytes = len(action_line.encode("utf-8")) + 1 + (len(doc_line.encode("utf-8")) + 1 if doc_line else 0)
+
+        if bulk_lines and (len(bulk_lines) >= batch_size.size or bulk_bytes + line_bytes > ES_MAX_BATCH_BYTES):
+            yield bulk_lines
+            bulk_lines, bulk_bytes = [], 0
+        bulk_lines.append((action_line, doc_line))
+        bulk_bytes += line_bytes
+
+    if bulk_lines:
+        yield bulk_lines
+
+
+def _send_bulk_lines(
+    client: Elasticsearch, bulk_lines: List[Tuple[str, Optional[str]]], index_name: str, batch_size: AdaptiveBatchSize
+) -> int:
+    """
+    Send one bulk request, retrying docs rejected with a 429 with exponential backoff. Returns the number of docs
+    indexed, and raises a BulkIndexError if any doc failed or was still rejected after the last retry
+    """
+    success = 0
+    for attempt in range(ES_BULK_MAX_RETRIES + 1):
+        if attempt > 0:
+            sleep(min(ES_BULK_MAX_BACKOFF, ES_BULK_INITIAL_BACKOFF * 2 ** (attempt - 1)))
+
+        body = "".join(f"{line}\n" for pair in bulk_lines for line in pair if line is not None)
+        try:
+            response = client.bulk(body=body, index=index_name)
+        except TransportError as e:
+            if e.status_code == 429 and attempt < ES_BULK_MAX_RETRIES:
+                batch_size.record_rejection()
+                continue
+            raise
+
+        batch_size.record_response(response["took"])
+        rejected, rejected_items, errors = [], [], []
+        for pair, item in zip(bulk_lines, response["items"]):
+            status = next(iter(item.values()))["status"]
+            if status == 429:
+                rejected.append(pair)
+                rejected_items.append(item)
+            elif 200 <= status < 300:
+                success += 1
+            else:
+                errors.append(item)
+
+        if errors:
+            raise helpers.BulkIndexError(f"{len(errors):,} document(s) failed to index.", errors)
+        if not rejected:
+            return success
+        batch_size.record_rejection()
+        bulk_lines = rejected
+
+    msg = f"{len(rejected_items):,} document(s) still rejected after {ES_BULK_MAX_RETRIES} retries."
+    raise helpers.BulkIndexError(msg, rejected_items)
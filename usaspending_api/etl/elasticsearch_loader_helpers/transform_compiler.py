@@ -0,0 +1,95 @@
+import json
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from usaspending_api.etl.elasticsearch_loader_helpers.aggregate_key_functions import JSON_AGG_KEY_SPECS, JsonAggKey
+
+# Same settings as the encoder behind json.dumps(obj) with no other args, used by the agg key functions
+_json_encode = json.JSONEncoder().encode
+
+_compiled_transforms = {}
+
+
+def compile_transform(
+    converters: Dict[str, Callable],
+    agg_key_creations: Dict[str, Callable],
+    drop_fields: List[str],
+    routing_field: Optional[str],
+    es_id_field: str,
+    columns: Iterable[str],
+) -> Callable[[List[dict]], List[dict]]:
+    """
+    Generate one function which turns a list of DB records into ES documents (in place): converting fields,
+    creating agg keys, setting the routing and _id of each document and dropping the fields only needed for
+    the agg keys.
+
+    The field plan is resolved once instead of for each record: field names are literals, agg keys found in
+    JSON_AGG_KEY_SPECS are built inline rather than through their (nested) functions, and optional fields
+    are resolved against the extracted ``columns``. Any other agg key function is still called per record.
+    Compiled functions are cached, so this is cheap to call for every batch.
+    """
+    columns = tuple(columns)
+    cache_key = (
+        tuple(converters.items()),
+        tuple(agg_key_creations.items()),
+        tuple(drop_fields),
+        routing_field,
+        es_id_field,
+        columns,
+    )
+    if cache_key in _compiled_transforms:
+        return _compiled_transforms[cache_key]
+
+    namespace = {"encode": _json_encode}
+    lines = ["def build_docs(records):", "    for record in records:"]
+
+    for i, (field, converter) in enumerate(converters.items()):
+        namespace[f"converter_{i}"] = converter
+        lines.append(f"        record[{field!r}] = converter_{i}(record[{field!r}])")
+
+    for i, (key, func) in enumerate(agg_key_creations.items()):
+        spec = JSON_AGG_KEY_SPECS.get(func)
+        if spec is None:
+            namespace[f"agg_key_func_{i}"] = func
+            lines.append(f"        record[{key!r}] = agg_key_func_{i}(record)")
+        else:
+            lines.extend(_json_agg_key_lines(key, spec, columns))
+
+    # Route all documents with the same recipient to the same shard
+    # This allows for accuracy and early-termination of "top N" recipient category aggregation queries
+    # Recipient is are highest-cardinality category with over 2M unique values to aggregate against,
+    # and this is needed for performance
+    # ES helper will pop any "meta" fields like "routing" from provided data dict and use them in the action
+    if routing_field:
+        lines.append(f"        record['routing'] = record[{routing_field!r}]")
+
+    # Explicitly setting the ES _id field to match the postgres PK value allows
+    # bulk index operations to be upserts without creating duplicate documents
+    # IF and ONLY IF a routing meta field is not also provided (one whose value differs
+    # from the doc _id field). If explicit routing is done, UPSERTs may cause duplicates,
+    # so docs must be deleted before UPSERTed. (More info in streaming_post_to_es(...))
+    lines.append(f"        record['_id'] = record[{es_id_field!r}]")
+
+    # Removing data which were used for creating aggregate keys and aren't necessary standalone
+    for field in drop_fields:
+        lines.append(f"        del record[{field!r}]")
+    lines.append("    return records")
+
+    exec(compile("\n".join(lines), "<compiled ES transform>", "exec"), namespace)
+    _compiled_transforms[cache_key] = namespace["build_docs"]
+    return namespace["build_docs"]
+
+
+def _json_agg_key_lines(key: str, spec: JsonAggKey, columns: tuple) -> List[str]:
+    is_null = " or ".join(f"record[{field!r}] is None" for field in spec.required_fields)
+    json_items = ", ".join(
+        f"{json_key!r}: record[{field!r}]"
+        for json_key, field in spec.fields
+        if field not in spec.optional_fields or field in columns
+    )
+    return [
+        f"        if {is_null}:",
+        f"            record[{key!r}] = None",
+        "        else:",
+        f"            record[{key!r}] = encode({{{json_items}}})",
+    ]
@@ -1,10 +1,12 @@
 import logging
 
 from django.conf import settings
+from itertools import islice
 from time import perf_counter
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Dict, Generator, Iterable, List, Optional
 
 from usaspending_api.etl.elasticsearch_loader_helpers import aggregate_key_functions as funcs
+from usaspending_api.etl.elasticsearch_loader_helpers.transform_compiler import compile_transform
 from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
     convert_postgres_json_array_to_list,
     format_log,
@@ -15,79 +17,126 @@ from usaspending_api.etl.elasticsearch_loader_helpers.utilities import (
 logger = logging.getLogger("script")
 
 
+AWARD_CONVERTERS = {}
+AWARD_AGG_KEY_CREATIONS = {
+    "funding_subtier_agency_agg_key": funcs.funding_subtier_agency_agg_key,
+    "funding_toptier_agency_agg_key": funcs.funding_toptier_agency_agg_key,
+    "pop_congressional_agg_key": funcs.pop_congressional_agg_key,
+    "pop_county_agg_key": funcs.pop_county_agg_key,
+    "pop_state_agg_key": funcs.pop_state_agg_key,
+    "recipient_agg_key": funcs.award_recipient_agg_key,
+    "recipient_location_congressional_agg_key": funcs.recipient_location_congressional_agg_key,
+    "recipient_location_county_agg_key": funcs.recipient_location_county_agg_key,
+    "recipient_location_state_agg_key": funcs.recipient_location_state_agg_key,
+}
+AWARD_DROP_FIELDS = [
+    "recipient_levels",
+    "funding_toptier_agency_id",
+    "funding_subtier_agency_id",
+    "recipient_location_state_name",
+    "recipient_location_state_fips",
+    "recipient_location_state_population",
+    "recipient_location_county_population",
+    "recipient_location_congressional_population",
+    "pop_state_name",
+    "pop_state_fips",
+    "pop_state_population",
+    "pop_county_population",
+    "pop_congressional_population",
+]
+
+TRANSACTION_CONVERTERS = {
+    "federal_accounts": convert_postgres_json_array_to_list,
+}
+TRANSACTION_AGG_KEY_CREATIONS = {
+    "awarding_subtier_agency_agg_key": funcs.awarding_subtier_agency_agg_key,
+    "awarding_toptier_agency_agg_key": funcs.awarding_toptier_agency_agg_key,
+    "funding_subtier_agency_agg_key": funcs.funding_subtier_agency_agg_key,
+    "funding_toptier_agency_agg_key": funcs.funding_toptier_agency_agg_key,
+    "naics_agg_key": funcs.naics_agg_key,
+    "pop_congressional_agg_key": funcs.pop_congressional_agg_key,
+    "pop_country_agg_key": funcs.pop_country_agg_key,
+    "pop_county_agg_key": funcs.pop_county_agg_key,
+    "pop_state_agg_key": funcs.pop_state_agg_key,
+    "psc_agg_key": funcs.psc_agg_key,
+    "recipient_agg_key": funcs.transaction_recipient_agg_key,
+    "recipient_location_congressional_agg_key": funcs.recipient_location_congressional_agg_key,
+    "recipient_location_county_agg_key": funcs.recipient_location_county_agg_key,
+    "recipient_location_state_agg_key": funcs.recipient_location_state_agg_key,
+}
+TRANSACTION_DROP_FIELDS = [
+    "pop_state_name",
+    "pop_state_fips",
+    "pop_state_population",
+    "pop_county_population",
+    "pop_congressional_population",
+    "recipient_location_state_name",
+    "recipient_location_state_fips",
+    "recipient_location_state_population",
+    "recipient_location_county_population",
+    "recipient_location_congressional_population",
+    "recipient_levels",
+    "awarding_toptier_agency_id",
+    "funding_toptier_agency_id",
+]
+
+
 def transform_award_data(worker: TaskSpec, records: List[dict]) -> List[dict]:
-    converters = {}
-    agg_key_creations = {
-        "funding_subtier_agency_agg_key": funcs.funding_subtier_agency_agg_key,
-        "funding_toptier_agency_agg_key": funcs.funding_toptier_agency_agg_key,
-        "pop_congressional_agg_key": funcs.pop_congressional_agg_key,
-        "pop_county_agg_key": funcs.pop_county_agg_key,
-        "pop_state_agg_key": funcs.pop_state_agg_key,
-        "recipient_agg_key": funcs.award_recipient_agg_key,
-        "recipient_location_congressional_agg_key": funcs.recipient_location_congressional_agg_key,
-        "recipient_location_county_agg_key": funcs.recipient_location_county_agg_key,
-        "recipient_location_state_agg_key": funcs.recipient_location_state_agg_key,
-    }
-    drop_fields = [
-        "recipient_levels",
-        "funding_toptier_agency_id",
-        "funding_subtier_agency_id",
-        "recipient_location_state_name",
-        "recipient_location_state_fips",
-        "recipient_location_state_population",
-        "recipient_location_county_population",
-        "recipient_location_congressional_population",
-        "pop_state_name",
-        "pop_state_fips",
-        "pop_state_population",
-        "pop_county_population",
-        "pop_congressional_population",
-    ]
-    return transform_data(worker, records, converters, agg_key_creations, drop_fields, settings.ES_ROUTING_FIELD)
+    return transform_data(
+        worker, records, AWARD_CONVERTERS, AWARD_AGG_KEY_CREATIONS, AWARD_DROP_FIELDS, settings.ES_ROUTING_FIELD
+    )
 
 
 def transform_transaction_data(worker: TaskSpec, records: List[dict]) -> List[dict]:
-    converters = {
-        "federal_accounts": convert_postgres_json_array_to_list,
-    }
-    agg_key_creations = {
-        "awarding_subtier_agency_agg_key": funcs.awarding_subtier_agency_agg_key,
-        "awarding_toptier_agency_agg_key": funcs.awarding_toptier_agency_agg_key,
-        "funding_subtier_agency_agg_key": funcs.funding_subtier_agency_agg_key,
-        "funding_toptier_agency_agg_key": funcs.funding_toptier_agency_agg_key,
-        "naics_agg_key": funcs.naics_agg_key,
-        "pop_congressional_agg_key": funcs.pop_congressional_agg_key,
-        "pop_country_agg_key": funcs.pop_country_agg_key,
-        "pop_county_agg_key": funcs.pop_county_agg_key,
-        "pop_state_agg_key": funcs.pop_state_agg_key,
-        "psc_agg_key": funcs.psc_agg_key,
-        "recipient_agg_key": funcs.transaction_recipient_agg_key,
-        "recipient_location_congressional_agg_key": funcs.recipient_location_congressional_agg_key,
-        "recipient_location_county_agg_key": funcs.recipient_location_county_agg_key,
-        "recipient_location_state_agg_key": funcs.recipient_location_state_agg_key,
-    }
-    drop_fields = [
-        "pop_state_name",
-        "pop_state_fips",
-        "pop_state_population",
-        "pop_county_population",
-        "pop_congressional_population",
-        "recipient_location_state_name",
-        "recipient_location_state_fips",
-        "recipient_location_state_population",
-        "recipient_location_county_population",
-        "recipient_location_congressional_population",
-        "recipient_levels",
-        "awarding_toptier_agency_id",
-        "funding_toptier_agency_id",
-    ]
-    return transform_data(worker, records, converters, agg_key_creations, drop_fields, settings.ES_ROUTING_FIELD)
+    return transform_data(
+        worker,
+        records,
+        TRANSACTION_CONVERTERS,
+        TRANSACTION_AGG_KEY_CREATIONS,
+        TRANSACTION_DROP_FIELDS,
+        settings.ES_ROUTING_FIELD,
+    )
 
 
 def transform_covid19_faba_data(worker: TaskSpec, records: List[dict]) -> List[dict]:
     logger.info(format_log(f"Transforming data", name=worker.name, action="Transform"))
     start = perf_counter()
-    results = {}
+
+    results = list(stream_covid19_faba_documents(worker, records))
+
+    if len(results) != len(records):
+        msg = f"Transformed {len(records)} database records into {len(results)} documents for ingest"
+        logger.info(format_log(msg, name=worker.name, action="Transform"))
+
+    msg = f"Transformation operation took {perf_counter() - start:.2f}s"
+    logger.info(format_log(msg, name=worker.name, action="Transform"))
+    return results
+
+
+def transform_covid19_faba_data_in_batches(
+    worker: TaskSpec, batches: Iterable[List[dict]]
+) -> Generator[List[dict], None, None]:
+    """
+        Batched version of transform_covid19_faba_data(...). Documents are grouped across batch boundaries,
+        so a group of records split between two DB batches still becomes one document. Yields lists of up to
+        ``worker.batch_size`` documents.
+    """
+    records = (record for batch in batches for record in batch)
+    documents = stream_covid19_faba_documents(worker, records)
+    while True:
+        batch = list(islice(documents, worker.batch_size))
+        if not batch:
+            break
+        yield batch
+
+
+def stream_covid19_faba_documents(worker: TaskSpec, records: Iterable[dict]) -> Generator[dict, None, None]:
+    """
+        Group FABA records into one document per distinct award key, yielding each document as soon as the
+        key changes. Records MUST be ordered by the distinct award key (see "extract_order_by"), which keeps
+        memory use to a single group instead of the whole partition.
+    """
+    document = None
 
     for record in records:
         es_id_field = record[worker.field_for_es_id]
@@ -98,9 +147,10 @@ def transform_covid19_faba_data(worker: TaskSpec, records: List[dict]) -> List[d
         total_loan_value = record.pop("total_loan_value")
         obligated_sum = record.get("transaction_obligated_amount") or 0  # record value for key may be None
         outlay_sum = record.get("gross_outlay_amount_by_award_cpe") or 0  # record value for key may be None
-        temp_key = disinct_award_key
-        if temp_key not in results:
-            results[temp_key] = {
+        if document is None or document["financial_account_distinct_award_key"] != disinct_award_key:
+            if document is not None:
+                yield document
+            document = {
                 "financial_account_distinct_award_key": disinct_award_key,
                 "award_id": award_id,
                 "type": award_type,
@@ -111,18 +161,13 @@ def transform_covid19_faba_data(worker: TaskSpec, records: List[dict]) -> List[d
                 "outlay_sum": 0,
                 "_id": es_id_field,
             }
-        results[temp_key]["obligated_sum"] += obligated_sum
+        document["obligated_sum"] += obligated_sum
         if record.get("is_final_balances_for_fy"):
-            results[temp_key]["outlay_sum"] += outlay_sum
-        results[temp_key]["financial_accounts_by_award"].append(record)
-
-    if len(results) != len(records):
-        msg = f"Transformed {len(records)} database records into {len(results)} documents for ingest"
-        logger.info(format_log(msg, name=worker.name, action="Transform"))
+            document["outlay_sum"] += outlay_sum
+        document["financial_accounts_by_award"].append(record)
 
-    msg = f"Transformation operation took {perf_counter() - start:.2f}s"
-    logger.info(format_log(msg, name=worker.name, action="Transform"))
-    return list(results.values())  # don't need the dict key, return a list of the dict values
+    if document is not None:
+        yield document
 
 
 def transform_data(
@@ -137,30 +182,11 @@ def transform_data(
 
     start = perf_counter()
 
-    for record in records:
-        for field, converter in converters.items():
-            record[field] = converter(record[field])
-        for key, transform_func in agg_key_creations.items():
-            record[key] = transform_func(record)
-
-        # Route all documents with the same recipient to the same shard
-        # This allows for accuracy and early-termination of "top N" recipient category aggregation queries
-        # Recipient is are highest-cardinality category with over 2M unique values to aggregate against,
-        # and this is needed for performance
-        # ES helper will pop any "meta" fields like "routing" from provided data dict and use them in the action
-        if routing_field:
-            record["routing"] = record[routing_field]
-
-        # Explicitly setting the ES _id field to match the postgres PK value allows
-        # bulk index operations to be upserts without creating duplicate documents
-        # IF and ONLY IF a routing meta field is not also provided (one whose value differs
-        # from the doc _id field). If explicit routing is done, UPSERTs may cause duplicates,
-        # so docs must be deleted before UPSERTed. (More info in streaming_post_to_es(...))
-        record["_id"] = record[worker.field_for_es_id]
-
-        # Removing data which were used for creating aggregate keys and aren't necessary standalone
-        for key in drop_fields:
-            record.pop(key)
+    if records:
+        build_docs = compile_transform(
+            converters, agg_key_creations, drop_fields, routing_field, worker.field_for_es_id, records[0].keys()
+        )
+        records = build_docs(records)
 
     duration = perf_counter() - start
     logger.info(format_log(f"Transformation operation took {duration:.2f}s", name=worker.name, action="Transform"))
@@ -1,17 +1,26 @@
 import json
 import logging
+import os
 import psycopg2
 
 from dataclasses import dataclass
 from django.conf import settings
 from pathlib import Path
+from queue import Full, Queue
 from random import choice
-from typing import Any, Generator, List, Optional
+from threading import Event, Thread
+from typing import Any, Generator, Iterable, List, Optional, Tuple
+from uuid import uuid4
 
 from usaspending_api.common.helpers.sql_helpers import get_database_dsn_string
 
 logger = logging.getLogger("script")
 
+# Long-lived ETL worker processes keep one DB connection open across tasks. Paired with the owning PID so a
+# connection inherited through a fork is never shared with the parent process
+_reusable_connection = None
+_reusable_connection_pid = None
+
 
 @dataclass
 class TaskSpec:
@@ -29,6 +38,13 @@ class TaskSpec:
     is_incremental: bool
     execute_sql_func: callable = None
     transform_func: callable = None
+    stream_sql_func: callable = None
+    batch_size: Optional[int] = None
+    batch_transform_func: callable = None
+    id_range: Optional[Tuple[int, int]] = None
+    checkpoint_dir: Optional[str] = None
+    bulk_threads: Optional[int] = None
+    bulk_max_in_flight: Optional[int] = None
 
 
 def chunks(items: List[Any], size: int) -> List[Any]:
@@ -51,7 +67,9 @@ def convert_postgres_json_array_to_list(json_array: dict) -> Optional[List]:
     return result
 
 
-def execute_sql_statement(cmd: str, results: bool = False, verbose: bool = False) -> Optional[List[dict]]:
+def execute_sql_statement(
+    cmd: str, results: bool = False, verbose: bool = False, params: Optional[Iterable[Any]] = None
+) -> Optional[List[dict]]:
     """Simple function to execute SQL using a single-use psycopg2 connection"""
     rows = None
     if verbose:
@@ -60,12 +78,147 @@ def execute_sql_statement(cmd: str, results: bool = False, verbose: bool = False
     with psycopg2.connect(dsn=get_database_dsn_string()) as connection:
         connection.autocommit = True
         with connection.cursor() as cursor:
-            cursor.execute(cmd)
+            cursor.execute(cmd, params)
             if results:
                 rows = db_rows_to_dict(cursor)
     return rows
 
 
+def _get_reusable_connection() -> psycopg2.extensions.connection:
+    """Return the DB connection reused by this process, (re)opening it if it's missing, lost or inherited"""
+    global _reusable_connection, _reusable_connection_pid
+
+    if _reusable_connection is None or _reusable_connection.closed or _reusable_connection_pid != os.getpid():
+        _reusable_connection = psycopg2.connect(dsn=get_database_dsn_string())
+        _reusable_connection.autocommit = True
+        _reusable_connection_pid = os.getpid()
+    return _reusable_connection
+
+
+def execute_sql_statement_reusing_connection(
+    cmd: str, results: bool = False, verbose: bool = False, params: Optional[Iterable[Any]] = None
+) -> Optional[List[dict]]:
+    """Execute SQL like execute_sql_statement(), but on a DB connection kept open and reused by this process"""
+    global _reusable_connection
+
+    rows = None
+    if verbose:
+        print(cmd)
+
+    connection = _get_reusable_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(cmd, params)
+            if results:
+                rows = db_rows_to_dict(cursor)
+    except (psycopg2.InterfaceError, psycopg2.OperationalError):
+        _reusable_connection = None  # connection was lost. A new one is opened on the next call
+        raise
+    return rows
+
+
+def stream_sql_statement(cmd: str, batch_size: int, verbose: bool = False) -> Generator[List[dict], None, None]:
+    """
+        Execute SQL using a single-use psycopg2 connection and a server-side (named) cursor, yielding
+        the results in lists of at most ``batch_size`` dictionaries so that the full result set is
+        never held in memory at once.
+    """
+    if verbose:
+        print(cmd)
+
+    connection = psycopg2.connect(dsn=get_database_dsn_string())
+    try:
+        # Named cursors must run inside of a transaction, so autocommit is left off for this connection
+        yield from _stream_named_cursor(connection, cmd, batch_size)
+    finally:
+        connection.close()
+
+
+def stream_sql_statement_reusing_connection(
+    cmd: str, batch_size: int, verbose: bool = False
+) -> Generator[List[dict], None, None]:
+    """Stream SQL like stream_sql_statement(), but on the DB connection kept open and reused by this process"""
+    global _reusable_connection
+
+    if verbose:
+        print(cmd)
+
+    connection = _get_reusable_connection()
+    try:
+        # Named cursors must run inside of a transaction, so autocommit is off until the results are read
+        connection.autocommit = False
+        yield from _stream_named_cursor(connection, cmd, batch_size)
+    except (psycopg2.InterfaceError, psycopg2.OperationalError):
+        _reusable_connection = None  # connection was lost. A new one is opened on the next call
+        raise
+    finally:
+        if not connection.closed:
+            connection.rollback()  # only ends the transaction, as the cursor only reads
+            connection.autocommit = True
+
+
+def _stream_named_cursor(connection, cmd: str, batch_size: int) -> Generator[List[dict], None, None]:
+    with connection.cursor(name=f"stream_{uuid4().hex}") as cursor:
+        cursor.itersize = batch_size
+        cursor.execute(cmd)
+        columns = None
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if columns is None:
+                columns = [col[0] for col in cursor.description]
+            yield [dict(zip(columns, row)) for row in rows]
+
+
+def threaded_prefetch(iterable: Iterable[Any], max_prefetch: int) -> Generator[Any, None, None]:
+    """
+        Consume ``iterable`` in a background thread, buffering at most ``max_prefetch`` items ahead of
+        the caller. Used to chain ETL stages so that one stage's I/O (e.g. DB reads) overlaps with work
+        done by the next stage, while keeping memory bounded by the size of the buffer.
+        Exceptions raised in the background thread are re-raised in the caller.
+    """
+    buffer = Queue(maxsize=max_prefetch)
+    stop = Event()
+    end_of_stream = object()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except Exception as e:
+            _put((end_of_stream, e))
+        else:
+            _put((end_of_stream, None))
+        finally:
+            if hasattr(iterable, "close"):
+                iterable.close()
+
+    producer = Thread(target=_produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if item is end_of_stream:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
 def db_rows_to_dict(cursor: psycopg2.extensions.cursor) -> List[dict]:
     """Return a dictionary of all row results from a database connection cursor"""
     columns = [col[0] for col in cursor.description]
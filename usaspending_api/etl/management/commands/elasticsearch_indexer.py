@@ -13,9 +13,11 @@ from usaspending_api.etl.elasticsearch_loader_helpers import (
     Controller,
     execute_sql_statement,
     format_log,
+    stream_sql_statement,
     toggle_refresh_off,
     transform_award_data,
     transform_covid19_faba_data,
+    transform_covid19_faba_data_in_batches,
     transform_transaction_data,
 )
 
@@ -96,6 +98,65 @@ class Command(BaseCommand):
             default=250000,
             metavar="(default: 250,000)",
         )
+        parser.add_argument(
+            "--partition-strategy",
+            type=str,
+            help="How ID ranges are split into partitions. 'range' splits [min ID, max ID] into equal-width ranges. "
+            "'density' samples the ID distribution so each partition holds about --partition-size records, "
+            "which avoids very uneven partitions when IDs are sparse or clustered.",
+            choices=["range", "density"],
+            default="range",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Stream each partition through extract, transform and load in batches of this many rows, "
+            "overlapping DB reads, transforms and ES bulk requests. Bounds the memory used per process by the "
+            "batch size instead of the partition size. When omitted, each partition is processed in full per step.",
+            metavar="",
+        )
+        parser.add_argument(
+            "--persistent-workers",
+            action="store_true",
+            help="Run partitions on long-lived worker processes which reuse their DB connection and ES client, "
+            "instead of starting a new process for every partition. Throughput of each worker is logged.",
+        )
+        parser.add_argument(
+            "--worker-max-memory",
+            type=int,
+            help="With --persistent-workers, replace a worker with a new process once its memory use (RSS) passes "
+            "this many MB after finishing a partition",
+            default=4096,
+            metavar="(default: 4096)",
+        )
+        parser.add_argument(
+            "--bulk-threads",
+            type=int,
+            help="Send ES bulk index requests concurrently from this many threads in each process, adapting the "
+            "number of docs per request to the cluster's response times and 429 rejections. When omitted, each "
+            "process sends one bulk request at a time.",
+            metavar="",
+        )
+        parser.add_argument(
+            "--bulk-max-in-flight",
+            type=int,
+            help="With --bulk-threads, the max number of bulk requests pending at once in each process before "
+            "reading more documents. Defaults to twice --bulk-threads.",
+            metavar="",
+        )
+        parser.add_argument(
+            "--checkpoint-dir",
+            type=str,
+            help="Directory in which to record the partitions of the run and each one that completes, "
+            "so a failed --create-new-index run can be continued with --resume",
+            metavar="",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue a failed --create-new-index run from its checkpoint in --checkpoint-dir. Only the "
+            "partitions not completed are re-run, into the same --index-name, before its aliases are set.",
+        )
         parser.add_argument(
             "--drop-db-view",
             action="store_true",
@@ -140,18 +201,32 @@ class Command(BaseCommand):
 
 def parse_cli_args(options: dict, es_client) -> dict:
     passthrough_values = (
+        "batch_size",
+        "bulk_max_in_flight",
+        "bulk_threads",
+        "checkpoint_dir",
         "create_new_index",
         "drop_db_view",
         "index_name",
         "load_type",
         "partition_size",
+        "partition_strategy",
+        "persistent_workers",
         "process_deletes",
         "processes",
+        "resume",
         "skip_counts",
         "skip_delete_index",
+        "worker_max_memory",
     )
     config = set_config(passthrough_values, options)
 
+    if config["batch_size"] is not None and config["batch_size"] < 1:
+        raise SystemExit("Fatal error: '--batch-size' must be a positive integer.")
+
+    if config["resume"] and not (config["create_new_index"] and config["checkpoint_dir"]):
+        raise SystemExit("Fatal error: '--resume' requires '--create-new-index' and '--checkpoint-dir'.")
+
     if config["create_new_index"] and not config["index_name"]:
         raise SystemExit("Fatal error: '--create-new-index' requires '--index-name'.")
     elif config["create_new_index"]:
@@ -179,6 +254,10 @@ def parse_cli_args(options: dict, es_client) -> dict:
         if not es_client.cat.aliases(name=config["write_alias"]):
             logger.error(f"Write alias '{config['write_alias']}' is missing")
             raise SystemExit(1)
+    elif config["resume"]:
+        if not es_client.indices.exists(config["index_name"]):
+            logger.error(f"Index '{config['index_name']}' to resume loading into doesn't exist")
+            raise SystemExit(1)
     else:
         if es_client.indices.exists(config["index_name"]):
             logger.error(f"Data load into existing index. Change index name or run an incremental load")
@@ -212,6 +291,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "required_index_name": settings.ES_AWARDS_NAME_SUFFIX,
             "sql_view": settings.ES_AWARDS_ETL_VIEW_NAME,
             "stored_date_key": "es_awards",
+            "stream_sql_func": stream_sql_statement,
             "unique_key_field": "generated_unique_award_id",
             "write_alias": settings.ES_AWARDS_WRITE_ALIAS,
         }
@@ -233,6 +313,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "required_index_name": settings.ES_TRANSACTIONS_NAME_SUFFIX,
             "sql_view": settings.ES_TRANSACTIONS_ETL_VIEW_NAME,
             "stored_date_key": "es_transactions",
+            "stream_sql_func": stream_sql_statement,
             "unique_key_field": "generated_unique_transaction_id",
             "write_alias": settings.ES_TRANSACTIONS_WRITE_ALIAS,
         }
@@ -241,10 +322,12 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "base_table": "financial_accounts_by_awards",
             "base_table_id": "financial_accounts_by_awards_id",
             "create_award_type_aliases": False,
+            "data_batch_transform_func": transform_covid19_faba_data_in_batches,
             "data_transform_func": transform_covid19_faba_data,
             "data_type": "covid19-faba",
             "execute_sql_func": execute_sql_statement,
             "extra_null_partition": True,
+            "extract_order_by": "financial_account_distinct_award_key",
             "field_for_es_id": "financial_account_distinct_award_key",
             "initial_datetime": datetime.strptime(f"2020-04-01+0000", "%Y-%m-%d%z"),
             "max_query_size": settings.ES_COVID19_FABA_MAX_RESULT_WINDOW,
@@ -254,6 +337,7 @@ def set_config(passthrough_values: list, arg_parse_options: dict) -> dict:
             "required_index_name": settings.ES_COVID19_FABA_NAME_SUFFIX,
             "sql_view": settings.ES_COVID19_FABA_ETL_VIEW_NAME,
             "stored_date_key": ...,
+            "stream_sql_func": stream_sql_statement,
             "unique_key_field": "distinct_award_key",
             "write_alias": settings.ES_COVID19_FABA_WRITE_ALIAS,
         }
@@ -6,6 +6,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Max
 from django.utils.crypto import get_random_string
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
 from usaspending_api.common.helpers.date_helper import now, datetime_command_line_argument_type
 from usaspending_api.etl.submission_loader_helpers.final_of_fy import populate_final_of_fy
 from usaspending_api.etl.submission_loader_helpers.submission_ids import get_new_or_updated_submission_ids
@@ -119,6 +120,10 @@ class Command(BaseCommand):
 
         self.update_final_of_fy(processed_count, in_progress_count)
 
+        if processed_count > 0:
+            # Replaces the cached API responses which depend on submissions
+            update_last_load_date("submissions", now())
+
         # Only return unstable state if something's in a bad state and we're the last one standing.
         # Should cut down on Slack noise a bit.
         if failed_unrecognized_and_abandoned_count > 0 and in_progress_count == 0:
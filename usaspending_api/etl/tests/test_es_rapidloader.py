@@ -1,12 +1,19 @@
+import json
+import os
 import pytest
 from django.conf import settings
+from django.db import connection
+from elasticsearch.helpers import BulkIndexError
+from elasticsearch.serializer import JSONSerializer
 
 from collections import OrderedDict
 from datetime import datetime, timezone
+from importlib import import_module
 from model_mommy import mommy
+from multiprocessing import Event, Value
 from pathlib import Path
 from usaspending_api.common.elasticsearch.client import instantiate_elasticsearch_client
-from usaspending_api.common.helpers.sql_helpers import execute_sql_to_ordered_dictionary
+from usaspending_api.common.helpers.sql_helpers import ordered_dictionary_fetcher
 from usaspending_api.common.helpers.text_helpers import generate_random_string
 
 from usaspending_api.etl.elasticsearch_loader_helpers import (
@@ -14,8 +21,25 @@ from usaspending_api.etl.elasticsearch_loader_helpers import (
     get_deleted_award_ids,
     Controller,
     execute_sql_statement,
+    execute_sql_statement_reusing_connection,
+    get_completed_partitions,
+    mark_partition_complete,
+    obtain_extract_sql,
+    stream_sql_statement_reusing_connection,
+    TaskSpec,
+    threaded_prefetch,
     transform_award_data,
+    transform_covid19_faba_data,
+    transform_covid19_faba_data_in_batches,
     transform_transaction_data,
+    write_checkpoint_plan,
+)
+from usaspending_api.etl.elasticsearch_loader_helpers import controller, utilities
+from usaspending_api.etl.elasticsearch_loader_helpers.delete_data import get_max_terms_count
+from usaspending_api.etl.elasticsearch_loader_helpers.load_data import (
+    AdaptiveBatchSize,
+    streaming_post_to_es,
+    threaded_bulk,
 )
 
 
@@ -173,8 +197,10 @@ def test_es_transaction_loader_class(award_data_fixture, elasticsearch_transacti
 
 # SQL method is being mocked here since the `execute_sql_statement` used
 #  doesn't use the same DB connection to avoid multiprocessing errors
-def mock_execute_sql(sql, results, verbosity=None):
-    return execute_sql_to_ordered_dictionary(sql)
+def mock_execute_sql(sql, results, verbosity=None, params=None):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return ordered_dictionary_fetcher(cursor) if results else None
 
 
 def test_award_delete_sql(award_data_fixture, monkeypatch, db):
@@ -189,6 +215,10 @@ def test_award_delete_sql(award_data_fixture, monkeypatch, db):
     awards = check_awards_for_deletes(id_list)
     assert awards == [OrderedDict([("generated_unique_award_id", "CONT_AWD_WHATEVER")])]
 
+    id_list = ["CONT_AWD_WHATEVER", "CONT_AWD_WHATEVER", "CONT_AWD_O'QUOTED"]
+    awards = check_awards_for_deletes(id_list)
+    assert sorted(a["generated_unique_award_id"] for a in awards) == ["CONT_AWD_O'QUOTED", "CONT_AWD_WHATEVER"]
+
 
 def test_get_award_ids(award_data_fixture, elasticsearch_award_index):
     elasticsearch_award_index.update_index()
@@ -196,3 +226,388 @@ def test_get_award_ids(award_data_fixture, elasticsearch_award_index):
     client = elasticsearch_award_index.client
     ids = get_deleted_award_ids(client, id_list, award_config, index=elasticsearch_award_index.index_name)
     assert ids == ["CONT_AWD_IND12PB00323"]
+
+
+def test_threaded_prefetch():
+    assert list(threaded_prefetch(iter(range(10)), 2)) == list(range(10))
+
+    def _failing_generator():
+        yield 1
+        raise ValueError("bad batch")
+
+    results = []
+    with pytest.raises(ValueError, match="bad batch"):
+        for item in threaded_prefetch(_failing_generator(), 1):
+            results.append(item)
+    assert results == [1]
+
+
+def test_stream_transformed_batches(monkeypatch):
+    monkeypatch.setattr(controller, "abort", Event(), raising=False)
+
+    def _stream_sql(sql, batch_size):
+        rows = [{"id": i} for i in range(7)]
+        for i in range(0, len(rows), batch_size):
+            yield rows[i : i + batch_size]
+
+    def _transform(task, records):
+        return [{**r, "_id": r["id"]} for r in records]
+
+    task = TaskSpec(
+        name="test",
+        index="test-index",
+        sql="SELECT 1",
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id="id",
+        primary_key="id",
+        partition_number=0,
+        is_incremental=False,
+        transform_func=_transform,
+        stream_sql_func=_stream_sql,
+        batch_size=3,
+    )
+    batches = list(controller.stream_transformed_batches(task))
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [doc["_id"] for batch in batches for doc in batch] == list(range(7))
+
+
+def test_stream_covid19_faba_batches(monkeypatch):
+    monkeypatch.setattr(controller, "abort", Event(), raising=False)
+
+    def _faba_record(key, obligation, outlay, is_final):
+        return {
+            "financial_account_distinct_award_key": key,
+            "award_id": 1,
+            "type": "A",
+            "generated_unique_award_id": f"CONT_AWD_{key}",
+            "total_loan_value": None,
+            "transaction_obligated_amount": obligation,
+            "gross_outlay_amount_by_award_cpe": outlay,
+            "is_final_balances_for_fy": is_final,
+        }
+
+    # Records are ordered by key, as done by the "extract_order_by" SQL, and key "b" spans three DB batches
+    rows = [
+        _faba_record("a", 1, 10, True),
+        _faba_record("b", 2, 20, True),
+        _faba_record("b", 3, 30, False),
+        _faba_record("b", None, 40, True),
+        _faba_record("b", 5, None, True),
+        _faba_record("c", 6, 60, True),
+        _faba_record("d", 7, 70, False),
+    ]
+
+    def _stream_sql(sql, batch_size):
+        for i in range(0, len(rows), batch_size):
+            yield [dict(r) for r in rows[i : i + batch_size]]
+
+    task = TaskSpec(
+        name="test",
+        index="test-index",
+        sql="SELECT 1",
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id="financial_account_distinct_award_key",
+        primary_key="award_id",
+        partition_number=0,
+        is_incremental=False,
+        transform_func=transform_covid19_faba_data,
+        batch_transform_func=transform_covid19_faba_data_in_batches,
+        stream_sql_func=_stream_sql,
+        batch_size=2,
+    )
+    batches = list(controller.stream_transformed_batches(task))
+    expected = transform_covid19_faba_data(task, [dict(r) for r in rows])
+
+    assert [len(b) for b in batches] == [2, 2]
+    assert [doc for batch in batches for doc in batch] == expected
+    assert [(doc["_id"], doc["obligated_sum"], doc["outlay_sum"]) for doc in expected] == [
+        ("a", 1, 10),
+        ("b", 10, 60),
+        ("c", 6, 60),
+        ("d", 7, 0),
+    ]
+    assert len(expected[1]["financial_accounts_by_award"]) == 4
+
+
+def test_obtain_extract_sql_order_by():
+    config = {"sql_view": "covid19_faba_view", "primary_key": "award_id", "lower_bound": 1, "upper_bound": 5}
+    assert not obtain_extract_sql(dict(config)).endswith('ORDER BY "financial_account_distinct_award_key"')
+
+    config["extract_order_by"] = "financial_account_distinct_award_key"
+    assert obtain_extract_sql(dict(config)).endswith('ORDER BY "financial_account_distinct_award_key"')
+    assert obtain_extract_sql(dict(config), True).endswith('ORDER BY "financial_account_distinct_award_key"')
+
+
+def test_determine_partition_ranges_by_density(monkeypatch):
+    monkeypatch.setattr(controller, "get_partition_boundaries", lambda config, partitions: [5, 5, 900, 1000])
+    loader = Controller({"partition_size": 250})
+    loader.record_count, loader.min_id, loader.max_id = 1000, 5, 5000
+
+    ranges = loader.determine_partition_ranges_by_density()
+    assert ranges == [(5, 899), (900, 999), (1000, 5000)]
+
+    loader.partition_ranges = ranges
+    assert loader.get_id_range_for_partition(1) == (900, 999)
+
+
+def test_dispatch_tasks_to_persistent_workers(monkeypatch):
+    partitions_run = Value("i", 0, lock=True)
+
+    def _fake_etl(task):
+        with partitions_run.get_lock():
+            partitions_run.value += 1
+        return 1, 0
+
+    monkeypatch.setattr(controller, "extract_transform_load", _fake_etl)
+    monkeypatch.setattr(controller, "close_all_django_db_conns", lambda: None)
+
+    # A memory limit of 1MB is always exceeded, so every worker is recycled after each partition
+    for max_memory in (None, 1):
+        partitions_run.value = 0
+        loader = Controller({"persistent_workers": True, "processes": 2, "worker_max_memory": max_memory})
+        loader.tasks = list(range(5))
+        loader.dispatch_tasks()
+        assert partitions_run.value == 5
+
+
+def test_dispatch_tasks_to_persistent_workers_lost_worker(monkeypatch):
+    monkeypatch.setattr(controller, "extract_transform_load", lambda task: os._exit(1))
+    monkeypatch.setattr(controller, "close_all_django_db_conns", lambda: None)
+
+    loader = Controller({"persistent_workers": True, "processes": 2, "worker_max_memory": None})
+    loader.tasks = list(range(5))
+    with pytest.raises(RuntimeError, match="One or more partitions failed"):
+        loader.dispatch_tasks()
+
+
+class _FakeCursor:
+    description = [("id",)]
+
+    def __init__(self, connection, name=None):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, cmd, params=None):
+        self.rows = [(1,), (2,), (3,)]
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+
+class _FakeConnection:
+    closed = 0
+
+    def __init__(self):
+        self.autocommit = False
+        self.rollbacks = 0
+
+    def cursor(self, name=None):
+        if name:
+            assert self.autocommit is False, "named cursors must run inside of a transaction"
+        return _FakeCursor(self, name)
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def test_stream_sql_statement_reusing_connection(monkeypatch):
+    connections = []
+
+    def _connect(dsn):
+        connections.append(_FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(utilities, "_reusable_connection", None)
+    monkeypatch.setattr(utilities.psycopg2, "connect", _connect)
+    monkeypatch.setattr(utilities, "get_database_dsn_string", lambda: "")
+
+    assert list(stream_sql_statement_reusing_connection("SELECT", 2)) == [[{"id": 1}, {"id": 2}], [{"id": 3}]]
+    assert execute_sql_statement_reusing_connection("SELECT", True) == [{"id": 1}, {"id": 2}, {"id": 3}]
+    assert list(stream_sql_statement_reusing_connection("SELECT", 5)) == [[{"id": 1}, {"id": 2}, {"id": 3}]]
+
+    assert len(connections) == 1
+    assert connections[0].autocommit is True
+    assert connections[0].rollbacks == 2
+
+    config = {
+        **transaction_config,
+        "index_name": "test-transactions",
+        "is_incremental_load": False,
+        "persistent_workers": True,
+        "starting_date": datetime(2007, 10, 1, 0, 0, tzinfo=timezone.utc),
+        "stream_sql_func": object(),
+    }
+    loader = Controller(config)
+    loader.partition_ranges = [(1, 100)]
+    task = loader.configure_task(0, iter(["task"]))
+    assert task.stream_sql_func is stream_sql_statement_reusing_connection
+    assert task.execute_sql_func is execute_sql_statement_reusing_connection
+
+
+def test_resume_from_checkpoint(tmp_path):
+    config = {
+        **transaction_config,
+        "checkpoint_dir": str(tmp_path),
+        "index_name": "test-transactions",
+        "is_incremental_load": False,
+        "processes": 4,
+        "resume": True,
+        "starting_date": datetime(2007, 10, 1, 0, 0, tzinfo=timezone.utc),
+    }
+    write_checkpoint_plan(config, 300, 1, 300, [(1, 100), (101, 200), (201, 300)], False)
+    mark_partition_complete(str(tmp_path), "test-transactions", 1, (101, 200), 100, 0)
+
+    loader = Controller(config)
+    loader.prepare_for_etl()
+
+    assert [task.partition_number for task in loader.tasks] == [0, 2]
+    assert [task.id_range for task in loader.tasks] == [(1, 100), (201, 300)]
+    assert "BETWEEN 201 AND 300" in loader.tasks[1].sql
+    assert loader.config["processes"] == 2
+
+
+def test_partitions_with_failed_docs_are_not_checkpointed(tmp_path, monkeypatch):
+    config = {"checkpoint_dir": str(tmp_path), "index_name": "test-transactions", "data_type": "transaction"}
+    write_checkpoint_plan(config, 200, 1, 200, [(1, 100), (101, 200)], False)
+    controller.init_shared_abort(Event())
+    monkeypatch.setattr(controller, "get_worker_es_client", lambda: None)
+    monkeypatch.setattr(controller, "extract_records", lambda task: [{"id": 1}])
+
+    for partition_number, result in enumerate([(100, 0), (99, 1)]):
+        monkeypatch.setattr(controller, "load_data", lambda task, records, client: result)
+        task = TaskSpec(
+            name=f"test-{partition_number}",
+            index="test-transactions",
+            sql="",
+            view="",
+            base_table="",
+            base_table_id="",
+            field_for_es_id="",
+            primary_key="",
+            partition_number=partition_number,
+            is_incremental=False,
+            transform_func=lambda task, records: records,
+            checkpoint_dir=str(tmp_path),
+        )
+        assert controller.extract_transform_load(task) == result
+
+    assert get_completed_partitions(config) == {0}
+
+    # Checkpoints recorded with failed docs, e.g. by an earlier version, are loaded again too
+    mark_partition_complete(str(tmp_path), "test-transactions", 1, (101, 200), 99, 1)
+    assert get_completed_partitions(config) == {0}
+
+
+class _FakeBulkClient:
+    """
+    Stands in for an ES client, rejecting every 3rd doc with a 429 the first time it is sent, docs in
+    ``always_rejected_ids`` with a 429 every time, and failing docs in ``failed_ids`` with a 400
+    """
+
+    class transport:
+        serializer = JSONSerializer()
+
+    def __init__(self, failed_ids=(), always_rejected_ids=()):
+        self.indexed_ids = []
+        self.rejected_ids = set()
+        self.failed_ids = set(failed_ids)
+        self.always_rejected_ids = set(always_rejected_ids)
+
+    def bulk(self, body, index):
+        lines = body.strip().split("\n")
+        items = []
+        for action_line in lines[::2]:
+            doc_id = json.loads(action_line)["index"]["_id"]
+            if doc_id in self.failed_ids:
+                items.append({"index": {"_id": doc_id, "status": 400, "error": {"type": "mapper_parsing_exception"}}})
+            elif doc_id in self.always_rejected_ids or (doc_id % 3 == 0 and doc_id not in self.rejected_ids):
+                self.rejected_ids.add(doc_id)
+                items.append({"index": {"_id": doc_id, "status": 429}})
+            else:
+                self.indexed_ids.append(doc_id)
+                items.append({"index": {"_id": doc_id, "status": 201}})
+        return {"took": 5, "errors": bool(self.rejected_ids), "items": items}
+
+
+def test_threaded_bulk(monkeypatch):
+    load_data_module = import_module("usaspending_api.etl.elasticsearch_loader_helpers.load_data")
+    monkeypatch.setattr(load_data_module, "ES_BULK_INITIAL_BACKOFF", 0)
+    monkeypatch.setattr(load_data_module, "ES_BATCH_ENTRIES", 10)
+    client = _FakeBulkClient()
+    docs = ({"_id": i, "routing": i % 7, "value": f"doc {i}"} for i in range(1, 101))
+
+    success, failed = threaded_bulk(client, docs, "test-index", "test", threads=3, max_in_flight=4)
+
+    assert (success, failed) == (100, 0)
+    assert sorted(client.indexed_ids) == list(range(1, 101))
+    assert len(client.rejected_ids) == 33
+
+
+@pytest.mark.parametrize(
+    "client,error",
+    [
+        (_FakeBulkClient(failed_ids=[50]), "1 document\\(s\\) failed to index"),
+        (_FakeBulkClient(always_rejected_ids=[50]), "1 document\\(s\\) still rejected after 2 retries"),
+    ],
+)
+def test_threaded_bulk_raises_on_failed_docs(monkeypatch, client, error):
+    load_data_module = import_module("usaspending_api.etl.elasticsearch_loader_helpers.load_data")
+    monkeypatch.setattr(load_data_module, "ES_BULK_INITIAL_BACKOFF", 0)
+    monkeypatch.setattr(load_data_module, "ES_BULK_MAX_RETRIES", 2)
+    monkeypatch.setattr(load_data_module, "ES_BATCH_ENTRIES", 10)
+    docs = ({"_id": i, "routing": i % 7, "value": f"doc {i}"} for i in range(1, 101))
+
+    with pytest.raises(BulkIndexError, match=error) as exc_info:
+        threaded_bulk(client, docs, "test-index", "test", threads=3, max_in_flight=4)
+    assert [next(iter(item.values()))["_id"] for item in exc_info.value.errors] == [50]
+
+    # streaming_post_to_es fails the partition, as it does when helpers.streaming_bulk raises
+    client.indexed_ids.clear()
+    docs = ({"_id": i, "routing": i % 7, "value": f"doc {i}"} for i in range(1, 101))
+    with pytest.raises(RuntimeError):
+        streaming_post_to_es(client, docs, "test-index", "test", delete_before_index=False, bulk_threads=3)
+
+
+def test_adaptive_batch_size():
+    batch_size = AdaptiveBatchSize(initial=1000, minimum=100, maximum=2000, target_took_ms=1000)
+    batch_size.record_response(took_ms=100)
+    assert batch_size.size == 1250
+    batch_size.record_response(took_ms=5000)
+    assert batch_size.size == 1000
+    for _ in range(5):
+        batch_size.record_rejection()
+    assert batch_size.size == 100
+
+
+def test_get_max_terms_count():
+    class _FakeIndicesClient:
+        def __init__(self, response):
+            self.response = response
+
+        def get_settings(self, **kwargs):
+            return self.response
+
+    class _FakeClient:
+        def __init__(self, response):
+            self.indices = _FakeIndicesClient(response)
+
+    response = {
+        "index-1": {"settings": {}, "defaults": {"index.max_terms_count": "65536"}},
+        "index-2": {"settings": {"index.max_terms_count": "20000"}, "defaults": {}},
+    }
+    assert get_max_terms_count(_FakeClient(response), "test-max-terms-alias") == 20000
+    assert get_max_terms_count(_FakeClient({}), "test-max-terms-no-settings") == 65536
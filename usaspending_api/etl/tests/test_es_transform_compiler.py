@@ -0,0 +1,207 @@
+import os
+
+from copy import deepcopy
+from time import perf_counter
+
+import pytest
+
+from usaspending_api.etl.elasticsearch_loader_helpers import aggregate_key_functions as funcs
+from usaspending_api.etl.elasticsearch_loader_helpers.transform_compiler import compile_transform
+from usaspending_api.etl.elasticsearch_loader_helpers.transform_data import (
+    AWARD_AGG_KEY_CREATIONS,
+    AWARD_CONVERTERS,
+    AWARD_DROP_FIELDS,
+    TRANSACTION_AGG_KEY_CREATIONS,
+    TRANSACTION_CONVERTERS,
+    TRANSACTION_DROP_FIELDS,
+    transform_award_data,
+    transform_transaction_data,
+)
+from usaspending_api.etl.elasticsearch_loader_helpers.utilities import TaskSpec
+
+AGENCY_COLUMNS = [
+    f"{agency_type}_{agency_tier}_agency_{field}"
+    for agency_type in ("awarding", "funding")
+    for agency_tier in ("toptier", "subtier")
+    for field in ("name", "abbreviation", "code", "id")
+]
+LOCATION_COLUMNS = [
+    f"{location_type}_{field}"
+    for location_type in ("pop", "recipient_location")
+    for field in (
+        "country_code",
+        "country_name",
+        "state_code",
+        "state_name",
+        "state_fips",
+        "state_population",
+        "county_code",
+        "county_name",
+        "county_population",
+        "congressional_code",
+        "congressional_population",
+    )
+]
+COMMON_COLUMNS = [
+    "award_id",
+    "recipient_hash",
+    "recipient_name",
+    "recipient_unique_id",
+    "recipient_levels",
+    "parent_recipient_unique_id",
+    "naics_code",
+    "naics_description",
+    "product_or_service_code",
+    "product_or_service_description",
+    "federal_accounts",
+    *AGENCY_COLUMNS,
+    *LOCATION_COLUMNS,
+]
+
+
+def transform_records(records, converters, agg_key_creations, drop_fields, routing_field, es_id_field):
+    """Uncompiled equivalent of compile_transform(...), which its output is tested against"""
+    for record in records:
+        for field, converter in converters.items():
+            record[field] = converter(record[field])
+        for key, transform_func in agg_key_creations.items():
+            record[key] = transform_func(record)
+        if routing_field:
+            record["routing"] = record[routing_field]
+        record["_id"] = record[es_id_field]
+        for key in drop_fields:
+            record.pop(key)
+    return records
+
+
+def _make_record(i, es_id_field):
+    record = {column: f"{column} {i}" for column in COMMON_COLUMNS}
+    record.update(
+        {
+            es_id_field: i,
+            "recipient_hash": f"0b3ba6f7-3fb9-ab2b-dd3a-e8c5d4df0a{i % 100:02}",
+            "recipient_levels": ["C", "R"] if i % 2 else ["P"],
+            "federal_accounts": [{"id": i, "account_title": "Title", "federal_account_code": "012-3456"}],
+            "pop_state_population": 1000 + i,
+            "recipient_location_county_population": 10 + i,
+        }
+    )
+    # Exercise the null handling of each kind of agg key
+    if i % 3 == 0:
+        record["naics_code"] = None
+        record["funding_toptier_agency_name"] = None
+        record["pop_county_code"] = None
+        record["federal_accounts"] = []
+    if i % 4 == 0:
+        record["recipient_location_state_code"] = None
+        record["pop_congressional_code"] = None
+        record["pop_country_code"] = None
+        record["recipient_name"] = None
+    return record
+
+
+def _make_records(count, es_id_field):
+    return [_make_record(i, es_id_field) for i in range(count)]
+
+
+def _worker(es_id_field):
+    return TaskSpec(
+        name="Test Worker",
+        index="test-index",
+        sql=None,
+        view=None,
+        base_table=None,
+        base_table_id=None,
+        field_for_es_id=es_id_field,
+        primary_key=None,
+        partition_number=None,
+        is_incremental=None,
+        transform_func=None,
+    )
+
+
+@pytest.mark.parametrize(
+    "transform_func,converters,agg_key_creations,drop_fields,es_id_field",
+    [
+        (
+            transform_transaction_data,
+            TRANSACTION_CONVERTERS,
+            TRANSACTION_AGG_KEY_CREATIONS,
+            TRANSACTION_DROP_FIELDS,
+            "transaction_id",
+        ),
+        (transform_award_data, AWARD_CONVERTERS, AWARD_AGG_KEY_CREATIONS, AWARD_DROP_FIELDS, "award_id"),
+    ],
+)
+def test_compiled_transform_matches_reference(
+    settings, transform_func, converters, agg_key_creations, drop_fields, es_id_field
+):
+    records = _make_records(100, es_id_field)
+    expected = transform_records(
+        deepcopy(records), converters, agg_key_creations, drop_fields, settings.ES_ROUTING_FIELD, es_id_field
+    )
+
+    actual = transform_func(_worker(es_id_field), deepcopy(records))
+
+    assert actual == expected
+    assert [list(doc) for doc in actual] == [list(doc) for doc in expected]
+
+
+def test_compiled_transform_resolves_optional_fields_against_columns():
+    agg_key_creations = {"awarding_toptier_agency_agg_key": funcs.awarding_toptier_agency_agg_key}
+    record = {"id": 1, "awarding_toptier_agency_name": "Agency", "awarding_toptier_agency_id": 7}
+    expected = transform_records([dict(record)], {}, agg_key_creations, [], None, "id")
+
+    build_docs = compile_transform({}, agg_key_creations, [], None, "id", record.keys())
+
+    assert build_docs([dict(record)]) == expected
+    assert '"abbreviation"' not in expected[0]["awarding_toptier_agency_agg_key"]
+
+
+def test_compiled_transform_is_cached():
+    args = (TRANSACTION_CONVERTERS, TRANSACTION_AGG_KEY_CREATIONS, TRANSACTION_DROP_FIELDS, "recipient_agg_key")
+    columns = _make_record(1, "transaction_id").keys()
+
+    assert compile_transform(*args, "transaction_id", columns) is compile_transform(*args, "transaction_id", columns)
+
+
+@pytest.mark.skipif(not os.environ.get("RUN_BENCHMARKS"), reason="benchmark, run with RUN_BENCHMARKS=1 and -s")
+@pytest.mark.parametrize(
+    "transform_func,converters,agg_key_creations,drop_fields,es_id_field",
+    [
+        (
+            transform_transaction_data,
+            TRANSACTION_CONVERTERS,
+            TRANSACTION_AGG_KEY_CREATIONS,
+            TRANSACTION_DROP_FIELDS,
+            "transaction_id",
+        ),
+        (transform_award_data, AWARD_CONVERTERS, AWARD_AGG_KEY_CREATIONS, AWARD_DROP_FIELDS, "award_id"),
+    ],
+)
+def test_compiled_transform_benchmark(
+    settings, transform_func, converters, agg_key_creations, drop_fields, es_id_field
+):
+    """Prints the rows/sec of the uncompiled and compiled transforms, best of 5 runs on 20,000 synthetic rows"""
+    records = _make_records(20000, es_id_field)
+    transform_func(_worker(es_id_field), deepcopy(records[:1]))  # compile outside of the timings
+
+    def rows_per_second(transform):
+        timings = []
+        for _ in range(5):
+            batch = deepcopy(records)
+            start = perf_counter()
+            transform(batch)
+            timings.append(perf_counter() - start)
+        return len(records) / min(timings)
+
+    uncompiled = rows_per_second(
+        lambda batch: transform_records(
+            batch, converters, agg_key_creations, drop_fields, settings.ES_ROUTING_FIELD, es_id_field
+        )
+    )
+    compiled = rows_per_second(lambda batch: transform_func(_worker(es_id_field), batch))
+    print(
+        f"\n{transform_func.__name__}: uncompiled {uncompiled:,.0f} rows/sec, compiled {compiled:,.0f} rows/sec "
+        f"({compiled / uncompiled:.2f}x)"
+    )
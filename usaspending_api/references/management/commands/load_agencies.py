@@ -7,8 +7,10 @@ from django.db import transaction
 from pathlib import Path
 from psycopg2.extras import execute_values
 from psycopg2.sql import SQL
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
 from usaspending_api.common.csv_helpers import read_csv_file_as_list_of_dictionaries
 from usaspending_api.common.etl import ETLQueryFile, ETLTable, mixins
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.common.helpers.sql_helpers import get_connection, execute_sql
 from usaspending_api.common.helpers.text_helpers import standardize_nullable_whitespace as prep
 from usaspending_api.common.helpers.timing_helpers import ScriptTimer as Timer
@@ -97,6 +99,7 @@ class Command(mixins.ETLMixin, BaseCommand):
             try:
                 with transaction.atomic():
                     self._perform_load()
+                    update_last_load_date("reference_data", now())
                     t = Timer("Commit agency transaction")
                     t.log_starting_message()
                 t.log_success_message()
@@ -4,6 +4,8 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 from openpyxl import load_workbook
 
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.references.models import Definition
 
 
@@ -21,6 +23,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
 
         load_glossary(path=options["path"], append=options["append"])
+        update_last_load_date("reference_data", now())
 
 
 def load_glossary(path, append):
@@ -7,6 +7,8 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from openpyxl import load_workbook
 
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.references.models import NAICS
 
 
@@ -25,6 +27,7 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         load_naics(path=options["path"], append=options["append"])
+        update_last_load_date("reference_data", now())
 
 
 def populate_naics_fields(ws, naics_year, path):
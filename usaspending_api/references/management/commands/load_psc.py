@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.references.models import PSC
 import os
 import logging
@@ -21,6 +23,7 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
 
         load_psc(fullpath=options["path"], update=options["update"])
+        update_last_load_date("reference_data", now())
         self.logger.log(20, "Loaded PSC codes successfully.")
 
 
@@ -4,6 +4,9 @@ from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
+
 
 class Command(BaseCommand):
     help = "Loads reference data into the database. This should be run after \
@@ -88,4 +91,5 @@ class Command(BaseCommand):
             "load_dabs_submission_window_schedule", file="usaspending_api/data/dabs_submission_window_schedule.csv"
         )
 
+        update_last_load_date("reference_data", now())
         self.logger.info("Reference data loaded.")
@@ -9,6 +9,8 @@ from openpyxl.utils import get_column_letter
 from pathlib import Path
 from time import perf_counter
 
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
 from usaspending_api.references.models import Rosetta
 
@@ -55,6 +57,7 @@ class Command(BaseCommand):
             rosetta_object["metadata"]["download_location"] = options["path"]
 
             load_xlsx_data_to_model(rosetta_object)
+            update_last_load_date("reference_data", now())
 
             logger.info("Script completed in {:.2f}s".format(perf_counter() - script_start_time))
         except Exception:
@@ -9,6 +9,8 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from usaspending_api.accounts.models import TreasuryAppropriationAccount
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.common.helpers.timing_helpers import ConsoleTimer as Timer
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
 from usaspending_api.etl.management.load_base import load_data_into_model
@@ -74,6 +76,7 @@ class Command(BaseCommand):
                 agencies = update_federal_account_agency()
                 logger.info(f"   Updated {agencies:,} Federal Account agency links")
 
+            update_last_load_date("reference_data", now())
             logger.info("=== TAS loader finished successfully! ===")
 
         except Exception as e:
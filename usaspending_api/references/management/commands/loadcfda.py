@@ -7,6 +7,8 @@ from time import perf_counter
 
 from django.core.management.base import BaseCommand
 
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
+from usaspending_api.common.helpers.date_helper import now
 from usaspending_api.common.retrieve_file_from_uri import RetrieveFileFromUri
 from usaspending_api.common.retrieve_file_from_uri import SCHEMA_HELP_TEXT
 from usaspending_api.common.operations_reporter import OpsReporter
@@ -81,6 +83,8 @@ class Command(BaseCommand):
 
         logger.info("Comparing DataFrames")
         raise_status_code_3 = not load_cfda(database_df, external_data_df)
+        if not raise_status_code_3:
+            update_last_load_date("reference_data", now())
 
         Reporter["duration"] = perf_counter() - start
         Reporter["end_status"] = 3 if raise_status_code_3 else 0
@@ -14,6 +14,7 @@ class AgencyViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/agency/id.md"
+    cache_data_sources = ["reference_data", "submissions"]
 
     @cache_response()
     def get(self, request, pk, format=None):
@@ -116,6 +116,7 @@ class CFDAAutocompleteViewSet(BaseAutocompleteViewSet):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/autocomplete/cfda.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def post(self, request):
@@ -141,6 +142,7 @@ class NAICSAutocompleteViewSet(BaseAutocompleteViewSet):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/autocomplete/naics.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def post(self, request):
@@ -171,6 +173,7 @@ class PSCAutocompleteViewSet(BaseAutocompleteViewSet):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/autocomplete/psc.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def post(self, request):
@@ -197,6 +200,7 @@ class GlossaryAutocompleteViewSet(BaseAutocompleteViewSet):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/autocomplete/glossary.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def post(self, request):
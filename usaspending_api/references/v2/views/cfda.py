@@ -14,6 +14,7 @@ class CFDAViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/cfda/totals.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def get(self, request, cfda=None):
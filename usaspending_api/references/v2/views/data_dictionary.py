@@ -17,6 +17,7 @@ class DataDictionaryViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/data_dictionary.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def get(self, request, format=None):
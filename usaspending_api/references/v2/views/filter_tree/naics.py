@@ -21,6 +21,7 @@ class NAICSViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/naics.md"
+    cache_data_sources = ["reference_data"]
 
     def _parse_and_validate_request(self, requested_naics: str, request_data) -> dict:
         naics_filter = request_data.get("filter")
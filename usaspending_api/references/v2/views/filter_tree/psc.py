@@ -13,6 +13,7 @@ class PSCViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/filter_tree/psc.md"
+    cache_data_sources = ["reference_data"]
 
     def _parse_and_validate(self, request):
         models = [
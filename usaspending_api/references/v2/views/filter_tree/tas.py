@@ -14,6 +14,7 @@ class TASViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/filter_tree/tas.md"
+    cache_data_sources = ["reference_data", "submissions"]
 
     def _parse_and_validate(self, request):
         models = [
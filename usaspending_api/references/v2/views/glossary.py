@@ -22,6 +22,7 @@ class GlossaryViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/glossary.md"
+    cache_data_sources = ["reference_data"]
 
     @cache_response()
     def get(self, request: Request) -> Response:
@@ -34,6 +34,8 @@ class TASAutocomplete(APIView):
     endpoint.
     """
 
+    cache_data_sources = ["reference_data", "submissions"]
+
     @staticmethod
     def _parse_and_validate_request(request_data):
         return TinyShield(deepcopy(TINY_SHIELD_MODELS)).block(request_data)
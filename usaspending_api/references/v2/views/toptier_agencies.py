@@ -18,6 +18,7 @@ class ToptierAgenciesViewSet(APIView):
     """
 
     endpoint_doc = "usaspending_api/api_contracts/contracts/v2/references/toptier_agencies.md"
+    cache_data_sources = ["reference_data", "submissions"]
 
     @cache_response()
     def get(self, request, format=None):
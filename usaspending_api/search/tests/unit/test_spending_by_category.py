@@ -1,7 +1,9 @@
 import pytest
 
+from elasticsearch_dsl import Q as ES_Q
 from model_mommy import mommy
 
+from usaspending_api.common.exceptions import ElasticsearchConnectionException
 from usaspending_api.common.helpers.generic_helper import get_time_period_message
 from usaspending_api.search.tests.data.utilities import setup_elasticsearch_test
 from usaspending_api.search.v2.views.spending_by_category_views.spending_by_agency_types import (
@@ -10,6 +12,7 @@ from usaspending_api.search.v2.views.spending_by_category_views.spending_by_agen
     FundingAgencyViewSet,
     FundingSubagencyViewSet,
 )
+from usaspending_api.search.v2.views.spending_by_category_views.spending_by_category import MAX_BUCKETS
 from usaspending_api.search.v2.views.spending_by_category_views.spending_by_federal_account import FederalAccountViewSet
 from usaspending_api.search.v2.views.spending_by_category_views.spending_by_industry_codes import (
     CfdaViewSet,
@@ -1051,3 +1054,25 @@ def test_category_federal_accounts(federal_accounts_test_data, monkeypatch, elas
     }
 
     assert expected_response == spending_by_category_logic
+
+
+def test_category_aggregation_is_single_query():
+    view = NAICSViewSet()
+    view.pagination = view._get_pagination({"page": 1, "limit": 10})
+
+    search = view.build_elasticsearch_search_with_aggregations(ES_Q("match_all"))
+
+    terms = search.to_dict()["aggs"]["group_by_agg_key"]["terms"]
+    assert terms["size"] == MAX_BUCKETS
+    assert terms["shard_size"] == MAX_BUCKETS
+
+
+def test_category_too_many_buckets():
+    view = NAICSViewSet()
+
+    view.check_for_missing_buckets({"group_by_agg_key": {"sum_other_doc_count": 0, "buckets": []}})
+    with pytest.raises(ElasticsearchConnectionException):
+        view.check_for_missing_buckets({"group_by_agg_key": {"sum_other_doc_count": 12, "buckets": []}})
+
+    # Recipients are paged by the aggregation itself, so other docs are expected
+    RecipientDunsViewSet().check_for_missing_buckets({"group_by_agg_key": {"sum_other_doc_count": 12, "buckets": []}})
@@ -2,7 +2,7 @@ import copy
 import logging
 from abc import ABCMeta, abstractmethod
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import List
 
 from django.conf import settings
 from django.db.models import QuerySet, Sum
@@ -22,13 +22,13 @@ from usaspending_api.common.query_with_filters import QueryWithFilters
 from usaspending_api.common.validator.award_filter import AWARD_FILTER
 from usaspending_api.common.validator.pagination import PAGINATION
 from usaspending_api.common.validator.tinyshield import TinyShield
-from usaspending_api.search.v2.elasticsearch_helper import (
-    get_number_of_unique_terms_for_transactions,
-    get_scaled_sum_aggregations,
-)
+from usaspending_api.search.v2.elasticsearch_helper import get_scaled_sum_aggregations
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of buckets Elasticsearch allows an aggregation to return
+MAX_BUCKETS = 10000
+
 
 @dataclass
 class Category:
@@ -118,7 +118,7 @@ class AbstractSpendingByCategoryViewSet(APIView, metaclass=ABCMeta):
             .order_by("-amount")
         )
 
-    def build_elasticsearch_search_with_aggregations(self, filter_query: ES_Q) -> Optional[TransactionSearch]:
+    def build_elasticsearch_search_with_aggregations(self, filter_query: ES_Q) -> TransactionSearch:
         """
         Using the provided ES_Q object creates a TransactionSearch object with the necessary applied aggregations.
         """
@@ -136,23 +136,16 @@ class AbstractSpendingByCategoryViewSet(APIView, metaclass=ABCMeta):
             sum_bucket_sort = sum_aggregations["sum_bucket_truncate"]
             group_by_agg_key_values = {"order": {"sum_field": "desc"}}
         else:
-            # Get count of unique buckets; terminate early if there are no buckets matching criteria
-            bucket_count = get_number_of_unique_terms_for_transactions(filter_query, f"{self.category.agg_key}.hash")
-            if bucket_count == 0:
-                return None
-            else:
-                # Add 100 to make sure that we consider enough records in each shard for accurate results;
-                # Only needed for non high-cardinality fields since those are being routed
-                size = bucket_count
-                shard_size = bucket_count + 100
-                sum_bucket_sort = sum_aggregations["sum_bucket_sort"]
-                group_by_agg_key_values = {}
-
-        if shard_size > 10000:
-            logger.warning(f"Max number of buckets reached for aggregation key: {self.category.agg_key}.")
-            raise ElasticsearchConnectionException(
-                "Current filters return too many unique items. Narrow filters to return results."
-            )
+            # Request every bucket up to the max allowed instead of first counting the unique terms in a separate
+            # query. As long as there are no more unique terms than that, each shard returns all of its buckets
+            # and the sums are exact. Any terms left out are caught from the response; see check_for_missing_buckets
+            size = MAX_BUCKETS
+            shard_size = MAX_BUCKETS
+            sum_bucket_sort = sum_aggregations["sum_bucket_sort"]
+            group_by_agg_key_values = {}
+
+        if shard_size > MAX_BUCKETS:
+            self._raise_too_many_buckets()
 
         # Define all aggregations needed to build the response
         group_by_agg_key_values.update({"field": self.category.agg_key, "size": size, "shard_size": shard_size})
@@ -172,12 +165,28 @@ class AbstractSpendingByCategoryViewSet(APIView, metaclass=ABCMeta):
 
     def query_elasticsearch_for_prime_awards(self, filter_query: ES_Q) -> list:
         search = self.build_elasticsearch_search_with_aggregations(filter_query)
-        if search is None:
-            return []
         response = search.handle_execute()
-        results = self.build_elasticsearch_result(response.aggs.to_dict())
+        aggs = response.aggs.to_dict()
+        self.check_for_missing_buckets(aggs)
+        results = self.build_elasticsearch_result(aggs)
         return results
 
+    def check_for_missing_buckets(self, response: dict) -> None:
+        """
+        Non high-cardinality categories need all of their buckets to sort on the summed obligations. Documents
+        counted in "sum_other_doc_count" belong to terms that didn't fit in the aggregation.
+        """
+        if self.category.name in self.high_cardinality_categories:
+            return
+        if response.get("group_by_agg_key", {}).get("sum_other_doc_count", 0) > 0:
+            self._raise_too_many_buckets()
+
+    def _raise_too_many_buckets(self):
+        logger.warning(f"Max number of buckets reached for aggregation key: {self.category.agg_key}.")
+        raise ElasticsearchConnectionException(
+            "Current filters return too many unique items. Narrow filters to return results."
+        )
+
     @abstractmethod
     def build_elasticsearch_result(self, response: dict) -> List[dict]:
         """
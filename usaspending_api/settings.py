@@ -21,9 +21,34 @@ MAX_DOWNLOAD_LIMIT = 500000
 # Timeout limit for streaming downloads
 DOWNLOAD_TIMEOUT_MIN_LIMIT = 10
 
+# zlib level (1-9) and number of threads used to deflate the files of download zip archives
+DOWNLOAD_ZIP_COMPRESSION_LEVEL = int(os.environ.get("DOWNLOAD_ZIP_COMPRESSION_LEVEL", 6))
+DOWNLOAD_ZIP_COMPRESSION_THREADS = int(os.environ.get("DOWNLOAD_ZIP_COMPRESSION_THREADS", os.cpu_count() or 1))
+
+# Number of sources of a download (e.g. prime and sub-award files) exported at the same time
+DOWNLOAD_MAX_CONCURRENT_SOURCES = int(os.environ.get("DOWNLOAD_MAX_CONCURRENT_SOURCES", 4))
+
+# Upload download archives to S3 with a multipart upload while they're generated, instead of writing them to local
+# disk and uploading them afterwards. Their sources are then exported one at a time, straight into the upload, rather
+# than DOWNLOAD_MAX_CONCURRENT_SOURCES at a time
+BULK_DOWNLOAD_STREAMING_UPLOAD = os.environ.get("BULK_DOWNLOAD_STREAMING_UPLOAD", "").lower() in ["true", "1", "yes"]
+
+# Longest a download's files are reused for identical requests, while no new data has been loaded for it
+DOWNLOAD_RESULT_MAX_AGE_DAYS = int(os.environ.get("DOWNLOAD_RESULT_MAX_AGE_DAYS", 7))
+# Longest since a download that's not finished yet (ready, running, ...) was updated for it to be reused
+DOWNLOAD_UNFINISHED_REUSE_MINUTES = int(os.environ.get("DOWNLOAD_UNFINISHED_REUSE_MINUTES", 30))
+
+# Downloads estimated to have at most this many rows are sent to the "small" lane, see BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME
+DOWNLOAD_SMALL_JOB_MAX_ROWS = int(os.environ.get("DOWNLOAD_SMALL_JOB_MAX_ROWS", 50000))
+
+# Number of polls of the small lane for each poll of the large lane by download workers polling both lanes
+DOWNLOAD_SMALL_LANE_WEIGHT = int(os.environ.get("DOWNLOAD_SMALL_LANE_WEIGHT", 3))
+
 # Default timeout for SQL statements in Django
 DEFAULT_DB_TIMEOUT_IN_SECONDS = int(os.environ.get("DEFAULT_DB_TIMEOUT_IN_SECONDS", 0))
 DOWNLOAD_DB_TIMEOUT_IN_HOURS = 4
+# Download ID tables older than this were left behind by workers which were killed, and are dropped at worker start
+DOWNLOAD_ID_TABLE_MAX_AGE_HOURS = int(os.environ.get("DOWNLOAD_ID_TABLE_MAX_AGE_HOURS", 24))
 CONNECTION_MAX_SECONDS = 10
 
 API_MAX_DATE = "2024-09-30"  # End of FY2024
@@ -40,6 +65,10 @@ SECRET_KEY = get_random_string()
 # Defaults to False, unless DJANGO_DEBUG env var is set to a truthy value
 DEBUG = os.environ.get("DJANGO_DEBUG", "").lower() in ["true", "1", "yes"]
 
+# SECURITY WARNING: don't turn on in production, /status/ is public!
+# Adds the API cache and Elasticsearch client stats of the worker process to /status/?cache_stats&search_client_stats
+STATUS_PROCESS_STATS = os.environ.get("STATUS_PROCESS_STATS", "").lower() in ["true", "1", "yes"]
+
 HOST = "localhost:3000"
 ALLOWED_HOSTS = ["*"]
 
@@ -64,6 +93,9 @@ BULK_DOWNLOAD_LOCAL_PATH = str(REPO_DIR / "bulk_downloads") + "/"
 BULK_DOWNLOAD_S3_BUCKET_NAME = ""
 BULK_DOWNLOAD_S3_REDIRECT_DIR = "generated_downloads"
 BULK_DOWNLOAD_SQS_QUEUE_NAME = ""
+# Queue of the small download lane. Small downloads are sent to BULK_DOWNLOAD_SQS_QUEUE_NAME along with the rest when
+# it isn't set
+BULK_DOWNLOAD_SMALL_SQS_QUEUE_NAME = ""
 MONTHLY_DOWNLOAD_S3_BUCKET_NAME = ""
 MONTHLY_DOWNLOAD_S3_REDIRECT_DIR = "award_data_archive"
 BROKER_AGENCY_BUCKET_NAME = ""
@@ -135,6 +167,13 @@ ES_TRANSACTIONS_NAME_SUFFIX = "transactions"
 ES_TRANSACTIONS_QUERY_ALIAS_PREFIX = "transaction-query"
 ES_TRANSACTIONS_WRITE_ALIAS = "transaction-load-alias"
 ES_TIMEOUT = 90
+# Connections kept open per ES node by each shared search client (see get_search_client)
+ES_MAX_CONNECTIONS = int(os.environ.get("ES_MAX_CONNECTIONS", 10))
+ES_SNIFF_ON_START = os.environ.get("ES_SNIFF_ON_START", "").lower() in ["true", "1", "yes"]
+ES_SNIFF_ON_CONNECTION_FAIL = os.environ.get("ES_SNIFF_ON_CONNECTION_FAIL", "").lower() in ["true", "1", "yes"]
+ES_SNIFFER_TIMEOUT = int(os.environ["ES_SNIFFER_TIMEOUT"]) if os.environ.get("ES_SNIFFER_TIMEOUT") else None
+# Number of slices, each scrolled by its own thread, used to retrieve the IDs matching an Elasticsearch download
+ES_DOWNLOAD_ID_SLICES = int(os.environ.get("ES_DOWNLOAD_ID_SLICES", 4))
 ES_REPOSITORY = ""
 ES_ROUTING_FIELD = "recipient_agg_key"
 
@@ -414,6 +453,28 @@ CACHE_ENVIRONMENTS = {
 # Set the usaspending-cache to whatever our environment cache dictates
 CACHES["usaspending-cache"] = CACHE_ENVIRONMENTS[CACHE_ENVIRONMENT]
 
+# API responses are also kept in a bounded in-memory LRU cache in each worker, in front of usaspending-cache. Entries
+# are used for up to API_CACHE_LOCAL_TIMEOUT_SECONDS before going back to usaspending-cache, or until
+# clear_usaspending_cache replaces the generation of usaspending-cache
+API_CACHE_LOCAL_MAX_ENTRIES = int(os.environ.get("API_CACHE_LOCAL_MAX_ENTRIES", 256))
+API_CACHE_LOCAL_TIMEOUT_SECONDS = int(os.environ.get("API_CACHE_LOCAL_TIMEOUT_SECONDS", 60))
+
+# Expired API responses are kept this much longer, to be served while a single request recomputes them
+API_CACHE_STALE_SECONDS = int(os.environ.get("API_CACHE_STALE_SECONDS", 300))
+
+# Longest a request holds the lock to compute an uncached API response, and longest other requests for the same
+# response wait for it before computing it themselves
+API_CACHE_LOCK_TIMEOUT_SECONDS = int(os.environ.get("API_CACHE_LOCK_TIMEOUT_SECONDS", 120))
+API_CACHE_LOCK_WAIT_SECONDS = int(os.environ.get("API_CACHE_LOCK_WAIT_SECONDS", 30))
+
+# API cache keys include the load dates of the data each endpoint depends on, read at most this often per worker
+API_CACHE_DATA_VERSION_SECONDS = int(os.environ.get("API_CACHE_DATA_VERSION_SECONDS", 60))
+
+# Number of the most requested API requests tracked by each worker, to be replayed by warm_usaspending_cache, and how
+# often each worker adds its counts to the ones kept in usaspending-cache
+API_CACHE_POPULAR_REQUESTS = int(os.environ.get("API_CACHE_POPULAR_REQUESTS", 1000))
+API_CACHE_POPULAR_REQUESTS_FLUSH_SECONDS = int(os.environ.get("API_CACHE_POPULAR_REQUESTS_FLUSH_SECONDS", 300))
+
 # DRF extensions
 REST_FRAMEWORK_EXTENSIONS = {
     # Not caching errors, these are logged to exceptions.log
@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from django.core.exceptions import ObjectDoesNotExist
 from django.core.management.base import BaseCommand
 from django.db import transaction
+from usaspending_api.broker.helpers.last_load_date import update_last_load_date
 from usaspending_api.submissions.models import SubmissionAttributes
 from usaspending_api.awards.models import FinancialAccountsByAwards, Award
 
@@ -45,6 +46,7 @@ class Command(BaseCommand):
         ).update(update_date=datetime.now(timezone.utc))
 
         deleted_stats = submission.delete()
+        update_last_load_date("submissions", datetime.now(timezone.utc))
 
         self.logger.info("Finished deletions.")
 
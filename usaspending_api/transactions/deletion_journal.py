@@ -0,0 +1,172 @@
+"""
+Deletion journal store: the CSV files Broker writes to the DELETED_TRANSACTION_JOURNAL_FILES bucket when transactions
+are deleted are ingested into the deletion_journal_file and deletion_journal_record tables, which are indexed for the
+queries by date and agency of the delta file builders and the Elasticsearch delete processing. A file is ingested again,
+replacing its records, whenever it's modified in the bucket.
+"""
+import io
+import logging
+import pandas as pd
+import re
+
+from datetime import date, datetime
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from typing import List, NamedTuple, Optional, Pattern, Tuple
+
+from usaspending_api.common.helpers.s3_helpers import get_s3_bucket
+from usaspending_api.common.helpers.timing_helpers import ScriptTimer as Timer
+from usaspending_api.transactions.models import DeletionJournalFile, DeletionJournalRecord
+
+logger = logging.getLogger("script")
+
+# Records are inserted in batches of this size
+INGEST_BATCH_SIZE = 10000
+
+
+class _JournalFileType(NamedTuple):
+    transaction_type: str
+    pattern: Pattern
+    unique_key_column: str
+    id_prefix: str  # Prefix of the transaction ids of the Elasticsearch documents
+
+
+JOURNAL_FILE_TYPES = [
+    _JournalFileType(
+        "fpds",
+        re.compile(r"(?P<month>\d{2})-(?P<day>\d{2})-(?P<year>\d{4})_delete_records_(IDV|award)_\d{10}\.csv"),
+        "detached_award_proc_unique",
+        "CONT_TX_",
+    ),
+    _JournalFileType(
+        "fabs",
+        re.compile(r"(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})_FABSdeletions_\d{10}\.csv"),
+        "afa_generated_unique",
+        "ASST_TX_",
+    ),
+]
+
+
+def _match_journal_file(key: str) -> Optional[Tuple[_JournalFileType, date]]:
+    """The type and date of the journal file with the given key, or None if it isn't a journal file"""
+    for file_type in JOURNAL_FILE_TYPES:
+        match = file_type.pattern.fullmatch(key)
+        if match:
+            return file_type, date(int(match["year"]), int(match["month"]), int(match["day"]))
+    return None
+
+
+def ingest_deletion_journals(bucket=None) -> int:
+    """
+    Ingest the journal files of the bucket which haven't been ingested yet, or have been modified since, each in its
+    own transaction. The bucket defaults to the DELETED_TRANSACTION_JOURNAL_FILES S3 bucket, but can be any object
+    with the same interface, such as a FakeFileBackedS3Bucket. Returns the number of files ingested.
+
+    Safe to run concurrently (e.g. by the Elasticsearch indexer and populate_monthly_delta_files): a file being
+    ingested by another run is skipped once that run commits.
+    """
+    if bucket is None:
+        bucket = get_s3_bucket(bucket_name=settings.DELETED_TRANSACTION_JOURNAL_FILES)
+
+    with Timer("Ingesting deletion journal files"):
+        ingested_files = dict(DeletionJournalFile.objects.values_list("key", "last_modified"))
+        new_files = []
+        for obj in bucket.objects.all():
+            if obj.key not in ingested_files or obj.last_modified > ingested_files[obj.key]:
+                journal_file = _match_journal_file(obj.key)
+                if journal_file:
+                    new_files.append((obj, *journal_file))
+        logger.info(f"{len(new_files):,} new or modified deletion journal files found in bucket '{bucket.name}'")
+
+        ingested_count = 0
+        for obj, file_type, journal_date in new_files:
+            ingested_count += _ingest_journal_file(bucket, obj, file_type, journal_date)
+
+    return ingested_count
+
+
+def _ingest_journal_file(bucket, obj, file_type: _JournalFileType, journal_date: date) -> bool:
+    """Ingest the journal file, replacing the records of a previous version of it. Returns whether it was ingested"""
+    data = io.BytesIO()
+    bucket.download_fileobj(obj.key, data)
+    data.seek(0)
+
+    # Ingests the CSV into a dataframe. pandas thinks some ids are dates, so disable parsing
+    df = pd.read_csv(data, dtype=str)
+    if file_type.unique_key_column in df:
+        unique_keys = df[file_type.unique_key_column].dropna().str.upper().drop_duplicates()
+    else:
+        logger.warning(f"Column {file_type.unique_key_column} is missing from {obj.key}")
+        unique_keys = pd.Series([], dtype=str)
+    agency_codes = unique_keys.str.split("_", n=1).str[0]
+
+    with transaction.atomic():
+        # The row lock (or the unique key, for a new file) makes a concurrent run wait for this one to commit
+        journal_file, created = DeletionJournalFile.objects.select_for_update().get_or_create(
+            key=obj.key,
+            defaults={
+                "last_modified": obj.last_modified,
+                "transaction_type": file_type.transaction_type,
+                "journal_date": journal_date,
+                "record_count": len(unique_keys),
+            },
+        )
+        if not created:
+            if journal_file.last_modified >= obj.last_modified:
+                logger.info(f"{obj.key} was already ingested by another run")
+                return False
+            journal_file.records.all().delete()
+            journal_file.last_modified = obj.last_modified
+            journal_file.record_count = len(unique_keys)
+            journal_file.save()
+
+        DeletionJournalRecord.objects.bulk_create(
+            [
+                DeletionJournalRecord(
+                    journal_file=journal_file,
+                    unique_key=unique_key,
+                    transaction_type=file_type.transaction_type,
+                    agency_code=agency_code,
+                    journal_date=journal_date,
+                    last_modified=obj.last_modified,
+                )
+                for unique_key, agency_code in zip(unique_keys, agency_codes)
+            ],
+            batch_size=INGEST_BATCH_SIZE,
+        )
+    logger.info(f"{len(unique_keys):,} deleted transactions ingested from {obj.key}")
+    return True
+
+
+def get_deleted_records(
+    transaction_type: str, agency_codes: Optional[List[str]] = None, **journal_date_filters
+) -> pd.DataFrame:
+    """
+    Return a DataFrame of the unique_key and journal_date of the deleted transactions of the type ("fpds" or "fabs"),
+    optionally limited to the given agency codes. The journal_date_filters are Django lookups on the journal date,
+    e.g. ``journal_date__gte=date(2020, 1, 1)``.
+    """
+    queryset = DeletionJournalRecord.objects.filter(transaction_type=transaction_type, **journal_date_filters)
+    if agency_codes is not None:
+        queryset = queryset.filter(agency_code__in=agency_codes)
+    return pd.DataFrame.from_records(
+        list(queryset.values_list("unique_key", "journal_date")), columns=["unique_key", "journal_date"]
+    )
+
+
+def get_deleted_transaction_ids(modified_since: datetime) -> dict:
+    """
+    Return the Elasticsearch ids of the transactions deleted by journal files modified since the given datetime,
+    each with the latest modification of the files it's in, as {id: {"timestamp": datetime}}
+    """
+    id_prefixes = {file_type.transaction_type: file_type.id_prefix for file_type in JOURNAL_FILE_TYPES}
+    records = (
+        DeletionJournalRecord.objects.filter(last_modified__gte=modified_since)
+        .values("transaction_type", "unique_key")
+        .annotate(timestamp=Max("last_modified"))
+    )
+    return {
+        f"{id_prefixes[record['transaction_type']]}{record['unique_key']}": {"timestamp": record["timestamp"]}
+        for record in records
+    }
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-18 06:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0002_auto_20200221_1641'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeletionJournalFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.TextField(help_text='S3 key of the journal file', unique=True)),
+                ('last_modified', models.DateTimeField(help_text='When the journal file was last modified in S3')),
+                ('transaction_type', models.TextField(help_text='Source of the deleted transactions: fpds or fabs')),
+                ('journal_date', models.DateField(help_text='Date of the journal, from its file name')),
+                ('record_count', models.IntegerField(default=0)),
+                ('ingested_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'deletion_journal_file',
+            },
+        ),
+        migrations.CreateModel(
+            name='DeletionJournalRecord',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unique_key', models.TextField(help_text='Uppercased detached_award_proc_unique or afa_generated_unique')),
+                ('transaction_type', models.TextField(help_text='Source of the deleted transaction: fpds or fabs')),
+                ('agency_code', models.TextField(help_text='First part of the unique key: the agency_id of contracts or awarding_sub_agency_code of assistance')),
+                ('journal_date', models.DateField()),
+                ('last_modified', models.DateTimeField()),
+                ('journal_file', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='records', to='transactions.DeletionJournalFile')),
+            ],
+            options={
+                'db_table': 'deletion_journal_record',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='deletionjournalrecord',
+            index=models.Index(fields=['transaction_type', 'journal_date', 'agency_code'], name='deletion_jo_transac_07fd7a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deletionjournalrecord',
+            index=models.Index(fields=['last_modified'], name='deletion_jo_last_mo_544f01_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='deletionjournalrecord',
+            unique_together={('journal_file', 'unique_key')},
+        ),
+    ]
@@ -1,5 +1,11 @@
+from usaspending_api.transactions.models.deletion_journal import DeletionJournalFile, DeletionJournalRecord
 from usaspending_api.transactions.models.source_assistance_transaction import SourceAssistanceTransaction
 from usaspending_api.transactions.models.source_procurement_transaction import SourceProcurementTransaction
 
 
-__all__ = ["SourceAssistanceTransaction", "SourceProcurementTransaction"]
+__all__ = [
+    "DeletionJournalFile",
+    "DeletionJournalRecord",
+    "SourceAssistanceTransaction",
+    "SourceProcurementTransaction",
+]
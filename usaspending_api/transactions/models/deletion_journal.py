@@ -0,0 +1,36 @@
+from django.db import models
+
+
+class DeletionJournalFile(models.Model):
+    """A deletion journal CSV from the DELETED_TRANSACTION_JOURNAL_FILES bucket which has been ingested"""
+
+    key = models.TextField(unique=True, help_text="S3 key of the journal file")
+    last_modified = models.DateTimeField(help_text="When the journal file was last modified in S3")
+    transaction_type = models.TextField(help_text="Source of the deleted transactions: fpds or fabs")
+    journal_date = models.DateField(help_text="Date of the journal, from its file name")
+    record_count = models.IntegerField(default=0)
+    ingested_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "deletion_journal_file"
+
+
+class DeletionJournalRecord(models.Model):
+    """A transaction deleted from Broker, as recorded in a deletion journal file"""
+
+    journal_file = models.ForeignKey(DeletionJournalFile, on_delete=models.CASCADE, related_name="records")
+    unique_key = models.TextField(help_text="Uppercased detached_award_proc_unique or afa_generated_unique")
+    transaction_type = models.TextField(help_text="Source of the deleted transaction: fpds or fabs")
+    agency_code = models.TextField(
+        help_text="First part of the unique key: the agency_id of contracts or awarding_sub_agency_code of assistance"
+    )
+    journal_date = models.DateField()
+    last_modified = models.DateTimeField()
+
+    class Meta:
+        db_table = "deletion_journal_record"
+        unique_together = ("journal_file", "unique_key")
+        indexes = [
+            models.Index(fields=["transaction_type", "journal_date", "agency_code"]),
+            models.Index(fields=["last_modified"]),
+        ]
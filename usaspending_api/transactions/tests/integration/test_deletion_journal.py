@@ -0,0 +1,133 @@
+import os
+import pytest
+
+from datetime import date, datetime, timezone
+
+from usaspending_api.common.helpers.s3_helpers import FakeFileBackedS3Bucket
+from usaspending_api.transactions.deletion_journal import (
+    _ingest_journal_file,
+    _match_journal_file,
+    get_deleted_records,
+    get_deleted_transaction_ids,
+    ingest_deletion_journals,
+)
+from usaspending_api.transactions.models import DeletionJournalFile, DeletionJournalRecord
+
+
+def _write_journal_file(directory, name, header, unique_keys, last_modified):
+    path = directory / name
+    path.write_text("\n".join([header] + unique_keys) + "\n")
+    os.utime(path, (last_modified.timestamp(), last_modified.timestamp()))
+
+
+@pytest.fixture
+def journal_bucket(tmp_path):
+    _write_journal_file(
+        tmp_path,
+        "01-15-2020_delete_records_award_1579100000.csv",
+        "detached_award_proc_unique",
+        ["1234_-none-_piid1_0_-none-_0", "5678_-none-_piid2_0_-none-_0"],
+        datetime(2020, 1, 15, 20, tzinfo=timezone.utc),
+    )
+    _write_journal_file(
+        tmp_path,
+        "2020-02-01_FABSdeletions_1580500000.csv",
+        "afa_generated_unique",
+        ["1234_fain1_-none-_10.001_-none-", "1234_fain1_-none-_10.001_-none-"],
+        datetime(2020, 2, 1, 8, tzinfo=timezone.utc),
+    )
+    # Files which aren't named like journal files aren't ingested
+    (tmp_path / "staging").mkdir()
+    _write_journal_file(
+        tmp_path,
+        "staging/2020-02-01_FABSdeletions_1580500000.csv",
+        "afa_generated_unique",
+        ["9999_fain2_-none-_10.001_-none-"],
+        datetime(2020, 2, 1, 8, tzinfo=timezone.utc),
+    )
+    return FakeFileBackedS3Bucket(tmp_path)
+
+
+@pytest.mark.django_db
+def test_ingest_deletion_journals(journal_bucket):
+    assert ingest_deletion_journals(journal_bucket) == 2
+    assert DeletionJournalFile.objects.count() == 2
+    assert DeletionJournalRecord.objects.count() == 3
+
+    # Files already ingested are skipped
+    assert ingest_deletion_journals(journal_bucket) == 0
+    assert DeletionJournalRecord.objects.count() == 3
+
+    record = DeletionJournalRecord.objects.get(transaction_type="fabs")
+    assert record.unique_key == "1234_FAIN1_-NONE-_10.001_-NONE-"
+    assert record.agency_code == "1234"
+    assert record.journal_date == date(2020, 2, 1)
+
+
+@pytest.mark.django_db
+def test_ingest_modified_deletion_journal(journal_bucket, tmp_path):
+    ingest_deletion_journals(journal_bucket)
+
+    # A file overwritten in the bucket replaces the records of its previous version
+    _write_journal_file(
+        tmp_path,
+        "2020-02-01_FABSdeletions_1580500000.csv",
+        "afa_generated_unique",
+        ["1234_fain2_-none-_10.001_-none-", "1234_fain3_-none-_10.001_-none-"],
+        datetime(2020, 2, 2, 8, tzinfo=timezone.utc),
+    )
+    assert ingest_deletion_journals(journal_bucket) == 1
+    assert ingest_deletion_journals(journal_bucket) == 0
+
+    journal_file = DeletionJournalFile.objects.get(transaction_type="fabs")
+    assert journal_file.last_modified == datetime(2020, 2, 2, 8, tzinfo=timezone.utc)
+    assert journal_file.record_count == 2
+    assert sorted(journal_file.records.values_list("unique_key", "last_modified")) == [
+        ("1234_FAIN2_-NONE-_10.001_-NONE-", datetime(2020, 2, 2, 8, tzinfo=timezone.utc)),
+        ("1234_FAIN3_-NONE-_10.001_-NONE-", datetime(2020, 2, 2, 8, tzinfo=timezone.utc)),
+    ]
+    assert DeletionJournalRecord.objects.filter(transaction_type="fpds").count() == 2
+
+
+@pytest.mark.django_db
+def test_ingest_deletion_journal_ingested_by_another_run(journal_bucket):
+    # Files listed as new, but ingested by another run before this one gets to them, are skipped
+    objs = list(journal_bucket.objects.all())
+    ingest_deletion_journals(journal_bucket)
+
+    for obj in objs:
+        journal_file = _match_journal_file(obj.key)
+        if journal_file:
+            assert _ingest_journal_file(journal_bucket, obj, *journal_file) is False
+    assert DeletionJournalFile.objects.count() == 2
+    assert DeletionJournalRecord.objects.count() == 3
+
+
+@pytest.mark.django_db
+def test_get_deleted_records(journal_bucket):
+    ingest_deletion_journals(journal_bucket)
+
+    deletions = get_deleted_records("fpds", journal_date__gte=date(2020, 1, 15))
+    assert sorted(deletions["unique_key"]) == ["1234_-NONE-_PIID1_0_-NONE-_0", "5678_-NONE-_PIID2_0_-NONE-_0"]
+
+    deletions = get_deleted_records("fpds", ["5678"], journal_date__gte=date(2020, 1, 15))
+    assert list(deletions["unique_key"]) == ["5678_-NONE-_PIID2_0_-NONE-_0"]
+    assert list(deletions["journal_date"]) == [date(2020, 1, 15)]
+
+    assert get_deleted_records("fpds", journal_date__gt=date(2020, 1, 15)).empty
+    assert len(get_deleted_records("fabs", journal_date__lte=date(2020, 2, 1)).index) == 1
+
+
+@pytest.mark.django_db
+def test_get_deleted_transaction_ids(journal_bucket):
+    ingest_deletion_journals(journal_bucket)
+
+    deleted_ids = get_deleted_transaction_ids(datetime(2020, 1, 1, tzinfo=timezone.utc))
+    assert deleted_ids == {
+        "CONT_TX_1234_-NONE-_PIID1_0_-NONE-_0": {"timestamp": datetime(2020, 1, 15, 20, tzinfo=timezone.utc)},
+        "CONT_TX_5678_-NONE-_PIID2_0_-NONE-_0": {"timestamp": datetime(2020, 1, 15, 20, tzinfo=timezone.utc)},
+        "ASST_TX_1234_FAIN1_-NONE-_10.001_-NONE-": {"timestamp": datetime(2020, 2, 1, 8, tzinfo=timezone.utc)},
+    }
+
+    deleted_ids = get_deleted_transaction_ids(datetime(2020, 1, 20, tzinfo=timezone.utc))
+    assert list(deleted_ids) == ["ASST_TX_1234_FAIN1_-NONE-_10.001_-NONE-"]
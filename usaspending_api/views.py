@@ -1,9 +1,27 @@
+from django.conf import settings
 from django.http import HttpResponse
 from django.views import View
 import json
+import os
+
+from usaspending_api.common.cache_decorator import cache_stats
+from usaspending_api.common.elasticsearch.client import get_search_client_stats
 
 
 class StatusView(View):
     def get(self, request, format=None):
         response_object = {"status": "running"}
+        # Stats are kept by each worker process, so they only cover the requests of the one serving this request
+        if settings.STATUS_PROCESS_STATS and "cache_stats" in request.GET:
+            response_object["cache_stats"] = {
+                "per_process": True,
+                "pid": os.getpid(),
+                "endpoints": cache_stats.snapshot(),
+            }
+        if settings.STATUS_PROCESS_STATS and "search_client_stats" in request.GET:
+            response_object["search_client_stats"] = {
+                "per_process": True,
+                "pid": os.getpid(),
+                "aliases": get_search_client_stats(),
+            }
         return HttpResponse(json.dumps(response_object))